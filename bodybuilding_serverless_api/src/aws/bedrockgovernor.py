@@ -0,0 +1,319 @@
+"""Process-wide adaptive concurrency governor for Bedrock calls"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+THROTTLING_ERROR_CODES = ('ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException')
+
+_BACKGROUND = contextvars.ContextVar('bedrock_background', default=False)
+
+
+@contextmanager
+def background_calls() -> Iterator[None]:
+    """Mark Bedrock calls made in this context, and in tasks started from it, as background work.
+
+    Background callers wait in their own lane and only get a slot when no
+    regular caller is waiting, so speculative work never delays the calls a
+    response is blocked on.
+    """
+    token = _BACKGROUND.set(True)
+    try:
+        yield
+    finally:
+        _BACKGROUND.reset(token)
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """True when Bedrock rejected the call because of rate or capacity limits"""
+    response = getattr(error, 'response', None)
+    code = response.get('Error', {}).get('Code') if isinstance(response, dict) else None
+    return (code or type(error).__name__) in THROTTLING_ERROR_CODES
+
+
+class BedrockBackpressureError(Exception):
+    """Raised when a caller cannot get a Bedrock slot: the queue is full or the wait timed out"""
+
+
+class _Waiter:
+    """A queued caller; async waiters resolve a future, sync waiters set an event"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+    def grant(self) -> bool:
+        """Hand the slot to this waiter; False when its event loop is gone"""
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+            return True
+        except RuntimeError:
+            return False
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class ModelLimiter:
+    """AIMD concurrency limit and FIFO wait queues for a single model.
+
+    The limit halves when Bedrock throttles (at most once per cooldown, so one
+    burst of rejections counts once) and grows by 1/limit per success, which
+    adds roughly one slot per limit's worth of successful calls. Background
+    waiters are only granted a slot once the regular queue is empty.
+    """
+
+    def __init__(self, model_id: str, initial_limit: float, min_limit: float, max_limit: float,
+                 max_queue_depth: int, throttle_cooldown: float):
+        self.model_id = model_id
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.max_queue_depth = max_queue_depth
+        self.throttle_cooldown = throttle_cooldown
+        self.in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._background: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self._last_decrease = 0.0
+        self.metrics = {
+            'acquired': 0,
+            'queued': 0,
+            'rejected': 0,
+            'abandoned': 0,
+            'throttles': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'max_queue_depth': 0
+        }
+
+    @property
+    def slots(self) -> int:
+        return max(1, int(self.limit))
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters) + len(self._background)
+
+    async def acquire(self, timeout: Optional[float], background: bool = False) -> float:
+        """Wait for a slot on the running loop; returns the seconds spent queued"""
+        waiter = self._enqueue(asyncio.get_running_loop(), background)
+        if waiter is None:
+            return 0.0
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self._abandon(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise BedrockBackpressureError(f"Timed out after {timeout}s waiting for a {self.model_id} slot") from e
+            raise
+        return self._record_wait(waiter)
+
+    def acquire_sync(self, timeout: Optional[float], background: bool = False) -> float:
+        """Blocking variant of acquire for synchronous callers"""
+        waiter = self._enqueue(None, background)
+        if waiter is None:
+            return 0.0
+        if not waiter.event.wait(timeout):
+            self._abandon(waiter)
+            raise BedrockBackpressureError(f"Timed out after {timeout}s waiting for a {self.model_id} slot")
+        return self._record_wait(waiter)
+
+    def release(self) -> None:
+        """Return a slot and hand it to the next waiter in line"""
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._dispatch()
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.metrics['throttles'] += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.throttle_cooldown:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._last_decrease = now
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.metrics)
+            stats.update({
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters) + len(self._background),
+                'background_queue_depth': len(self._background)
+            })
+        waited = stats['queued']
+        stats['avg_wait_seconds'] = stats['total_wait_seconds'] / waited if waited else 0.0
+        return stats
+
+    def _enqueue(self, loop: Optional[asyncio.AbstractEventLoop], background: bool = False) -> Optional[_Waiter]:
+        """Take a free slot immediately (returns None) or join the regular or background queue"""
+        with self._lock:
+            if self.in_flight < self.slots and not self._waiters and not (background and self._background):
+                self.in_flight += 1
+                self.metrics['acquired'] += 1
+                return None
+            if self.queue_depth >= self.max_queue_depth:
+                self.metrics['rejected'] += 1
+                raise BedrockBackpressureError(f"{self.model_id} queue is full ({self.max_queue_depth} waiting)")
+            waiter = _Waiter(loop)
+            (self._background if background else self._waiters).append(waiter)
+            self.metrics['queued'] += 1
+            self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], self.queue_depth)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up, passing on the slot if it had already been granted"""
+        with self._lock:
+            self.metrics['abandoned'] += 1
+            if waiter.granted:
+                self.in_flight -= 1
+                self._dispatch()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            else:
+                self._background.remove(waiter)
+
+    def _record_wait(self, waiter: _Waiter) -> float:
+        waited = time.monotonic() - waiter.enqueued_at
+        with self._lock:
+            self.metrics['acquired'] += 1
+            self.metrics['total_wait_seconds'] += waited
+            self.metrics['max_wait_seconds'] = max(self.metrics['max_wait_seconds'], waited)
+        return waited
+
+    def _dispatch(self) -> None:
+        """Grant free slots to queued callers in arrival order, regular callers first; caller holds the lock"""
+        while (self._waiters or self._background) and self.in_flight < self.slots:
+            waiter = (self._waiters or self._background).popleft()
+            self.in_flight += 1
+            if not waiter.grant():
+                self.in_flight -= 1
+
+
+class BedrockGovernor:
+    """Shares Bedrock capacity between every caller in the process.
+
+    Each model gets its own ModelLimiter. Calls over the limit wait in FIFO
+    order, with calls made under background_calls() behind all others; once BEDROCK_MAX_QUEUE_DEPTH callers are waiting, new callers get
+    BedrockBackpressureError instead of piling more work onto a throttled model.
+    """
+
+    _instance: Optional['BedrockGovernor'] = None
+
+    def __init__(self, logger, initial_limit: Optional[float] = None,
+                 max_limit: Optional[float] = None, min_limit: Optional[float] = None,
+                 max_queue_depth: Optional[int] = None, queue_timeout: Optional[float] = None,
+                 throttle_cooldown: Optional[float] = None):
+        self.logger = logger
+        self.initial_limit = initial_limit or float(os.environ.get('BEDROCK_CONCURRENCY_INITIAL', 4))
+        self.max_limit = max_limit or float(os.environ.get('BEDROCK_CONCURRENCY_MAX', 16))
+        self.min_limit = min_limit or float(os.environ.get('BEDROCK_CONCURRENCY_MIN', 1))
+        self.max_queue_depth = max_queue_depth or int(os.environ.get('BEDROCK_MAX_QUEUE_DEPTH', 64))
+        self.queue_timeout = queue_timeout or float(os.environ.get('BEDROCK_QUEUE_TIMEOUT_SECONDS', 30))
+        self.throttle_cooldown = throttle_cooldown if throttle_cooldown is not None else float(os.environ.get('BEDROCK_THROTTLE_COOLDOWN_SECONDS', 1))
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, logger) -> 'BedrockGovernor':
+        """Get or create the process-wide governor"""
+        if cls._instance is None:
+            cls._instance = BedrockGovernor(logger)
+        return cls._instance
+
+    def limiter(self, model_id: str) -> ModelLimiter:
+        with self._lock:
+            if model_id not in self._limiters:
+                self._limiters[model_id] = ModelLimiter(
+                    model_id, self.initial_limit, self.min_limit, self.max_limit,
+                    self.max_queue_depth, self.throttle_cooldown
+                )
+            return self._limiters[model_id]
+
+    async def acquire(self, model_id: str) -> ModelLimiter:
+        """Hold a slot for work that outlives a single call, such as a response stream.
+
+        The caller must call release() on the returned limiter, and on_success()
+        or record_failure() once the outcome is known.
+        """
+        limiter = self.limiter(model_id)
+        waited = await limiter.acquire(self.queue_timeout, _BACKGROUND.get())
+        self._log_wait(model_id, waited, limiter)
+        return limiter
+
+    async def run(self, model_id: str, call: Callable[[], Any], executor=None) -> Any:
+        """Run a blocking Bedrock call on the executor once a slot for model_id is free"""
+        limiter = await self.acquire(model_id)
+        future = asyncio.get_running_loop().run_in_executor(executor, call)
+        try:
+            # Shielded because a cancelled caller, such as a losing hedge, cannot stop the thread;
+            # its slot stays held until the request really finishes
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(lambda done: self._settle(limiter, done))
+            raise
+        except Exception as e:
+            self.record_failure(limiter, e)
+            limiter.release()
+            raise
+        limiter.release()
+        limiter.on_success()
+        return result
+
+    def _settle(self, limiter: ModelLimiter, future: asyncio.Future) -> None:
+        """Release the slot of a call nobody is waiting for once its thread finishes, and record the outcome"""
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            self.record_failure(limiter, error)
+        limiter.release()
+        if error is None and not future.cancelled():
+            limiter.on_success()
+
+    def run_sync(self, model_id: str, call: Callable[[], Any]) -> Any:
+        """Blocking variant of run"""
+        limiter = self.limiter(model_id)
+        waited = limiter.acquire_sync(self.queue_timeout, _BACKGROUND.get())
+        self._log_wait(model_id, waited, limiter)
+        try:
+            result = call()
+        except Exception as e:
+            self.record_failure(limiter, e)
+            raise
+        finally:
+            limiter.release()
+        limiter.on_success()
+        return result
+
+    def record_failure(self, limiter: ModelLimiter, error: Exception) -> None:
+        """Shrink the limit when the failure was a throttle"""
+        if is_throttling_error(error):
+            limiter.on_throttle()
+            self.logger.warning(f"Bedrock throttled {limiter.model_id}, concurrency limit now {limiter.limit:.2f}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model limit, in-flight count, queue depth and wait-time metrics"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {model_id: limiter.stats() for model_id, limiter in limiters.items()}
+
+    def _log_wait(self, model_id: str, waited: float, limiter: ModelLimiter) -> None:
+        if waited >= 1.0:
+            self.logger.info(f"Waited {waited:.2f}s for a {model_id} slot (limit {limiter.limit:.2f}, queue {limiter.queue_depth})")
@@ -0,0 +1,89 @@
+"""Single-pass conversion between DynamoDB attribute values and plain Python values.
+
+Numbers decode to int when they have no fraction or exponent and to float
+otherwise, so a stored 5 reads back as 5, not 5.0. DynamoManager reads
+through the low-level client, such as query_page, iter_scan and batch_get,
+return these values. Reads through the resource API, such as
+get_dynamo_item, still return Decimal, which their callers write back
+through the same API.
+"""
+import math
+from decimal import Decimal
+from typing import Any, Dict
+
+
+def deserialize(value: Dict[str, Any]) -> Any:
+    """Plain value of a low-level attribute value; numbers become int or float, never Decimal"""
+    (tag, data), = value.items()
+    if tag == 'S':
+        return data
+    if tag == 'N':
+        return _number(data)
+    if tag == 'M':
+        return {key: deserialize(member) for key, member in data.items()}
+    if tag == 'L':
+        return [deserialize(member) for member in data]
+    if tag == 'BOOL':
+        return data
+    if tag == 'NULL':
+        return None
+    if tag == 'SS':
+        return set(data)
+    if tag == 'NS':
+        return {_number(member) for member in data}
+    if tag == 'B':
+        return data
+    if tag == 'BS':
+        return set(data)
+    raise TypeError(f"Unknown DynamoDB type {tag}")
+
+
+def deserialize_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Plain item from a low-level item such as a query result or LastEvaluatedKey"""
+    return {key: deserialize(value) for key, value in item.items()}
+
+
+def serialize(value: Any) -> Dict[str, Any]:
+    """Low-level attribute value of a plain value; accepts float, unlike boto3's TypeSerializer"""
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise TypeError(f"DynamoDB cannot store {value}")
+        return {'N': repr(value)}
+    if isinstance(value, dict):
+        return {'M': {key: serialize(member) for key, member in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(member) for member in value]}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, (set, frozenset)) and value:
+        return _serialize_set(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__} for DynamoDB")
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Low-level item for put, key and ExclusiveStartKey parameters"""
+    return {key: serialize(value) for key, value in item.items()}
+
+
+def _number(text: str) -> Any:
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def _serialize_set(values: Any) -> Dict[str, Any]:
+    if all(isinstance(member, str) for member in values):
+        return {'SS': list(values)}
+    if all(isinstance(member, (int, float, Decimal)) and not isinstance(member, bool) for member in values):
+        return {'NS': [serialize(member)['N'] for member in values]}
+    if all(isinstance(member, (bytes, bytearray)) for member in values):
+        return {'BS': [bytes(member) for member in values]}
+    raise TypeError("A DynamoDB set must hold only strings, only numbers or only binary values")
@@ -1,11 +1,41 @@
 """Class to handle all DynamoDB operations for the bodybuilding app"""
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import random
+import threading
 import time
 import boto3
-from boto3.dynamodb.conditions import Key
+
+try:
+    from aws.dynamocodec import deserialize_item, serialize, serialize_item
+except ImportError:
+    from src.aws.dynamocodec import deserialize_item, serialize, serialize_item
+
+# Cursor of a segment that has been scanned to the end
+SCAN_DONE = 'done'
+
+
+class BatchIncompleteError(Exception):
+    """DynamoDB kept returning unprocessed items after every retry"""
+
+    def __init__(self, operation, table_name, unprocessed):
+        super().__init__(f"{operation} on {table_name} left {unprocessed} items unprocessed")
+        self.unprocessed = unprocessed
+
 
 class DynamoManager:
-    """DynamoDB manager for bodybuilding app"""
+    """DynamoDB manager for bodybuilding app.
+
+    Reads through the resource API return numbers as Decimal; reads through
+    the low-level client and dynamocodec return int and float (see dynamocodec).
+    """
+
+    BATCH_GET_SIZE = 100
+    BATCH_WRITE_SIZE = 25
+    BATCH_MAX_ATTEMPTS = 8
+    BATCH_BASE_DELAY = 0.05
+    BATCH_MAX_DELAY = 2.0
+    BATCH_WORKERS = 8
 
     def __init__(self, logger):
         """Initialize DynamoDB client"""
@@ -48,6 +78,12 @@ class DynamoManager:
         response = table.get_item(Key=lookup_keys)
         return response['Item']
 
+    def get_item(self, table_name, key):
+        """Item with the given key from the low-level client, numbers as int or float; None when missing"""
+        response = self.dynamo_client.meta.client.get_item(TableName=table_name, Key=serialize_item(key))
+        item = response.get('Item')
+        return deserialize_item(item) if item else None
+
     def put_if_not_exists_multi_key(self, table_name, lookup_keys, object_to_write):
         """Put an item only if it doesn't exist (using multiple keys)"""
         try:
@@ -69,62 +105,281 @@ class DynamoManager:
     def scan_table(self, table_name, filter_key=None, filter_value=None):
         """Scan a DynamoDB table with optional filtering"""
         start_time = time.time()
-        table = self.dynamo_client.Table(table_name)
+        client = self.dynamo_client.meta.client
+        params = {'TableName': table_name}
         
         if filter_key and filter_value:
-            filtering_exp = Key(filter_key).eq(filter_value)
-            response = table.scan(FilterExpression=filtering_exp)
-            data = response['Items']
-            
-            while 'LastEvaluatedKey' in response:
-                response = table.scan(
-                    ExclusiveStartKey=response['LastEvaluatedKey'],
-                    FilterExpression=filtering_exp
-                )
-                data.extend(response['Items'])
-        else:
-            response = table.scan()
-            data = response['Items']
-            
-            while 'LastEvaluatedKey' in response:
-                response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-                data.extend(response['Items'])
+            params['FilterExpression'], params['ExpressionAttributeNames'], params['ExpressionAttributeValues'] = self._equals(filter_key, filter_value)
+
+        response = client.scan(**params)
+        data = [deserialize_item(item) for item in response['Items']]
+        
+        while 'LastEvaluatedKey' in response:
+            response = client.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **params)
+            data.extend(deserialize_item(item) for item in response['Items'])
 
         end_time = time.time()
         self.logger.info(f'Scan table {table_name} completed in {end_time - start_time} seconds')
-        return [self._convert_item(item) for item in data]
+        return data
+
+    def iter_scan(self, table_name, total_segments=4, projection=None, filter_key=None, filter_value=None,
+                  page_size=None, cursors=None, on_progress=None, max_buffered_pages=None):
+        """Stream every item of a table from a parallel scan of total_segments segments.
+
+        Each segment is scanned page by page on its own worker thread. Pages pass
+        through a queue of at most max_buffered_pages (default two per segment),
+        so memory stays bounded however large the table is. projection is sent as
+        ProjectionExpression; names that are reserved words must be avoided.
+        Pages are read with the low-level client, which is safe to share across
+        the workers, and converted in one pass by dynamocodec.
+
+        cursors maps a segment number to the LastEvaluatedKey to resume from, or
+        SCAN_DONE for a finished segment. After all the items of a page have been
+        yielded, on_progress(cursors, scanned) is called with a copy of the
+        cursors. Pass that copy back, with the same total_segments, to resume an
+        interrupted scan; only a page that was partly consumed is read again.
+        """
+        cursors = {int(segment): cursor for segment, cursor in (cursors or {}).items()}
+        segments = [segment for segment in range(total_segments) if cursors.get(segment) != SCAN_DONE]
+        if not segments:
+            return
+        pages = queue.Queue(maxsize=max_buffered_pages or 2 * len(segments))
+        stop = threading.Event()
+        client = self.dynamo_client.meta.client
+        start = time.time()
+        scanned = 0
+
+        def worker(segment):
+            try:
+                params = {'TableName': table_name, 'Segment': segment, 'TotalSegments': total_segments}
+                if projection:
+                    params['ProjectionExpression'] = projection
+                if filter_key and filter_value:
+                    params['FilterExpression'], params['ExpressionAttributeNames'], params['ExpressionAttributeValues'] = self._equals(filter_key, filter_value)
+                if page_size:
+                    params['Limit'] = page_size
+                if cursors.get(segment):
+                    params['ExclusiveStartKey'] = serialize_item(cursors[segment])
+                while not stop.is_set():
+                    response = client.scan(**params)
+                    last_key = response.get('LastEvaluatedKey')
+                    cursor = deserialize_item(last_key) if last_key else SCAN_DONE
+                    self._put_page(pages, stop, (segment, response.get('Items', []), cursor, None))
+                    if not last_key:
+                        return
+                    params['ExclusiveStartKey'] = last_key
+            except Exception as error:  # pylint: disable=W0703
+                self._put_page(pages, stop, (segment, [], None, error))
+
+        workers = [threading.Thread(target=worker, args=(segment,), daemon=True) for segment in segments]
+        for thread in workers:
+            thread.start()
+        try:
+            remaining = len(segments)
+            while remaining:
+                segment, items, cursor, error = pages.get()
+                if error is not None:
+                    raise error
+                for item in items:
+                    yield deserialize_item(item)
+                scanned += len(items)
+                cursors[segment] = cursor
+                if cursor == SCAN_DONE:
+                    remaining -= 1
+                if on_progress:
+                    on_progress(dict(cursors), scanned)
+            self.logger.info(f'Parallel scan of {table_name} over {total_segments} segments returned {scanned} items in {time.time() - start}')
+        finally:
+            stop.set()
+            # Unblock workers waiting on a full queue so they can see the stop flag
+            while any(thread.is_alive() for thread in workers):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    @staticmethod
+    def _put_page(pages, stop, page):
+        while not stop.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return
+            except queue.Full:
+                continue
 
     def query_table(self, table_name, filter_key, filter_value):
         """Query a DynamoDB table"""
         start_time = time.time()
-        table = self.dynamo_client.Table(table_name)
         
         self.logger.info(f"Querying {table_name} where {filter_key} = {filter_value}")
-        response = table.query(
-            KeyConditionExpression=Key(filter_key).eq(filter_value)
-        )
-        
-        data = [self._convert_item(item) for item in response['Items']]
-        
-        while 'LastEvaluatedKey' in response:
-            response = table.query(
-                KeyConditionExpression=Key(filter_key).eq(filter_value),
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            data.extend([self._convert_item(item) for item in response['Items']])
+        data, _ = self.query_page(table_name, filter_key, filter_value)
 
         end_time = time.time()
         self.logger.info(f'Query completed in {end_time - start_time} seconds')
         return data
 
-    def _convert_item(self, item):
-        """Convert DynamoDB Decimal types to float"""
-        if isinstance(item, dict):
-            return {
-                key: (float(value) if isinstance(value, Decimal) else 
-                     self._convert_item(value) if isinstance(value, (dict, list)) else value)
-                for key, value in item.items()
-            }
-        elif isinstance(item, list):
-            return [self._convert_item(value) for value in item]
-        return item 
\ No newline at end of file
+    def batch_get(self, table_name, keys, projection=None):
+        """Get many items by key in BatchGetItem calls of 100; missing keys are skipped and order is not kept"""
+        chunks = self._chunks(keys, self.BATCH_GET_SIZE)
+        results = self._run_chunks(lambda chunk: self._batch_get_chunk(table_name, chunk, projection), chunks)
+        return [item for items in results for item in items]
+
+    def batch_put(self, table_name, items):
+        """Put many items in BatchWriteItem calls of 25; a batch may not hold two items with the same key"""
+        requests = [{'PutRequest': {'Item': serialize_item(item)}} for item in items]
+        self._batch_write(table_name, requests)
+        return True
+
+    def batch_delete(self, table_name, keys):
+        """Delete many items by key in BatchWriteItem calls of 25"""
+        requests = [{'DeleteRequest': {'Key': serialize_item(key)}} for key in keys]
+        self._batch_write(table_name, requests)
+        return True
+
+    def _batch_write(self, table_name, requests):
+        start = time.time()
+        chunks = self._chunks(requests, self.BATCH_WRITE_SIZE)
+        self._run_chunks(lambda chunk: self._batch_write_chunk(table_name, chunk), chunks)
+        self.logger.info(f'Batch write of {len(requests)} items to {table_name} in {len(chunks)} chunks took {time.time() - start}')
+
+    def _batch_get_chunk(self, table_name, keys, projection):
+        """One BatchGetItem, resending UnprocessedKeys with backoff"""
+        client = self.dynamo_client.meta.client
+        request = {'Keys': [serialize_item(key) for key in keys]}
+        if projection:
+            request['ProjectionExpression'] = projection
+        pending = {table_name: request}
+        items = []
+        for attempt in range(self.BATCH_MAX_ATTEMPTS):
+            response = client.batch_get_item(RequestItems=pending)
+            items.extend(deserialize_item(item) for item in response.get('Responses', {}).get(table_name, []))
+            pending = response.get('UnprocessedKeys') or {}
+            if not pending:
+                return items
+            self._backoff(attempt)
+        raise BatchIncompleteError('batch_get', table_name, len(pending[table_name]['Keys']))
+
+    def _batch_write_chunk(self, table_name, requests):
+        """One BatchWriteItem, resending UnprocessedItems with backoff"""
+        client = self.dynamo_client.meta.client
+        pending = {table_name: requests}
+        for attempt in range(self.BATCH_MAX_ATTEMPTS):
+            response = client.batch_write_item(RequestItems=pending)
+            pending = response.get('UnprocessedItems') or {}
+            if not pending:
+                return
+            self._backoff(attempt)
+        raise BatchIncompleteError('batch_write', table_name, len(pending[table_name]))
+
+    def _run_chunks(self, operation, chunks):
+        """Run operation over the chunks, in parallel when there is more than one.
+        Uses the low-level client, which unlike the resource is safe to share across threads."""
+        if len(chunks) <= 1:
+            return [operation(chunk) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=min(self.BATCH_WORKERS, len(chunks))) as executor:
+            return list(executor.map(operation, chunks))
+
+    def _backoff(self, attempt):
+        # Full jitter: unprocessed items mean the table is throttling, so spread the retries out
+        time.sleep(random.uniform(0, min(self.BATCH_MAX_DELAY, self.BATCH_BASE_DELAY * 2 ** attempt)))
+
+    @staticmethod
+    def _chunks(values, size):
+        values = list(values)
+        return [values[index:index + size] for index in range(0, len(values), size)]
+
+    @staticmethod
+    def _equals(filter_key, filter_value):
+        """Expression, names and values of filter_key = filter_value for the low-level client"""
+        return '#k = :v', {'#k': filter_key}, {':v': serialize(filter_value)}
+
+    def query_page(self, table_name, filter_key, filter_value, limit=None, exclusive_start_key=None,
+                   forward=True, fields=None, index_name=None):
+        """One page of up to limit items for a key, or every page when limit is None.
+
+        Returns (items, last_evaluated_key); the key is None once the query is
+        exhausted. fields becomes a ProjectionExpression through attribute name
+        placeholders, so reserved words such as timestamp can be projected.
+        Items come from the low-level client and are converted in one pass,
+        with numbers as int or float.
+        """
+        start = time.time()
+        client = self.dynamo_client.meta.client
+        condition, names, values = self._equals(filter_key, filter_value)
+        params = {'TableName': table_name, 'KeyConditionExpression': condition, 'ScanIndexForward': forward,
+                  'ExpressionAttributeValues': values}
+        if index_name:
+            params['IndexName'] = index_name
+        if fields:
+            projected = {f"#p{index}": field for index, field in enumerate(fields)}
+            params['ProjectionExpression'] = ', '.join(projected)
+            names.update(projected)
+        params['ExpressionAttributeNames'] = names
+        if exclusive_start_key:
+            params['ExclusiveStartKey'] = serialize_item(exclusive_start_key)
+
+        items = []
+        while True:
+            if limit is not None:
+                params['Limit'] = limit - len(items)
+            response = client.query(**params)
+            items.extend(deserialize_item(item) for item in response['Items'])
+            last_key = response.get('LastEvaluatedKey')
+            # A page can stop short of Limit at DynamoDB's 1 MB cap, so keep reading until it is full
+            if not last_key or (limit is not None and len(items) >= limit):
+                self.logger.info(f'Query page of {len(items)} items from {table_name} in {time.time() - start}')
+                return items, deserialize_item(last_key) if last_key else None
+            params['ExclusiveStartKey'] = last_key
+
+    def increment_counter(self, table_name, key, counter, amount=1, attributes=None):
+        """ADD amount to a numeric counter attribute and return its new value.
+
+        One UpdateItem, so concurrent callers always get distinct values; a
+        missing counter starts from 0. attributes are SET in the same write,
+        which saves the parent item and allocates from its counter at once.
+        """
+        client = self.dynamo_client.meta.client
+        names = {'#c': counter}
+        values = {':n': serialize(amount)}
+        assignments = []
+        for index, (name, value) in enumerate((attributes or {}).items()):
+            names[f"#a{index}"] = name
+            values[f":a{index}"] = serialize(value)
+            assignments.append(f"#a{index} = :a{index}")
+        expression = 'ADD #c :n' + (' SET ' + ', '.join(assignments) if assignments else '')
+        response = client.update_item(
+            TableName=table_name,
+            Key=serialize_item(key),
+            UpdateExpression=expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='UPDATED_NEW'
+        )
+        return deserialize_item(response['Attributes'])[counter]
+
+    def put_if_newer(self, table_name, item, version_key='version'):
+        """Put item unless the stored item has the same or a higher version.
+        Returns False when the condition failed and nothing was written."""
+        client = self.dynamo_client.meta.client
+        try:
+            client.put_item(
+                TableName=table_name,
+                Item=serialize_item(item),
+                ConditionExpression='attribute_not_exists(#v) OR #v < :v',
+                ExpressionAttributeNames={'#v': version_key},
+                ExpressionAttributeValues={':v': serialize(item[version_key])}
+            )
+            return True
+        except Exception as err:  # pylint: disable=W0703
+            if getattr(err, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            self.logger.info(f"Skipped put to {table_name}: a version at or above {item[version_key]} is stored")
+            return False
+
+    def put_all_if_newer(self, table_name, items, version_key='version'):
+        """put_if_newer for many items, in parallel; returns whether each was written"""
+        results = self._run_chunks(
+            lambda chunk: [self.put_if_newer(table_name, item, version_key) for item in chunk],
+            self._chunks(items, 1)
+        )
+        return [written for chunk in results for written in chunk]
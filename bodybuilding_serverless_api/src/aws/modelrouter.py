@@ -0,0 +1,122 @@
+"""Task-based routing of Bedrock calls to the cheapest model that handles the task"""
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+NOVA_MICRO = "us.amazon.nova-micro-v1:0"
+NOVA_LITE = "us.amazon.nova-lite-v1:0"
+NOVA_PRO = "us.amazon.nova-pro-v1:0"
+CLAUDE_SONNET = "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
+
+INTENT_ANALYSIS = "intentAnalysis"
+FOUNDATION = "foundation"
+COMPONENT = "component"
+PROBLEM_SETS = "problemSets"
+JSON_REPAIR = "jsonRepair"
+TIER_UPDATES = {1: "tier1Update", 2: "tier2Update", 3: "tier3Update"}
+
+# Short classification and small edits go to the small models; whole-component generation stays on Pro.
+# Any route can be pointed at another model, including CLAUDE_SONNET, per stage via modelRoutes in config.<stage>.json.
+DEFAULT_ROUTES = {
+    INTENT_ANALYSIS: NOVA_MICRO,
+    JSON_REPAIR: NOVA_MICRO,
+    TIER_UPDATES[1]: NOVA_LITE,
+    TIER_UPDATES[2]: NOVA_PRO,
+    TIER_UPDATES[3]: NOVA_PRO,
+    FOUNDATION: NOVA_PRO,
+    COMPONENT: NOVA_PRO,
+    PROBLEM_SETS: NOVA_PRO
+}
+
+
+def route_env_var(task: str) -> str:
+    """Environment variable that overrides a route, e.g. tier1Update -> MODEL_ROUTE_TIER1_UPDATE"""
+    snake = ''.join(f"_{char}" if char.isupper() else char for char in task)
+    return f"MODEL_ROUTE_{snake.upper()}"
+
+
+def tier_update_task(tier: Any) -> str:
+    """Route for a chat update of the given tier; unknown tiers get the most capable update route"""
+    try:
+        return TIER_UPDATES.get(int(tier), TIER_UPDATES[3])
+    except (TypeError, ValueError):
+        return TIER_UPDATES[3]
+
+
+class ModelRouter:
+    """Picks the Bedrock model for each task type and keeps per-route latency and parse-failure stats.
+
+    Routes come from DEFAULT_ROUTES, overridden per stage by MODEL_ROUTE_<TASK>
+    environment variables (serverless.yml fills them from modelRoutes in
+    config.<stage>.json). stats() shows whether a cheaper model is keeping up:
+    a route whose parse failures climb should be moved back to a larger model.
+    """
+
+    MAX_SAMPLES = 200
+
+    _instance: Optional['ModelRouter'] = None
+
+    def __init__(self, logger, routes: Optional[Dict[str, str]] = None):
+        self.logger = logger
+        self.routes = dict(DEFAULT_ROUTES)
+        for task in DEFAULT_ROUTES:
+            override = os.environ.get(route_env_var(task))
+            if override:
+                self.routes[task] = override
+        self.routes.update(routes or {})
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def get_instance(cls, logger) -> 'ModelRouter':
+        """Get or create the process-wide router"""
+        if cls._instance is None:
+            cls._instance = ModelRouter(logger)
+        return cls._instance
+
+    def model_for(self, task: str) -> str:
+        """Model id for a task type, falling back to the component route for unknown tasks"""
+        return self.routes.get(task, self.routes[COMPONENT])
+
+    def record(self, task: str, request_params: Dict[str, Any], meta: Optional[Dict[str, Any]]) -> None:
+        """Add one Bedrock response to the task's route stats; cache hits are not counted"""
+        if not meta or meta.get('cached'):
+            return
+        with self._lock:
+            route = self._stats.setdefault(task, {'calls': 0, 'parse_failures': 0, 'latencies': [], 'models': {}})
+            route['calls'] += 1
+            model_id = request_params.get('modelId', '')
+            route['models'][model_id] = route['models'].get(model_id, 0) + 1
+            if meta.get('parseError'):
+                route['parse_failures'] += 1
+            if meta.get('latencyMs') is not None:
+                route['latencies'] = (route['latencies'] + [int(meta['latencyMs'])])[-self.MAX_SAMPLES:]
+
+    def observer(self, task: str) -> Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]:
+        """Callback for RetryPolicy.execute(on_response=...) that records against the task's route"""
+        return lambda request_params, meta: self.record(task, request_params, meta)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-route model, call count, parse failure rate and p50/p95 latency in milliseconds"""
+        with self._lock:
+            routes = {task: dict(route, latencies=sorted(route['latencies']), models=dict(route['models']))
+                      for task, route in self._stats.items()}
+        return {
+            task: {
+                'model': self.model_for(task),
+                'calls': route['calls'],
+                'models': route['models'],
+                'parse_failures': route['parse_failures'],
+                'parse_failure_rate': route['parse_failures'] / route['calls'] if route['calls'] else 0.0,
+                'p50_latency_ms': self._percentile(route['latencies'], 0.5),
+                'p95_latency_ms': self._percentile(route['latencies'], 0.95)
+            }
+            for task, route in routes.items()
+        }
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> Optional[int]:
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(fraction * len(samples)) - 1)]
@@ -0,0 +1,84 @@
+"""Bedrock prompt caching: cachePoint placement and cache token accounting"""
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+# Model families that accept cachePoint blocks, with the minimum prefix (in tokens) they will cache
+PROMPT_CACHE_MIN_TOKENS = {
+    'anthropic.claude-3-5-haiku': 2048,
+    'anthropic.claude-3-7-sonnet': 1024,
+    'anthropic.claude-sonnet-4': 1024,
+    'anthropic.claude-opus-4': 1024,
+    'amazon.nova-micro': 1024,
+    'amazon.nova-lite': 1024,
+    'amazon.nova-pro': 1024,
+    'amazon.nova-premier': 1024
+}
+
+# Rough characters per token for English prose and pretty-printed JSON
+CHARS_PER_TOKEN = 4
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+USAGE_FIELDS = ('inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens')
+
+
+def prompt_cache_min_tokens(model_id: str) -> Optional[int]:
+    """Minimum cacheable prefix for the model, or None when it does not support prompt caching"""
+    if os.environ.get('BEDROCK_PROMPT_CACHE', 'on').lower() in ('off', 'false', '0'):
+        return None
+    for family, min_tokens in PROMPT_CACHE_MIN_TOKENS.items():
+        if family in (model_id or ''):
+            return min_tokens
+    return None
+
+
+def build_system_blocks(model_id: str, static_prompt: Dict[str, str], dynamic_prompt: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """System blocks with the static prefix first, a cachePoint after it when worthwhile, then per-request text.
+
+    The cachePoint is only emitted when the model supports it and the static
+    prefix is long enough to be cached; below the minimum Bedrock ignores it.
+    """
+    blocks: List[Dict[str, Any]] = [static_prompt]
+    min_tokens = prompt_cache_min_tokens(model_id)
+    if min_tokens and len(static_prompt.get("text", "")) // CHARS_PER_TOKEN >= min_tokens:
+        blocks.append(dict(CACHE_POINT))
+    if dynamic_prompt and dynamic_prompt.get("text"):
+        blocks.append(dynamic_prompt)
+    return blocks
+
+
+class PromptCacheUsage:
+    """Process-wide token counters split into uncached, cache-read and cache-write input"""
+
+    _instance: Optional['PromptCacheUsage'] = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.models: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def get_instance(cls) -> 'PromptCacheUsage':
+        """Get or create the process-wide usage counters"""
+        if cls._instance is None:
+            cls._instance = PromptCacheUsage()
+        return cls._instance
+
+    def record(self, model_id: str, usage: Optional[Dict[str, Any]]) -> None:
+        """Add the usage block of a converse or converse_stream response"""
+        if not usage:
+            return
+        with self._lock:
+            counters = self.models.setdefault(model_id, {field: 0 for field in USAGE_FIELDS + ('calls',)})
+            counters['calls'] += 1
+            for field in USAGE_FIELDS:
+                counters[field] += int(usage.get(field) or 0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model counters with the share of input tokens served from the prompt cache"""
+        with self._lock:
+            models = {model_id: dict(counters) for model_id, counters in self.models.items()}
+        for counters in models.values():
+            total_input = counters['inputTokens'] + counters['cacheReadInputTokens'] + counters['cacheWriteInputTokens']
+            counters['cache_read_ratio'] = counters['cacheReadInputTokens'] / total_input if total_input else 0.0
+        return models
@@ -12,22 +12,32 @@ try:
     from services.chat.orchestration.plan_orchestrator import PlanOrchestrator
     from utils.response_builder import build_response
     from utils.request_validator import validate_request
+    from utils.pagination import parse_page_request, encode_cursor, PageRequestError
+    from utils.loggers.applogger import AppLogger
+    from aws.dynamomanager import DynamoManager
 except ImportError:
     try:
         # Try with src prefix
         from src.services.chat.orchestration.plan_orchestrator import PlanOrchestrator
         from src.utils.response_builder import build_response
         from src.utils.request_validator import validate_request
+        from src.utils.pagination import parse_page_request, encode_cursor, PageRequestError
+        from src.utils.loggers.applogger import AppLogger
+        from src.aws.dynamomanager import DynamoManager
     except ImportError:
         # Last resort - direct relative imports
         from .services.chat.orchestration.plan_orchestrator import PlanOrchestrator
         from .utils.response_builder import build_response
         from .utils.request_validator import validate_request
+        from .utils.pagination import parse_page_request, encode_cursor, PageRequestError
+        from .utils.loggers.applogger import AppLogger
+        from .aws.dynamomanager import DynamoManager
 
 
 
 
 plan_orchestrator = PlanOrchestrator()
+dynamo_manager = DynamoManager(AppLogger(__name__))
 
 def chat_with_coach(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -59,17 +69,33 @@ def chat_with_coach(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
 def get_chat_history(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
-    Handler for retrieving chat history for a plan
+    Handler for retrieving chat history for a plan, oldest first unless order=desc;
+    supports limit, cursor, order and fields query parameters
     """
     try:
         plan_id = event['pathParameters']['planId']
         user_id = event['requestContext']['authorizer']['claims']['sub']
+        page = parse_page_request(event)
         
-        result = plan_orchestrator.get_chat_history(
-            user_id=user_id,
-            plan_id=plan_id
+        # History is keyed by user and plan, so the query only ever sees the caller's messages
+        history_key = f"{user_id}_{plan_id}"
+        page.check_cursor('userId_planId', history_key)
+        
+        messages, last_key = dynamo_manager.query_page(
+            os.environ['CHAT_HISTORY_TABLE'],
+            'userId_planId',
+            history_key,
+            limit=page.limit,
+            exclusive_start_key=page.cursor,
+            forward=page.forward(),
+            fields=page.fields
         )
         
-        return build_response(200, result)
+        return build_response(200, {
+            "chatHistory": messages,
+            "nextCursor": encode_cursor(last_key)
+        })
+    except PageRequestError as e:
+        return build_response(400, {'error': str(e)})
     except Exception as e:
         return build_response(500, {'error': str(e)}) 
\ No newline at end of file
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+from typing import Dict, Any, Awaitable, Callable
+
+# Add the current directory to the Python path to enable imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+try:
+    from services.service_factory import ServiceFactory
+    from services.job_service import JobService, CREATE_PLAN
+    from utils.loggers.applogger import AppLogger
+    from utils.response_builder import build_response
+    from utils.request_validator import validate_request
+except ImportError:
+    try:
+        # Try with src prefix
+        from src.services.service_factory import ServiceFactory
+        from src.services.job_service import JobService, CREATE_PLAN
+        from src.utils.loggers.applogger import AppLogger
+        from src.utils.response_builder import build_response
+        from src.utils.request_validator import validate_request
+    except ImportError:
+        # Last resort - direct relative imports
+        from .services.service_factory import ServiceFactory
+        from .services.job_service import JobService, CREATE_PLAN
+        from .utils.loggers.applogger import AppLogger
+        from .utils.response_builder import build_response
+        from .utils.request_validator import validate_request
+
+
+logger = AppLogger(__name__)
+job_service = JobService.get_instance(logger)
+
+
+async def run_create_plan(request: Dict[str, Any], progress: Callable[[str, Any], Awaitable[None]]) -> Dict[str, Any]:
+    """
+    Job runner: the same PlanService.create_plan path as /plans/create,
+    reporting the plan and its first version as each is saved
+    """
+    plan_service = ServiceFactory.get_instance().plan_service
+    return await plan_service.create_plan(
+        user_id=request['userId'], request_data=request['planData'], progress=progress
+    )
+
+
+job_service.register(CREATE_PLAN, run_create_plan)
+
+
+def create_plan_job(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handler that queues plan creation and returns its job id at once
+    """
+    try:
+        body = json.loads(event.get('body', '{}'))
+        validate_request(body, 'create_plan')
+
+        user_id = event['requestContext']['authorizer']['claims']['sub']
+
+        job = job_service.submit(user_id, CREATE_PLAN, {'userId': user_id, 'planData': body})
+
+        return build_response(202, {'jobId': job['jobId'], 'status': job['status']})
+    except Exception as e:
+        return build_response(500, {'error': str(e)})
+
+
+def get_job(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handler for polling a job's status, progress and partial results
+    """
+    try:
+        job_id = event['pathParameters']['jobId']
+        user_id = event['requestContext']['authorizer']['claims']['sub']
+
+        job = job_service.get(job_id, owner=user_id)
+        if job is None:
+            return build_response(404, {'error': 'Job not found'})
+
+        return build_response(200, job_service.status_view(job))
+    except Exception as e:
+        return build_response(500, {'error': str(e)})
+
+
+def process_jobs(event: Dict[str, Any], context: Any) -> None:
+    """
+    SQS-triggered worker that runs queued jobs
+    """
+    job_service.process_records(event.get('Records', []))
@@ -14,6 +14,7 @@ try:
     from services.service_factory import ServiceFactory
     from utils.response_builder import build_response
     from utils.request_validator import validate_request
+    from utils.pagination import parse_page_request, encode_cursor, PageRequestError
 except ImportError:
     print("plan handler import error")
     try:
@@ -21,11 +22,13 @@ except ImportError:
         from src.services.service_factory import ServiceFactory
         from src.utils.response_builder import build_response
         from src.utils.request_validator import validate_request
+        from src.utils.pagination import parse_page_request, encode_cursor, PageRequestError
     except ImportError:
         # Last resort - direct relative imports
         from .services.service_factory import ServiceFactory
         from .utils.response_builder import build_response
         from .utils.request_validator import validate_request
+        from .utils.pagination import parse_page_request, encode_cursor, PageRequestError
 
 
 # Get the PlanService instance from the ServiceFactory
@@ -46,7 +49,7 @@ async def create_plan(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         user_id = event['requestContext']['authorizer']['claims']['sub']
         
         # Delegate to service layer
-        result = await plan_service.create_plan(user_id=user_id, plan_data=body)
+        result = await plan_service.create_plan(user_id=user_id, request_data=body)
         
         return build_response(200, result)
     except Exception as e:
@@ -66,7 +69,7 @@ async def save_plan(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         result = await plan_service.update_plan(
             user_id=user_id,
             plan_id=plan_id,
-            plan_data=body
+            updates=body
         )
         
         return build_response(200, result)
@@ -89,14 +92,28 @@ async def get(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
 async def list_plans(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
-    Handler for listing all plans for a user
+    Handler for listing all plans for a user; supports limit, cursor, order and fields query parameters.
+    Every response is {"plans", "nextCursor"}; without limit or cursor it holds every plan and no cursor.
     """
     try:
         user_id = event['requestContext']['authorizer']['claims']['sub']
+        page = parse_page_request(event)
+        page.check_cursor('userId', user_id)
+
+        plans, last_key = await plan_service.list_plans_page(
+            user_id=user_id,
+            limit=page.limit,
+            cursor=page.cursor,
+            forward=page.forward(),
+            fields=page.fields
+        )
         
-        result = await plan_service.list_plans(user_id=user_id)
-        
-        return build_response(200, result)
+        return build_response(200, {
+            "plans": plans,
+            "nextCursor": encode_cursor(last_key)
+        })
+    except PageRequestError as e:
+        return build_response(400, {'error': str(e)})
     except Exception as e:
         return build_response(500, {'error': str(e)})
 
@@ -119,18 +136,31 @@ async def delete(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
 async def get_plan_versions(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
-    Handler for retrieving all versions of a specific plan
+    Handler for retrieving all versions of a specific plan, oldest first unless order=desc;
+    supports limit, cursor, order and fields query parameters
     """
     try:
         plan_id = event['pathParameters']['planId']
         user_id = event['requestContext']['authorizer']['claims']['sub']
+        page = parse_page_request(event)
+        page.check_cursor('planId', plan_id)
         
-        result = await plan_service.get_plan_versions(user_id=user_id, plan_id=plan_id)
+        result, last_key = await plan_service.get_plan_versions_page(
+            user_id=user_id,
+            plan_id=plan_id,
+            limit=page.limit,
+            cursor=page.cursor,
+            forward=page.forward(),
+            fields=page.fields
+        )
         
         return build_response(200, {
             "versions": result,
-            "totalVersions": len(result)
+            "totalVersions": len(result),
+            "nextCursor": encode_cursor(last_key)
         })
+    except PageRequestError as e:
+        return build_response(400, {'error': str(e)})
     except Exception as e:
         return build_response(500, {'error': str(e)})
 
@@ -5,12 +5,14 @@ import json
 try:
     from services.chat.generators.chat_generator import ChatGenerator
     from services.chat.prompts.chat_prompt_builder import ChatPromptBuilder
+    from services.shared.checkpoint_store import CheckpointStore, Checkpoint
     from utils.loggers.applogger import AppLogger
     from aws.bedrockmanager import BedrockManager
 except ImportError:
     print("plan orchestrator import error")
     from src.services.chat.generators.chat_generator import ChatGenerator
     from src.services.chat.prompts.chat_prompt_builder import ChatPromptBuilder
+    from src.services.shared.checkpoint_store import CheckpointStore, Checkpoint
     from src.utils.loggers.applogger import AppLogger
     from src.aws.bedrockmanager import BedrockManager
 
@@ -21,23 +23,28 @@ class PlanOrchestrator:
         self.bedrock = BedrockManager(self.logger)
         self.chat_generator = ChatGenerator(self.bedrock, self.logger)
         self.prompt_builder = ChatPromptBuilder()
+        self.checkpoints = CheckpointStore.get_instance(self.logger)
         
-    async def process_chat_update(self, message: str, components: List[str], current_plan: Dict[str, Any], tier: int, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_chat_update(self, message: str, components: List[str], current_plan: Dict[str, Any], tier: int, context: Dict[str, Any], generation_id: Optional[str] = None) -> Dict[str, Any]:
         try:
             # Phase 1: Validate and prepare
             self._validate_components(components, current_plan)
             enriched_context = self._enrich_context(context, current_plan)
+            # Components updated by an earlier attempt with the same idempotency key and inputs
+            checkpoint = await self.checkpoints.open(generation_id, {
+                'message': message, 'components': components, 'current_plan': current_plan, 'tier': tier, 'context': context
+            })
             
             # Phase 2: Handle foundation components
             if self._needs_foundation_update(components):
-                updated_plan = await self._handle_foundation_update(message=message, current_plan=current_plan, context=enriched_context)
+                updated_plan = await self._handle_foundation_update(message=message, current_plan=current_plan, context=enriched_context, checkpoint=checkpoint)
             else:
                 updated_plan = current_plan.copy()
             
             # Phase 3: Update remaining components
             remaining = self._get_remaining_components(components)
             if remaining:
-                component_updates = await self._update_components(message=message, components=remaining, current_plan=updated_plan, tier=tier, context=enriched_context)
+                component_updates = await self._update_components(message=message, components=remaining, current_plan=updated_plan, tier=tier, context=enriched_context, checkpoint=checkpoint)
                 updated_plan.update(component_updates)
             
             return updated_plan
@@ -79,18 +86,21 @@ class PlanOrchestrator:
         foundation_components = {'trainingContext', 'fitnessGoals', 'progressMetrics'}
         return any(comp in foundation_components for comp in components)
         
-    async def _handle_foundation_update(self, message: str, current_plan: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_foundation_update(self, message: str, current_plan: Dict[str, Any], context: Dict[str, Any], checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
         """Handle updates to foundation components"""
         foundation_components = ['trainingContext', 'fitnessGoals', 'progressMetrics']
+        checkpoint = checkpoint or Checkpoint(None, None)
         tasks = []
+        updated_plan = current_plan.copy()
         
         for component in foundation_components:
-            if component in current_plan:
+            if component in checkpoint:
+                updated_plan[component] = checkpoint.get(component)
+            elif component in current_plan:
                 task = self.chat_generator.update_component(message=message, component=component, current_content=current_plan[component], context=context)
                 tasks.append((component, task))
         
         # Execute updates in parallel
-        updated_plan = current_plan.copy()
         results = await asyncio.gather(*[task for _, task in tasks], return_exceptions=True)
         
         for (component, _), result in zip(tasks, results):
@@ -98,6 +108,7 @@ class PlanOrchestrator:
                 self.logger.error(f"Error updating {component}: {str(result)}")
             else:
                 updated_plan[component] = result[component]
+                await checkpoint.save(component, result[component])
         
         return updated_plan
         
@@ -106,17 +117,20 @@ class PlanOrchestrator:
         foundation_components = {'trainingContext', 'fitnessGoals', 'progressMetrics'}
         return [comp for comp in components if comp not in foundation_components]
         
-    async def _update_components(self, message: str, components: List[str], current_plan: Dict[str, Any], tier: int, context: Dict[str, Any]) -> Dict[str, Any]:
-        """Update specified components in parallel"""
+    async def _update_components(self, message: str, components: List[str], current_plan: Dict[str, Any], tier: int, context: Dict[str, Any], checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
+        """Update specified components in parallel, skipping those already checkpointed"""
+        checkpoint = checkpoint or Checkpoint(None, None)
         tasks = []
+        updates = {}
         
         for component in components:
-            if component in current_plan:
+            if component in checkpoint:
+                updates[component] = checkpoint.get(component)
+            elif component in current_plan:
                 task = self.chat_generator.update_component(message=message, component=component, current_content=current_plan[component], context=context, tier=tier)
                 tasks.append((component, task))
         
         # Execute updates in parallel
-        updates = {}
         results = await asyncio.gather(*[task for _, task in tasks], return_exceptions=True)
         
         for (component, _), result in zip(tasks, results):
@@ -124,6 +138,7 @@ class PlanOrchestrator:
                 self.logger.error(f"Error updating {component}: {str(result)}")
             else:
                 updates[component] = result[component]
+                await checkpoint.save(component, result[component])
         
         return updates
         
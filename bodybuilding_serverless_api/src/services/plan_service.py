@@ -1,28 +1,42 @@
-from typing import Dict, List, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
+import asyncio
 import json
 import uuid
 import os
 from boto3.dynamodb.conditions import Key
 
+try:
+    from aws.dynamomanager import DynamoManager
+    from utils.loggers.applogger import AppLogger
+except ImportError:
+    from src.aws.dynamomanager import DynamoManager
+    from src.utils.loggers.applogger import AppLogger
+
+logger = AppLogger(__name__)
+
+
 class PlanService:
     def __init__(self, dynamodb_client, bedrock_manager):
         self.dynamodb_client = dynamodb_client
         self.bedrock_manager = bedrock_manager
-        self.table_name = "bodybuilding-plans"
+        self.dynamo_manager = DynamoManager(logger)
+        self.table_name = os.environ.get('PLANS_TABLE', 'bodybuildr-plans-table')
         self.versions_table_name = os.environ.get('PLAN_VERSIONS_TABLE', 'bodybuildr-planversions')
 
-    async def create_plan(self, user_id: str, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_plan(self, user_id: str, request_data: Dict[str, Any],
+                          progress: Optional[Callable[[str, Any], Awaitable[None]]] = None) -> Dict[str, Any]:
         """
         Creates a new workout plan based on user requirements and preferences.
+        progress, when given, is awaited with each step as soon as it is saved.
         """
         plan_id = str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
 
         # Initialize the base plan structure
         plan = {
-            "plan_id": plan_id,
-            "user_id": user_id,
+            "planId": plan_id,
+            "userId": user_id,
             "created_at": timestamp,
             "updated_at": timestamp,
             "status": "draft",
@@ -43,41 +57,48 @@ class PlanService:
 
         # Save the initial plan
         await self._save_plan(plan)
-        
+        if progress:
+            await progress('plan', plan)
+
         # Save initial version
-        await self._save_plan_version(plan_id, user_id, plan)
-        
+        version = await self._save_plan_version(plan_id, user_id, plan)
+        if progress:
+            await progress('version', version)
+
         return plan
 
     async def get_plan(self, plan_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """
-        Retrieves a specific workout plan.
+        Retrieves a specific workout plan, or None when the user has no such plan.
         """
-        response = await self.dynamodb_client.get_item(
-            TableName=self.table_name,
-            Key={
-                "plan_id": {"S": plan_id},
-                "user_id": {"S": user_id}
-            }
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, self.dynamo_manager.get_item, self.table_name, {"userId": user_id, "planId": plan_id}
         )
-        return response.get("Item")
 
     async def update_plan(self, plan_id: str, user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Updates an existing workout plan with new information.
+        Updates an existing workout plan with new information and returns it
+        as a plain dict: the stored plan from get_plan with the changes on top.
         """
         existing_plan = await self.get_plan(plan_id, user_id)
         if not existing_plan:
             raise ValueError(f"Plan {plan_id} not found")
 
         # Update the plan with new data
-        updated_plan = {**existing_plan}
-        updated_plan.update(updates)
-        updated_plan["updated_at"] = datetime.utcnow().isoformat()
-        updated_plan["version"] += 1
+        changes = {key: value for key, value in updates.items() if key not in ("planId", "userId", "version")}
+        changes["updated_at"] = datetime.utcnow().isoformat()
 
-        # Save the updated plan to the main table
-        await self._save_plan(updated_plan)
+        # Save the changes to the main table and take the next version number in one UpdateItem,
+        # so concurrent updates never share a version
+        loop = asyncio.get_event_loop()
+        version = await loop.run_in_executor(
+            None,
+            lambda: self.dynamo_manager.increment_counter(
+                self.table_name, {"userId": user_id, "planId": plan_id}, "version", attributes=changes
+            )
+        )
+        updated_plan = {**existing_plan, **changes, "version": version}
         
         # Save a new version to the versions table
         await self._save_plan_version(plan_id, user_id, updated_plan)
@@ -97,23 +118,17 @@ class PlanService:
             # Get all versions
             versions = await self.get_plan_versions(user_id, plan_id)
             
-            # Delete all versions from versions table
-            for version in versions:
-                await self.dynamodb_client.delete_item(
-                    TableName=self.versions_table_name,
-                    Key={
-                        "planId": {"S": plan_id},
-                        "version": {"N": str(version.get('version', 1))}
-                    }
-                )
+            # Delete all versions from versions table, 25 per BatchWriteItem
+            version_keys = [
+                {"planId": plan_id, "version": self._version_number(version)}
+                for version in versions
+            ]
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.dynamo_manager.batch_delete, self.versions_table_name, version_keys)
                 
             # Delete main plan record
-            await self.dynamodb_client.delete_item(
-                TableName=self.table_name,
-                Key={
-                    "plan_id": {"S": plan_id},
-                    "user_id": {"S": user_id}
-                }
+            await loop.run_in_executor(
+                None, self.dynamo_manager.delete_item, {"userId": user_id, "planId": plan_id}, self.table_name
             )
             
             return True
@@ -122,25 +137,44 @@ class PlanService:
             print(f"Error deleting plan: {str(err)}")
             raise
 
-    async def list_plans(self, user_id: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _version_number(version: Dict[str, Any]) -> int:
+        """Version number of a versions table item, typed ({"N": "3"}) or plain"""
+        number = version.get('version', 1)
+        if isinstance(number, dict):
+            number = number.get('N', 1)
+        return int(number)
+
+    async def list_plans(self, user_id: str, forward: bool = True, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Lists all workout plans for a user.
         """
-        response = await self.dynamodb_client.query(
-            TableName=self.table_name,
-            KeyConditionExpression="user_id = :uid",
-            ExpressionAttributeValues={":uid": {"S": user_id}}
+        plans, _ = await self.list_plans_page(user_id, forward=forward, fields=fields)
+        return plans
+
+    async def list_plans_page(self, user_id: str, limit: Optional[int] = None, cursor: Optional[Dict[str, Any]] = None,
+                              forward: bool = True, fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Lists one page of a user's workout plans and the key to continue from.
+        Every page is read when limit and cursor are both None.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.dynamo_manager.query_page(
+                self.table_name, "userId", user_id,
+                limit=limit, exclusive_start_key=cursor, forward=forward, fields=fields
+            )
         )
-        return response.get("Items", [])
 
     async def _save_plan(self, plan: Dict[str, Any]) -> None:
         """
         Internal method to save a plan to DynamoDB.
         """
-        await self.dynamodb_client.put_item(
-            TableName=self.table_name,
-            Item=plan
-        )
+        loop = asyncio.get_event_loop()
+        written = await loop.run_in_executor(None, self.dynamo_manager.put_if_newer, self.table_name, plan)
+        if not written:
+            raise ValueError(f"Version {plan['version']} of plan {plan['planId']} already exists")
         
     async def _save_plan_version(self, plan_id: str, user_id: str, plan_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -167,11 +201,13 @@ class PlanService:
                 'limitations': plan_data.get('limitations', [])
             }
             
-            # Save version to versions table
-            await self.dynamodb_client.put_item(
-                TableName=self.versions_table_name,
-                Item=version_item
+            # Save version to versions table; the condition refuses to overwrite an existing version
+            loop = asyncio.get_event_loop()
+            written = await loop.run_in_executor(
+                None, self.dynamo_manager.put_if_newer, self.versions_table_name, version_item
             )
+            if not written:
+                raise ValueError(f"Version {version_number} of plan {plan_id} already exists")
             
             return version_item
             
@@ -183,24 +219,32 @@ class PlanService:
         """
         Get all versions of a plan after verifying access
         """
+        versions, _ = await self.get_plan_versions_page(user_id, plan_id)
+        return versions
+
+    async def get_plan_versions_page(self, user_id: str, plan_id: str, limit: Optional[int] = None,
+                                     cursor: Optional[Dict[str, Any]] = None, forward: bool = True,
+                                     fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Get one page of a plan's versions after verifying access. version is the
+        table's sort key, so versions come back in version order.
+        """
         try:
             # Verify access by checking if the plan exists for this user
             existing_plan = await self.get_plan(plan_id, user_id)
             if not existing_plan:
-                return []
+                return [], None
                 
             # Query the versions table
-            response = await self.dynamodb_client.query(
-                TableName=self.versions_table_name,
-                KeyConditionExpression="planId = :pid",
-                ExpressionAttributeValues={":pid": {"S": plan_id}}
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None,
+                lambda: self.dynamo_manager.query_page(
+                    self.versions_table_name, "planId", plan_id,
+                    limit=limit, exclusive_start_key=cursor, forward=forward, fields=fields
+                )
             )
             
-            versions = response.get('Items', [])
-            
-            # Sort by version number
-            return sorted(versions, key=lambda x: x.get('version', 0))
-            
         except Exception as err:
             print(f"Error retrieving plan versions: {str(err)}")
             raise
@@ -210,8 +254,9 @@ class PlanService:
         Get the latest version of a plan
         """
         try:
-            versions = await self.get_plan_versions(user_id, plan_id)
-            return versions[-1] if versions else None
+            # version is the table's sort key, so the latest is the first item in descending order
+            versions, _ = await self.get_plan_versions_page(user_id, plan_id, limit=1, forward=False)
+            return versions[0] if versions else None
         except Exception as err:
             print(f"Error retrieving latest version: {str(err)}")
             raise 
\ No newline at end of file
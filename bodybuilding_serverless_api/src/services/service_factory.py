@@ -17,6 +17,7 @@ try:
     from .chat_service import ChatService
     from .progress_service import ProgressService
     from ..aws.bedrockmanager import BedrockManager
+    from ..utils.loggers.applogger import AppLogger
 except ImportError:
     try:
         print("service factory import error, trying absolute imports")
@@ -24,6 +25,7 @@ except ImportError:
         from src.services.chat_service import ChatService
         from src.services.progress_service import ProgressService
         from src.aws.bedrockmanager import BedrockManager
+        from src.utils.loggers.applogger import AppLogger
     except ImportError:
         # Fallback to direct imports (for when imported from handlers)
         print("service factory import error, using fallback imports")
@@ -31,6 +33,7 @@ except ImportError:
         from services.chat_service import ChatService
         from services.progress_service import ProgressService
         from aws.bedrockmanager import BedrockManager
+        from utils.loggers.applogger import AppLogger
 
 
 
@@ -42,7 +45,7 @@ class ServiceFactory:
     def __init__(self):
         # Initialize AWS clients
         self.dynamodb = boto3.client('dynamodb')
-        self.bedrock_manager = BedrockManager()
+        self.bedrock_manager = BedrockManager(AppLogger(__name__))
         
         # Initialize services
         self._plan_service = None
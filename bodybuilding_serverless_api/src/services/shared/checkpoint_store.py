@@ -0,0 +1,151 @@
+# serverless-api/src/services/shared/checkpoint_store.py
+from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+import boto3
+
+
+def input_hash(inputs: Dict[str, Any]) -> str:
+    """Canonical hash of a generation's inputs"""
+    payload = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Checkpoint:
+    """The completed components of one generation, saved as each one finishes"""
+
+    def __init__(self, store: Optional['CheckpointStore'], key: Optional[str], completed: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.key = key
+        self.completed = completed or {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.key is not None
+
+    def __contains__(self, component: str) -> bool:
+        return component in self.completed
+
+    def get(self, component: str) -> Any:
+        """A component restored from an earlier attempt, or None"""
+        return self.completed.get(component)
+
+    async def save(self, component: str, value: Any) -> None:
+        """Persist one finished component; no-op without a generation id"""
+        self.completed[component] = value
+        if self.enabled:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.store.save, self.key, component, value)
+
+
+class CheckpointStore:
+    """Per-component checkpoints so a retried generation only redoes what is missing.
+
+    A generation is identified by the client's idempotency key plus a hash of
+    its inputs, so the same key with different inputs starts fresh. Components
+    are written to DynamoDB (CHECKPOINT_TABLE) as they finish and expire through
+    its TTL; without a table they are kept in memory, which still covers retries
+    that land on the same warm container. Checkpoint errors are logged and never
+    fail the generation.
+    """
+
+    DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+    _instance: Optional['CheckpointStore'] = None
+
+    def __init__(self, logger, table_name: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        self.logger = logger
+        self.table_name = table_name if table_name is not None else os.environ.get('CHECKPOINT_TABLE')
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('CHECKPOINT_TTL_SECONDS', self.DEFAULT_TTL_SECONDS))
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._tables = threading.local()
+
+    @classmethod
+    def get_instance(cls, logger) -> 'CheckpointStore':
+        """Get or create the process-wide checkpoint store"""
+        if cls._instance is None:
+            cls._instance = CheckpointStore(logger)
+        return cls._instance
+
+    @staticmethod
+    def checkpoint_key(generation_id: str, inputs: Dict[str, Any]) -> str:
+        return f"{generation_id}#{input_hash(inputs)}"
+
+    async def open(self, generation_id: Optional[str], inputs: Dict[str, Any]) -> Checkpoint:
+        """The checkpoint for a generation with the components already completed;
+        without a generation id nothing is restored or saved"""
+        if not generation_id:
+            return Checkpoint(None, None)
+        key = self.checkpoint_key(generation_id, inputs)
+        loop = asyncio.get_event_loop()
+        completed = await loop.run_in_executor(None, self.load, key)
+        if completed:
+            self.logger.info(f"Resuming generation {generation_id} with {len(completed)} checkpointed components: {', '.join(completed)}")
+        return Checkpoint(self, key, completed)
+
+    def load(self, key: str) -> Dict[str, Any]:
+        """Completed components for a checkpoint key"""
+        try:
+            if self.table_name:
+                return self._shared_load(key)
+            with self._lock:
+                entries = self._memory.get(key, {})
+                return {component: json.loads(value) for component, (expires_at, value) in entries.items() if expires_at >= time.time()}
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.warning(f"Checkpoint read failed for {key}: {str(e)}")
+            return {}
+
+    def save(self, key: str, component: str, value: Any) -> None:
+        """Store one completed component"""
+        expires_at = int(time.time()) + self.ttl_seconds
+        serialized = json.dumps(value, default=str)
+        try:
+            if self.table_name:
+                self._checkpoint_table().put_item(Item={
+                    'checkpointKey': key,
+                    'component': component,
+                    'value': serialized,
+                    'expiresAt': expires_at
+                })
+            else:
+                with self._lock:
+                    self._evict_expired()
+                    self._memory.setdefault(key, {})[component] = (expires_at, serialized)
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.warning(f"Checkpoint write failed for {component}: {str(e)}")
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        for key in [key for key, entries in self._memory.items() if all(expires_at < now for expires_at, _ in entries.values())]:
+            del self._memory[key]
+
+    def _shared_load(self, key: str) -> Dict[str, Any]:
+        table = self._checkpoint_table()
+        params = {
+            'KeyConditionExpression': 'checkpointKey = :key',
+            'ExpressionAttributeValues': {':key': key}
+        }
+        completed = {}
+        while True:
+            response = table.query(**params)
+            for item in response.get('Items', []):
+                # DynamoDB TTL deletes lazily, so expired items can still be returned
+                if int(item.get('expiresAt', 0)) >= time.time():
+                    completed[item['component']] = json.loads(item['value'])
+            if 'LastEvaluatedKey' not in response:
+                return completed
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _checkpoint_table(self):
+        table = getattr(self._tables, 'checkpoints', None)
+        if table is None:
+            # Components are saved from executor threads as they finish, so each thread gets its own session
+            table = boto3.session.Session().resource('dynamodb', region_name='us-east-1').Table(self.table_name)
+            self._tables.checkpoints = table
+        return table
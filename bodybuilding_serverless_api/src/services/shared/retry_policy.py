@@ -0,0 +1,276 @@
+# serverless-api/src/services/shared/retry_policy.py
+from typing import Dict, Any, Optional, List, Callable
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+try:
+    from aws.bedrockmanager import BedrockManager, BedrockParseError
+    from aws.bedrockgovernor import BedrockBackpressureError, is_throttling_error
+    from aws.modelrouter import ModelRouter, JSON_REPAIR
+    from utils.loggers.emfmetrics import metric_labels
+except ImportError:
+    from src.aws.bedrockmanager import BedrockManager, BedrockParseError
+    from src.aws.bedrockgovernor import BedrockBackpressureError, is_throttling_error
+    from src.aws.modelrouter import ModelRouter, JSON_REPAIR
+    from src.utils.loggers.emfmetrics import metric_labels
+
+THROTTLE = "throttle"
+TRANSIENT = "transient"
+PARSE = "parse"
+SCHEMA = "schema"
+FATAL = "fatal"
+
+TRANSIENT_ERROR_NAMES = (
+    'EndpointConnectionError', 'ConnectTimeoutError', 'ReadTimeoutError',
+    'ConnectionClosedError', 'ConnectionError', 'TimeoutError',
+    'InternalServerException', 'ModelTimeoutException', 'ModelNotReadyException',
+    'ModelStreamErrorException'
+)
+
+
+def chain_observers(*observers: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]]) -> Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]:
+    """Combine on_response callbacks into one, skipping any that are None"""
+    active = [observer for observer in observers if observer]
+
+    def observe(request_params: Dict[str, Any], meta: Optional[Dict[str, Any]]) -> None:
+        for observer in active:
+            observer(request_params, meta)
+    return observe
+
+
+class SchemaValidationError(ValueError):
+    """The model returned valid JSON that is missing required keys"""
+
+    def __init__(self, missing_keys: List[str], result: Dict[str, Any]):
+        super().__init__(f"Response missing required keys: {', '.join(missing_keys)}")
+        self.missing_keys = missing_keys
+        self.result = result
+
+
+class RetryBudget:
+    """Token bucket shared by every retry in the container.
+
+    Each retry spends a token and tokens refill over time, so a burst of
+    failures degrades to failing fast instead of multiplying load on Bedrock.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_spend(self, cost: float = 1.0) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+            self._updated = now
+            if self.tokens < cost:
+                return False
+            self.tokens -= cost
+            return True
+
+
+class RetryPolicy:
+    """Classifies Bedrock failures and retries each class with its own strategy.
+
+    throttle   - full-jitter exponential backoff with a long cap
+    transient  - full-jitter exponential backoff with a short cap
+    parse      - a small repair call with only the broken text, then one full resend if that fails
+    schema     - one resend that tells the model which keys were missing
+    fatal      - raised immediately (validation, auth, backpressure)
+    """
+
+    STRATEGIES = {
+        THROTTLE: {"max_retries": 4, "base_delay": 1.0, "max_delay": 20.0, "cost": 1.0},
+        TRANSIENT: {"max_retries": 2, "base_delay": 0.5, "max_delay": 5.0, "cost": 1.0},
+        PARSE: {"max_retries": 1, "base_delay": 0.0, "max_delay": 0.0, "cost": 0.5},
+        SCHEMA: {"max_retries": 1, "base_delay": 0.0, "max_delay": 0.0, "cost": 1.0}
+    }
+    REPAIR_SYSTEM_PROMPT = (
+        "You repair malformed JSON. Return only the corrected RFC8259 compliant JSON object "
+        "with the same content. Do not add commentary or markdown."
+    )
+
+    _budget: Optional[RetryBudget] = None
+
+    def __init__(self, logger, budget: Optional[RetryBudget] = None):
+        self.logger = logger
+        self.budget = budget or self.shared_budget()
+        self.router = ModelRouter.get_instance(logger)
+
+    @classmethod
+    def shared_budget(cls) -> RetryBudget:
+        """Get or create the container-wide retry budget"""
+        if cls._budget is None:
+            cls._budget = RetryBudget(
+                capacity=float(os.environ.get('BEDROCK_RETRY_BUDGET', 20)),
+                refill_per_second=float(os.environ.get('BEDROCK_RETRY_REFILL_PER_SECOND', 0.5))
+            )
+        return cls._budget
+
+    @staticmethod
+    def classify(error: Exception) -> str:
+        """Map an exception to one of the retry classes"""
+        if isinstance(error, SchemaValidationError):
+            return SCHEMA
+        if isinstance(error, (BedrockParseError, json.JSONDecodeError)):
+            return PARSE
+        if isinstance(error, BedrockBackpressureError):
+            return FATAL
+        if is_throttling_error(error):
+            return THROTTLE
+        response = getattr(error, 'response', None)
+        code = response.get('Error', {}).get('Code') if isinstance(response, dict) else None
+        if (code or type(error).__name__) in TRANSIENT_ERROR_NAMES or isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+            return TRANSIENT
+        return FATAL
+
+    def backoff(self, kind: str, attempt: int) -> float:
+        """Full jitter: uniform between zero and the capped exponential delay"""
+        strategy = self.STRATEGIES[kind]
+        return random.uniform(0, min(strategy["max_delay"], strategy["base_delay"] * (2 ** attempt)))
+
+    async def execute(self,
+                      bedrock: BedrockManager,
+                      request_params: Dict[str, Any],
+                      required_keys: Optional[List[str]] = None,
+                      on_response: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None,
+                      validate: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """Call Bedrock, retrying according to the class of each failure.
+
+        on_response(request_params, meta) is called for every response Bedrock
+        returned, with usage, stopReason and latencyMs. Responses that failed to
+        parse are reported too, with parseError set in meta.
+
+        Responses are checked for required_keys and then passed to validate(result),
+        which should raise to reject them, before BedrockManager caches them.
+        """
+        attempts = {kind: 0 for kind in self.STRATEGIES}
+        params = request_params
+        checked = []
+
+        def check(result: Dict[str, Any], meta: Optional[Dict[str, Any]]) -> None:
+            checked.append(True)
+            if on_response:
+                on_response(params, meta)
+            self._check_result(result, required_keys, validate)
+
+        while True:
+            checked.clear()
+            try:
+                with metric_labels(retries=sum(attempts.values())):
+                    result, meta = await bedrock.make_detailed_async_call(params, validate=check)
+                # Cache hits and shared in-flight calls come back without running the check
+                if not checked:
+                    check(result, meta)
+                return result
+            except Exception as e:
+                if on_response and isinstance(e, BedrockParseError):
+                    on_response(params, dict(e.meta or {}, parseError=True))
+                kind = self.classify(e)
+                if kind == FATAL or attempts[kind] >= self.STRATEGIES[kind]["max_retries"]:
+                    raise
+                if kind == PARSE:
+                    repaired = await self._repair(bedrock, params, e, required_keys, validate)
+                    if repaired is not None:
+                        return repaired
+                if not self.budget.try_spend(self.STRATEGIES[kind]["cost"]):
+                    self.logger.warning(f"Retry budget exhausted, not retrying {kind} failure: {str(e)}")
+                    raise
+                attempts[kind] += 1
+                if kind == SCHEMA:
+                    params = self._with_correction(request_params, e.missing_keys)
+                    self.logger.warning(f"Schema failure, resending with correction: {str(e)}")
+                    continue
+                if kind == PARSE:
+                    self.logger.warning(f"JSON repair did not recover the response, resending the request: {str(e)}")
+                    continue
+                delay = self.backoff(kind, attempts[kind] - 1)
+                self.logger.warning(f"{kind.capitalize()} failure (retry {attempts[kind]}), backing off {delay:.2f}s: {str(e)}")
+                await asyncio.sleep(delay)
+
+    async def _repair(self,
+                      bedrock: BedrockManager,
+                      request_params: Dict[str, Any],
+                      error: Exception,
+                      required_keys: Optional[List[str]],
+                      validate: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Optional[Dict[str, Any]]:
+        """Recover from unparseable output without re-sending the original prompt; None if that fails"""
+        # BedrockManager has already tried the local extractor, so go straight to the model
+        content = getattr(error, 'content', None)
+        if not content:
+            return None
+        if not self.budget.try_spend(self.STRATEGIES[PARSE]["cost"]):
+            self.logger.warning("Retry budget exhausted, not attempting JSON repair call")
+            return None
+        # Rewriting broken JSON is mechanical, so it goes to the repair route rather than the original model
+        repair_params = {
+            "modelId": self.router.model_for(JSON_REPAIR),
+            "system": [{"text": self.REPAIR_SYSTEM_PROMPT}],
+            "messages": [{"role": "user", "content": [{"text": content}]}],
+            "inferenceConfig": {
+                "maxTokens": request_params.get("inferenceConfig", {}).get("maxTokens", 4000),
+                "temperature": 0
+            }
+        }
+        self.logger.warning("Bedrock returned malformed JSON, sending repair request")
+        checked = []
+
+        def check(result: Dict[str, Any], meta: Optional[Dict[str, Any]]) -> None:
+            checked.append(True)
+            self._check_result(result, required_keys, validate)
+
+        try:
+            with metric_labels(repairCall=True):
+                result, meta = await bedrock.make_detailed_async_call(repair_params, validate=check)
+            self.router.record(JSON_REPAIR, repair_params, meta)
+            # Cache hits come back without running the check
+            if not checked:
+                self._check_result(result, required_keys, validate)
+            return result
+        except BedrockParseError as e:
+            self.router.record(JSON_REPAIR, repair_params, dict(e.meta or {}, parseError=True))
+            self.logger.error(f"JSON repair call failed: {str(e)}")
+        except ValueError as e:
+            self.logger.warning(f"Repaired JSON failed validation: {str(e)}")
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.error(f"JSON repair call failed: {str(e)}")
+        return None
+
+    def _check_result(self, result: Dict[str, Any], required_keys: Optional[List[str]],
+                      validate: Optional[Callable[[Dict[str, Any]], Any]] = None) -> None:
+        self._check_schema(result, required_keys)
+        if validate:
+            validate(result)
+
+    @staticmethod
+    def _check_schema(result: Any, required_keys: Optional[List[str]]) -> None:
+        if not required_keys:
+            return
+        if not isinstance(result, dict):
+            raise SchemaValidationError(list(required_keys), {})
+        missing = [key for key in required_keys if key not in result]
+        if missing:
+            raise SchemaValidationError(missing, result)
+
+    @staticmethod
+    def _with_correction(request_params: Dict[str, Any], missing_keys: List[str]) -> Dict[str, Any]:
+        """Copy of the request with a note naming the keys the last response dropped"""
+        params = dict(request_params)
+        correction = {
+            "text": f"Your previous response was missing these required keys: {', '.join(missing_keys)}. "
+                    "Return the complete JSON object including them."
+        }
+        messages = [dict(message) for message in request_params.get("messages", [])]
+        if messages and messages[-1].get("role") == "user":
+            messages[-1]["content"] = list(messages[-1].get("content", [])) + [correction]
+        else:
+            messages.append({"role": "user", "content": [correction]})
+        params["messages"] = messages
+        return params
@@ -0,0 +1,206 @@
+# serverless-api/src/services/shared/token_budget.py
+from typing import Dict, Any, Optional, List, Callable
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+
+import boto3
+
+
+class TokenBudget:
+    """Learns maxTokens per component and tier from observed outputTokens.
+
+    The budget is a high percentile of recent output sizes plus headroom, so
+    short components stop reserving worst-case budgets and long ones stop
+    being cut off. A response that stops on max_tokens raises a floor of 1.5x
+    the budget it ran out of; the floor decays as untruncated responses come in.
+
+    Samples persist to DynamoDB (TOKEN_BUDGET_TABLE) when configured, or to a
+    JSON file in /tmp, which survives warm invocations of the same container.
+    max_tokens and record run on the event loop, so neither touches storage:
+    persisted samples are loaded by warm() on the executor, or by a background
+    thread started on first use (defaults apply until it finishes), and
+    changed entries are written by persist() on a background thread.
+    """
+
+    MIN_SAMPLES = 5
+    MAX_SAMPLES = 200
+    PERCENTILE = 0.95
+    HEADROOM = 1.2
+    TRUNCATION_BUMP = 1.5
+    FLOOR_DECAY = 0.9
+    MIN_TOKENS = 256
+    PERSIST_INTERVAL_SECONDS = 30
+
+    _instance: Optional['TokenBudget'] = None
+
+    def __init__(self, logger, table_name: Optional[str] = None, path: Optional[str] = None,
+                 max_tokens_ceiling: Optional[int] = None):
+        self.logger = logger
+        self.table_name = table_name if table_name is not None else os.environ.get('TOKEN_BUDGET_TABLE')
+        self.path = path or os.environ.get('TOKEN_BUDGET_PATH', '/tmp/token_budgets.json')
+        self.max_tokens_ceiling = max_tokens_ceiling or int(os.environ.get('TOKEN_BUDGET_MAX_TOKENS', 8000))
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self._loading = False
+        self._persisting = False
+        self._dirty = set()
+        self._last_persist = time.monotonic()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._tables = threading.local()
+
+    @classmethod
+    def get_instance(cls, logger) -> 'TokenBudget':
+        """Get or create the process-wide token budget store"""
+        if cls._instance is None:
+            cls._instance = TokenBudget(logger)
+        return cls._instance
+
+    @staticmethod
+    def budget_key(component: str, tier: Any) -> str:
+        return f"{component}#{tier}"
+
+    def max_tokens(self, component: str, tier: Any, default: int) -> int:
+        """maxTokens for the next call; the hardcoded default until enough history exists"""
+        with self._lock:
+            self._start_loading()
+            entry = self._stats.get(self.budget_key(component, tier))
+            if not entry or len(entry['samples']) < self.MIN_SAMPLES:
+                return max(default, entry['floor']) if entry else default
+            samples = sorted(entry['samples'])
+            observed = samples[min(len(samples) - 1, math.ceil(self.PERCENTILE * len(samples)) - 1)]
+            budget = max(int(observed * self.HEADROOM), entry['floor'], self.MIN_TOKENS)
+        return min(budget, self.max_tokens_ceiling)
+
+    def record(self, component: str, tier: Any, request_params: Dict[str, Any], meta: Optional[Dict[str, Any]]) -> None:
+        """Add one response's outputTokens; a max_tokens stop bumps the floor instead.
+        Only memory is updated; a due write is handed to a background thread."""
+        if not meta or meta.get('cached') or not meta.get('usage'):
+            return
+        output_tokens = int(meta['usage'].get('outputTokens') or 0)
+        budget = request_params.get('inferenceConfig', {}).get('maxTokens', output_tokens)
+        key = self.budget_key(component, tier)
+        with self._lock:
+            self._start_loading()
+            entry = self._stats.setdefault(key, {'samples': [], 'floor': 0, 'truncations': 0})
+            if meta.get('stopReason') == 'max_tokens':
+                entry['truncations'] += 1
+                entry['floor'] = min(self.max_tokens_ceiling, int(max(budget, output_tokens) * self.TRUNCATION_BUMP))
+                self.logger.warning(f"{key} truncated at {budget} tokens, raising budget floor to {entry['floor']}")
+            else:
+                entry['samples'] = (entry['samples'] + [output_tokens])[-self.MAX_SAMPLES:]
+                entry['floor'] = int(entry['floor'] * self.FLOOR_DECAY)
+            self._dirty.add(key)
+            due = meta.get('stopReason') == 'max_tokens' or time.monotonic() - self._last_persist >= self.PERSIST_INTERVAL_SECONDS
+            if due and not self._persisting:
+                self._persisting = True
+                threading.Thread(target=self._background_persist, name='token-budget-persist', daemon=True).start()
+
+    def observer(self, component: str, tier: Any) -> Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]:
+        """Callback for RetryPolicy.execute(on_response=...) that records against component and tier"""
+        return lambda request_params, meta: self.record(component, tier, request_params, meta)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Sample count, current p95 and truncation count per component and tier"""
+        with self._lock:
+            entries = {key: dict(entry) for key, entry in self._stats.items()}
+        return {
+            key: {
+                'samples': len(entry['samples']),
+                'p95': sorted(entry['samples'])[math.ceil(self.PERCENTILE * len(entry['samples'])) - 1] if entry['samples'] else None,
+                'floor': entry['floor'],
+                'truncations': entry['truncations']
+            }
+            for key, entry in entries.items()
+        }
+
+    def persist(self) -> None:
+        """Write changed entries to DynamoDB or the /tmp file; blocking, so run it off the event loop"""
+        with self._lock:
+            dirty = {key: dict(self._stats[key]) for key in self._dirty}
+            snapshot = {key: dict(entry) for key, entry in self._stats.items()}
+            self._dirty.clear()
+            self._last_persist = time.monotonic()
+        if not dirty:
+            return
+        try:
+            if self.table_name:
+                table = self._shared_table()
+                for key, entry in dirty.items():
+                    table.put_item(Item={'budgetKey': key, **entry})
+            else:
+                with open(self.path, 'w') as file:
+                    json.dump(snapshot, file)
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.warning(f"Failed to persist token budgets: {str(e)}")
+
+    async def warm(self) -> None:
+        """Load persisted samples on the executor, so the calls that follow get learned budgets"""
+        if not self._loaded:
+            await asyncio.get_event_loop().run_in_executor(None, self.load)
+
+    def load(self) -> None:
+        """Read persisted samples and merge in any recorded meanwhile; blocking, runs once"""
+        with self._load_lock:
+            if self._loaded:
+                return
+            loaded: Dict[str, Dict[str, Any]] = {}
+            try:
+                if self.table_name:
+                    for item in self._scan_items():
+                        loaded[item['budgetKey']] = {
+                            'samples': [int(sample) for sample in item.get('samples', [])],
+                            'floor': int(item.get('floor', 0)),
+                            'truncations': int(item.get('truncations', 0))
+                        }
+                elif os.path.exists(self.path):
+                    with open(self.path) as file:
+                        loaded = json.load(file)
+            except Exception as e:  # pylint: disable=W0703
+                self.logger.warning(f"Failed to load token budgets, starting empty: {str(e)}")
+            with self._lock:
+                for key, entry in loaded.items():
+                    current = self._stats.get(key)
+                    if current is not None:
+                        entry = {
+                            'samples': (entry['samples'] + current['samples'])[-self.MAX_SAMPLES:],
+                            'floor': max(entry['floor'], current['floor']),
+                            'truncations': entry['truncations'] + current['truncations']
+                        }
+                    self._stats[key] = entry
+                self._loaded = True
+
+    def _start_loading(self) -> None:
+        """Load in the background on first use if warm() has not; caller holds the lock"""
+        if self._loaded or self._loading:
+            return
+        self._loading = True
+        threading.Thread(target=self.load, name='token-budget-load', daemon=True).start()
+
+    def _background_persist(self) -> None:
+        try:
+            self.persist()
+        finally:
+            with self._lock:
+                self._persisting = False
+
+    def _scan_items(self) -> List[Dict[str, Any]]:
+        table = self._shared_table()
+        response = table.scan()
+        items = response.get('Items', [])
+        while 'LastEvaluatedKey' in response:
+            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+            items.extend(response.get('Items', []))
+        return items
+
+    def _shared_table(self):
+        table = getattr(self._tables, 'budgets', None)
+        if table is None:
+            # persist and load run on executor and background threads, and resources are not thread safe
+            table = boto3.session.Session().resource('dynamodb', region_name='us-east-1').Table(self.table_name)
+            self._tables.budgets = table
+        return table
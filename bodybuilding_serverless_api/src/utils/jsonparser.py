@@ -0,0 +1,249 @@
+"""Incremental and tolerant JSON parsing for model output"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJsonParser:
+    """Consumes streamed text and emits object members as soon as they close.
+
+    Anything before the first '{' (markdown fences, "Here is the JSON...") and
+    anything after the root object closes is ignored. When ``root_key`` is set,
+    the members of ``root[root_key]`` are emitted instead of the root members,
+    which matches the ``{"<component>": {...}}`` shape every generator asks for.
+    If the model skips the wrapper the root members are emitted instead.
+    """
+
+    def __init__(self, root_key: Optional[str] = None):
+        self.root_key = root_key
+        self.members: Dict[str, Any] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._root_start = None
+        self._root_end = None
+
+    @property
+    def started(self) -> bool:
+        """True once the root object has been found"""
+        return self._root_start is not None
+
+    @property
+    def complete(self) -> bool:
+        """True once the root object has closed"""
+        return self._root_end is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add a chunk of text and return the members that closed within it"""
+        emitted: List[Tuple[str, Any]] = []
+        if self.complete or not chunk:
+            return emitted
+        self._buffer += chunk
+        buf = self._buffer
+        i = self._pos
+        while i < len(buf) and not self.complete:
+            char = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif not self.started:
+                if char == '{':
+                    self._root_start = i
+                    self._push('{', i, emit=self.root_key is None)
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._push(char, i, emit=self._child_emits(char))
+            elif char == ':':
+                frame = self._stack[-1]
+                if frame['type'] == '{':
+                    frame['key'] = json.loads(buf[frame['member_start']:i].strip())
+                    frame['value_start'] = i + 1
+                    if len(self._stack) == 1 and self.root_key is not None and not frame['seen_key']:
+                        # Unwrapped response: the root object is the component itself
+                        frame['emit'] = frame['key'] != self.root_key
+                    frame['seen_key'] = True
+            elif char == ',':
+                self._end_member(i, emitted)
+                self._stack[-1]['member_start'] = i + 1
+            elif char in '}]':
+                self._end_member(i, emitted)
+                self._stack.pop()
+                if not self._stack:
+                    self._root_end = i
+            i += 1
+        self._pos = i
+        return emitted
+
+    def result(self) -> Dict[str, Any]:
+        """Parse and return the complete root object"""
+        if not self.complete:
+            raise ValueError("Streamed JSON ended before the root object closed")
+        return json.loads(self._buffer[self._root_start:self._root_end + 1])
+
+    @property
+    def text(self) -> str:
+        """All text received so far"""
+        return self._buffer
+
+    def _push(self, char: str, index: int, emit: bool) -> None:
+        self._stack.append({
+            'type': char,
+            'member_start': index + 1,
+            'value_start': None,
+            'key': None,
+            'seen_key': False,
+            'emit': emit
+        })
+
+    def _child_emits(self, char: str) -> bool:
+        """Only the object stored under root[root_key] emits its members"""
+        if char != '{' or self.root_key is None or len(self._stack) != 1:
+            return False
+        root = self._stack[0]
+        return not root['emit'] and root['key'] == self.root_key
+
+    def _end_member(self, index: int, emitted: List[Tuple[str, Any]]) -> None:
+        frame = self._stack[-1]
+        if frame['type'] != '{' or frame['value_start'] is None:
+            return
+        value_text = self._buffer[frame['value_start']:index].strip()
+        key = frame['key']
+        frame['value_start'] = None
+        if not frame['emit'] or not value_text:
+            return
+        value = json.loads(value_text)
+        self.members[key] = value
+        emitted.append((key, value))
+
+
+_DECODER = json.JSONDecoder()
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def extract_json(text: str) -> Tuple[Any, Dict[str, Any]]:
+    """Find and parse the outermost JSON object in model output.
+
+    Well-formed output is decoded by a single raw_decode from the first '{',
+    which skips any preamble, code fence or trailing prose without copying the
+    text. Only when that fails is the object re-scanned once to drop trailing
+    commas and, if it was cut off at maxTokens, to cut it back to the last
+    complete member. A '{' in the preamble that does not start valid JSON is
+    skipped in favour of the next candidate.
+
+    Returns the parsed object and a report of what had to be tolerated or
+    repaired. Raises json.JSONDecodeError when nothing usable is found.
+    """
+    start = text.find('{')
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    while True:
+        report: Dict[str, Any] = {
+            'preamble': bool(text[:start].strip()),
+            'trailing_text': False,
+            'trailing_commas': 0,
+            'truncated': False,
+            'closed': '',
+            'dropped_tail': False,
+            'repaired': False
+        }
+        try:
+            obj, end = _DECODER.raw_decode(text, start)
+            report['trailing_text'] = bool(text[end:].strip())
+            return obj, report
+        except json.JSONDecodeError:
+            pass
+        try:
+            obj = _repair(text, start, report)
+        except _UnusableCandidate as e:
+            start = text.find('{', e.resume)
+            if start == -1:
+                raise json.JSONDecodeError("No valid JSON object found", text, e.resume) from e
+            continue
+        report['repaired'] = True
+        return obj, report
+
+
+class _UnusableCandidate(Exception):
+    """The object starting at a candidate '{' cannot be parsed or repaired; resume is where to look next"""
+
+    def __init__(self, resume: int):
+        super().__init__(resume)
+        self.resume = resume
+
+
+def _repair(text: str, start: int, report: Dict[str, Any]) -> Any:
+    """Single scan that rebuilds the object without trailing commas, cutting it back if truncated.
+
+    A truncated object keeps only its complete members: the scan remembers the
+    position after the last comma or closed child, and everything after that,
+    such as a partial string or number, is dropped before the brackets are closed.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    # Length of `out` and open brackets after the last complete member, for a safe cut
+    safe_cut: Optional[Tuple[int, List[str]]] = None
+    end = len(text)
+    i = start
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in '{[':
+            stack.append(char)
+            out.append(char)
+        elif char in '}]':
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+                report['trailing_commas'] += 1
+            out.append(char)
+            if stack:
+                stack.pop()
+            if not stack:
+                end = i + 1
+                break
+            safe_cut = (len(out), list(stack))
+        elif char == ',':
+            safe_cut = (len(out), list(stack))
+            out.append(char)
+        else:
+            out.append(char)
+        i += 1
+
+    if not stack:
+        try:
+            obj = json.loads(''.join(out))
+        except json.JSONDecodeError as e:
+            raise _UnusableCandidate(end) from e
+        report['trailing_text'] = bool(text[end:].strip())
+        return obj
+
+    report['truncated'] = True
+    if safe_cut is None:
+        raise _UnusableCandidate(start + 1)
+    cut, open_stack = safe_cut
+    closers = ''.join(_CLOSERS[opener] for opener in reversed(open_stack))
+    try:
+        obj = json.loads(''.join(out[:cut]) + closers)
+    except json.JSONDecodeError as e:
+        raise _UnusableCandidate(start + 1) from e
+    report['closed'] = closers
+    report['dropped_tail'] = cut < len(out)
+    return obj
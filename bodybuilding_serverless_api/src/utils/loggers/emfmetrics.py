@@ -0,0 +1,193 @@
+"""Per-call Bedrock telemetry as CloudWatch Embedded Metric Format records"""
+import atexit
+import collections
+import contextlib
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+NAMESPACE = os.environ.get('BEDROCK_METRICS_NAMESPACE', 'Bodybuildr/Bedrock')
+
+# Kept small: every distinct combination is a separate CloudWatch metric
+DIMENSIONS = [["model"], ["component", "tier"], ["caller"]]
+
+METRIC_UNITS = {
+    'Latency': 'Milliseconds',
+    'ModelLatency': 'Milliseconds',
+    'TimeToFirstToken': 'Milliseconds',
+    'InputTokens': 'Count',
+    'OutputTokens': 'Count',
+    'CacheReadInputTokens': 'Count',
+    'CacheWriteInputTokens': 'Count',
+    'Retries': 'Count',
+    'ParseRepaired': 'Count',
+    'ParseFailed': 'Count',
+    'Throttled': 'Count',
+    'Errors': 'Count'
+}
+
+_LABELS: contextvars.ContextVar = contextvars.ContextVar('bedrock_metric_labels', default={})
+
+
+@contextlib.contextmanager
+def metric_labels(**labels: Any) -> Iterator[None]:
+    """Label every Bedrock call made inside the block (component, tier, caller, retries...).
+
+    Labels live in a context variable, so they follow the call through
+    RetryPolicy and BedrockManager and stay separate per asyncio task.
+    """
+    token = _LABELS.set({**_LABELS.get(), **labels})
+    try:
+        yield
+    finally:
+        _LABELS.reset(token)
+
+
+def current_labels() -> Dict[str, Any]:
+    return dict(_LABELS.get())
+
+
+class BedrockMetrics:
+    """Builds one EMF record per Bedrock call and keeps recent records for local p50/p95 reports.
+
+    Records are printed to stdout, where Lambda forwards them to CloudWatch
+    Logs and CloudWatch extracts the metrics. Printing is on inside Lambda and
+    off elsewhere unless BEDROCK_EMF=on. Set BEDROCK_METRICS_REPORT=on to print
+    the p50/p95 table when the process exits, e.g. around a local test run.
+    """
+
+    MAX_RECORDS = 5000
+
+    _instance: Optional['BedrockMetrics'] = None
+
+    def __init__(self, emit: Optional[bool] = None):
+        if emit is None:
+            default = 'on' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'off'
+            emit = os.environ.get('BEDROCK_EMF', default).lower() in ('on', 'true', '1')
+        self.emit = emit
+        self.records = collections.deque(maxlen=self.MAX_RECORDS)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'BedrockMetrics':
+        """Get or create the process-wide metrics recorder"""
+        if cls._instance is None:
+            cls._instance = BedrockMetrics()
+            if os.environ.get('BEDROCK_METRICS_REPORT', 'off').lower() in ('on', 'true', '1'):
+                atexit.register(cls._instance.print_report)
+        return cls._instance
+
+    def record(self,
+               model_id: str,
+               latency_ms: float,
+               meta: Optional[Dict[str, Any]] = None,
+               ttft_ms: Optional[float] = None,
+               throttled: bool = False,
+               parse_failed: bool = False,
+               failed: bool = False,
+               **defaults: Any) -> Dict[str, Any]:
+        """Record one Bedrock call with the labels of the calling context, falling back to defaults"""
+        labels = {**{key: value for key, value in defaults.items() if value is not None}, **current_labels()}
+        meta = meta or {}
+        usage = meta.get('usage') or {}
+        values = {
+            'Latency': round(latency_ms, 1),
+            'ModelLatency': meta.get('latencyMs'),
+            'TimeToFirstToken': round(ttft_ms, 1) if ttft_ms is not None else None,
+            'InputTokens': usage.get('inputTokens'),
+            'OutputTokens': usage.get('outputTokens'),
+            'CacheReadInputTokens': usage.get('cacheReadInputTokens'),
+            'CacheWriteInputTokens': usage.get('cacheWriteInputTokens'),
+            'Retries': int(labels.get('retries', 0)),
+            'ParseRepaired': int(bool(meta.get('repaired') or labels.get('repairCall'))),
+            'ParseFailed': int(parse_failed),
+            'Throttled': int(throttled),
+            'Errors': int(failed)
+        }
+        values = {name: value for name, value in values.items() if value is not None}
+        record = {
+            'model': model_id or 'unknown',
+            'component': str(labels.get('component', 'unknown')),
+            'tier': str(labels.get('tier', '-')),
+            'caller': str(labels.get('caller', 'unknown')),
+            'cached': bool(meta.get('cached')),
+            'stopReason': meta.get('stopReason'),
+            **values
+        }
+        with self._lock:
+            self.records.append(record)
+        if self.emit:
+            print(json.dumps(self.to_emf(record, list(values))))
+        return record
+
+    @staticmethod
+    def to_emf(record: Dict[str, Any], metric_names: List[str]) -> Dict[str, Any]:
+        """Wrap a record in the _aws metadata block CloudWatch uses to extract metrics"""
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': DIMENSIONS,
+                    'Metrics': [{'Name': name, 'Unit': METRIC_UNITS[name]} for name in metric_names]
+                }]
+            },
+            **record
+        }
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """p50/p95 latency and time-to-first-token plus totals per caller, component, tier and model"""
+        with self._lock:
+            records = list(self.records)
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault((record['caller'], record['component'], record['tier'], record['model']), []).append(record)
+        rows = []
+        for (caller, component, tier, model), group in sorted(groups.items()):
+            latencies = sorted(record['Latency'] for record in group if not record['cached'])
+            ttfts = sorted(record['TimeToFirstToken'] for record in group if 'TimeToFirstToken' in record)
+            rows.append({
+                'caller': caller,
+                'component': component,
+                'tier': tier,
+                'model': model,
+                'calls': len(group),
+                'cached': sum(record['cached'] for record in group),
+                'p50_ms': self._percentile(latencies, 0.5),
+                'p95_ms': self._percentile(latencies, 0.95),
+                'ttft_p50_ms': self._percentile(ttfts, 0.5),
+                'ttft_p95_ms': self._percentile(ttfts, 0.95),
+                'output_tokens': sum(record.get('OutputTokens', 0) for record in group),
+                'retries': sum(record['Retries'] for record in group),
+                'repaired': sum(record['ParseRepaired'] for record in group),
+                'parse_failed': sum(record['ParseFailed'] for record in group),
+                'throttled': sum(record['Throttled'] for record in group)
+            })
+        return rows
+
+    def report(self) -> str:
+        """The summary as a fixed-width table"""
+        rows = self.summary()
+        if not rows:
+            return "No Bedrock calls recorded"
+        columns = list(rows[0])
+        cells = [[str(row[column]) if row[column] is not None else '-' for column in columns] for row in rows]
+        widths = [max(len(column), *(len(line[index]) for line in cells)) for index, column in enumerate(columns)]
+        lines = ['  '.join(column.ljust(width) for column, width in zip(columns, widths))]
+        lines.append('  '.join('-' * width for width in widths))
+        lines.extend('  '.join(cell.ljust(width) for cell, width in zip(line, widths)) for line in cells)
+        return '\n'.join(lines)
+
+    def print_report(self) -> None:
+        print("\nBedrock call latency (ms):")
+        print(self.report())
+
+    @staticmethod
+    def _percentile(samples: List[float], fraction: float) -> Optional[float]:
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(fraction * len(samples)) - 1)]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of dynamocodec against boto3's TypeSerializer and TypeDeserializer
+plus the Decimal conversion pass DynamoManager used before it; needs boto3.
+
+    python tests/benchmark_dynamocodec.py [rounds]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from src.aws.dynamocodec import deserialize_item, serialize_item
+from tests.test_dynamocodec import build_plan_item, legacy_convert
+
+
+def main(rounds: int) -> None:
+    type_deserializer = TypeDeserializer()
+    type_serializer = TypeSerializer()
+    item = build_plan_item()
+    decimal_item = {key: type_deserializer.deserialize(value) for key, value in item.items()}
+    plain = deserialize_item(item)
+
+    legacy = timeit.timeit(
+        lambda: legacy_convert({key: type_deserializer.deserialize(value) for key, value in item.items()}),
+        number=rounds
+    )
+    codec = timeit.timeit(lambda: deserialize_item(item), number=rounds)
+    print(f"deserialize: TypeDeserializer + convert {legacy * 1000 / rounds:.3f} ms, "
+          f"dynamocodec {codec * 1000 / rounds:.3f} ms per item ({legacy / codec:.1f}x)")
+
+    # TypeSerializer rejects floats, so the baseline gets the Decimal item it would be given
+    legacy = timeit.timeit(
+        lambda: {key: type_serializer.serialize(value) for key, value in decimal_item.items()},
+        number=rounds
+    )
+    codec = timeit.timeit(lambda: serialize_item(plain), number=rounds)
+    print(f"serialize: TypeSerializer {legacy * 1000 / rounds:.3f} ms, "
+          f"dynamocodec {codec * 1000 / rounds:.3f} ms per item ({legacy / codec:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
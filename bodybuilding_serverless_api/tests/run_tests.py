@@ -167,6 +167,7 @@ os.environ['COGNITO'] = 'test-secret-name'
 # Import the handler tests that are working
 from tests.test_plan_handler import TestPlanHandler
 from tests.test_chat_handler import TestChatHandler
+from src.utils.loggers.emfmetrics import BedrockMetrics
 
 # Now try to run the tests
 def run_tests():
@@ -187,6 +188,9 @@ def run_tests():
     print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
     print(f"Failures: {len(result.failures)}")
     print(f"Errors: {len(result.errors)}")
+
+    # p50/p95 per component and model for any Bedrock calls the tests made
+    BedrockMetrics.get_instance().print_report()
     
     # Return the number of failures and errors
     return len(result.failures) + len(result.errors)
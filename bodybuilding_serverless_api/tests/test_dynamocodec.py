@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import sys
+import unittest
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.aws.dynamocodec import deserialize, deserialize_item, serialize, serialize_item
+
+HAS_BOTO3 = importlib.util.find_spec('boto3') is not None
+
+
+def build_plan_item(days=7, exercises=8, sets=5):
+    """A low-level plans table item about the size of a generated workout plan"""
+    workout = {
+        f"day{day}": {
+            "focus": "push" if day % 2 else "pull",
+            "exercises": [
+                {
+                    "name": f"exercise {exercise}",
+                    "sets": [{"reps": 10, "weight": 62.5, "rpe": 8, "rest_seconds": 90} for _ in range(sets)],
+                    "notes": "Keep the eccentric slow",
+                    "superset": exercise % 3 == 0
+                }
+                for exercise in range(exercises)
+            ]
+        }
+        for day in range(days)
+    }
+    plan = {
+        "plan_id": "plan-123",
+        "user_id": "user-456",
+        "version": 3,
+        "workout_plan": workout,
+        "nutrition_plan": {"calories": 2800, "protein_g": 180.5, "meals": ["oats", "rice", None]},
+        "available_days": ["monday", "wednesday", "friday"]
+    }
+    return serialize_item(plan)
+
+
+def legacy_convert(item):
+    """The previous DynamoManager._convert_item pass over TypeDeserializer output"""
+    if isinstance(item, dict):
+        return {
+            key: (float(value) if isinstance(value, Decimal) else
+                  legacy_convert(value) if isinstance(value, (dict, list)) else value)
+            for key, value in item.items()
+        }
+    if isinstance(item, list):
+        return [legacy_convert(value) for value in item]
+    return item
+
+
+class TestDynamoCodec(unittest.TestCase):
+    """Round trips of the single-pass DynamoDB codec"""
+
+    def test_numbers_become_int_or_float(self):
+        self.assertEqual(deserialize({"N": "3"}), 3)
+        self.assertIsInstance(deserialize({"N": "3"}), int)
+        self.assertEqual(deserialize({"N": "62.5"}), 62.5)
+        self.assertEqual(deserialize({"N": "1E+2"}), 100.0)
+        self.assertEqual(deserialize({"NS": ["1", "2.5"]}), {1, 2.5})
+
+    def test_round_trip(self):
+        value = {"a": [1, 2.5, "x", True, None, {"b": b"raw"}], "tags": {"x", "y"}}
+        self.assertEqual(deserialize(serialize(value)), value)
+
+    def test_serialize_accepts_decimal_and_float(self):
+        self.assertEqual(serialize(Decimal("1.50")), {"N": "1.50"})
+        self.assertEqual(serialize(0.1), {"N": "0.1"})
+        self.assertEqual(serialize(True), {"BOOL": True})
+        with self.assertRaises(TypeError):
+            serialize(float("nan"))
+        with self.assertRaises(TypeError):
+            serialize(set())
+
+
+@unittest.skipUnless(HAS_BOTO3, "boto3 is needed for the TypeDeserializer baseline")
+class TestDynamoCodecMatchesBoto3(unittest.TestCase):
+    """The codec reads and writes what TypeDeserializer plus the Decimal conversion pass did.
+    Timings are in tests/benchmark_dynamocodec.py."""
+
+    def setUp(self):
+        from boto3.dynamodb.types import TypeDeserializer
+        self.type_deserializer = TypeDeserializer()
+        self.item = build_plan_item()
+
+    def legacy_deserialize(self, item):
+        return legacy_convert({key: self.type_deserializer.deserialize(value) for key, value in item.items()})
+
+    def test_deserialize_matches(self):
+        self.assertEqual(deserialize_item(self.item), self.legacy_deserialize(self.item))
+
+    def test_serialize_round_trip(self):
+        plain = self.legacy_deserialize(self.item)
+        self.assertEqual(deserialize_item(serialize_item(plain)), plain)
+
+    def test_whole_numbers_are_int_where_decimals_became_float(self):
+        plain = deserialize_item(self.item)
+        self.assertIsInstance(plain["version"], int)
+        self.assertIsInstance(self.legacy_deserialize(self.item)["version"], float)
+        self.assertIsInstance(plain["nutrition_plan"]["protein_g"], float)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.services.job_service import JobService, CREATE_PLAN, SUCCEEDED
+from src.services.plan_service import PlanService
+
+PLAN_DATA = {"goals": ["strength"], "experience_level": "beginner", "available_days": ["monday"]}
+
+
+class TestJobProgress(unittest.TestCase):
+    """Step-level progress of the plan job"""
+
+    def test_create_plan_reports_each_step(self):
+        service = JobService(logging.getLogger("test"), table_name='', queue_url='')
+        plan_service = PlanService(dynamodb_client=None, bedrock_manager=None)
+        plan_service.dynamo_manager = MagicMock()
+        plan_service.dynamo_manager.put_if_newer.return_value = True
+        steps = []
+
+        async def runner(request, progress):
+            async def record(step, value):
+                steps.append(step)
+                await progress(step, value)
+            return await plan_service.create_plan(request['userId'], request['planData'], progress=record)
+
+        service.register(CREATE_PLAN, runner)
+        job = {'jobId': 'job-1', 'owner': 'user-1', 'kind': CREATE_PLAN, 'status': 'queued',
+               'request': {'userId': 'user-1', 'planData': PLAN_DATA}, 'progress': {}, 'partial': {},
+               'createdAt': 'now', 'updatedAt': 'now'}
+        service._put(job)
+        asyncio.run(service.run('job-1'))
+
+        self.assertEqual(steps, ['plan', 'version'])
+        stored = service.get('job-1')
+        self.assertEqual(stored['status'], SUCCEEDED)
+        self.assertEqual(set(stored['progress']), {'plan', 'version'})
+        self.assertEqual(plan_service.dynamo_manager.put_if_newer.call_count, 2)
+
+
+class TestJobTables(unittest.TestCase):
+    """DynamoDB tables are never shared between threads"""
+
+    def test_each_thread_gets_its_own_table(self):
+        service = JobService(logging.getLogger("test"), table_name='jobs', queue_url='')
+        with patch('src.services.job_service.boto3.session.Session') as session:
+            session.side_effect = lambda: MagicMock()
+            tables = [service._jobs_table(), service._jobs_table()]
+            thread = threading.Thread(target=lambda: tables.append(service._jobs_table()))
+            thread.start()
+            thread.join()
+        self.assertIs(tables[0], tables[1])
+        self.assertIsNot(tables[0], tables[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
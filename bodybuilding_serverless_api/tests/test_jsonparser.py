@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.jsonparser import extract_json
+
+
+class TestExtractJson(unittest.TestCase):
+    """Tolerant extraction of the model's JSON object"""
+
+    def test_well_formed_with_preamble_and_fence(self):
+        obj, report = extract_json('Here you go:\n```json\n{"a": 1}\n```')
+        self.assertEqual(obj, {"a": 1})
+        self.assertTrue(report['preamble'])
+        self.assertTrue(report['trailing_text'])
+        self.assertFalse(report['repaired'])
+
+    def test_trailing_commas_are_dropped(self):
+        obj, report = extract_json('{"a": [1, 2,], "b": {"c": 3,},}')
+        self.assertEqual(obj, {"a": [1, 2], "b": {"c": 3}})
+        self.assertEqual(report['trailing_commas'], 3)
+
+    def test_truncation_cuts_back_to_the_last_complete_member(self):
+        cases = {
+            '{"a": 1, "b": 12': {"a": 1},
+            '{"a": 1, "b": "hel': {"a": 1},
+            '{"a": 1, "b"': {"a": 1},
+            '{"a": 1, "b":': {"a": 1},
+            '{"a": [1, 2, 3': {"a": [1, 2]},
+            '{"a": {"x": 1}': {"a": {"x": 1}},
+            '{"a": {"x": 1, "y": tr': {"a": {"x": 1}},
+            '{"a": "x\\"y", "b": "p': {"a": 'x"y'}
+        }
+        for text, expected in cases.items():
+            obj, report = extract_json(text)
+            self.assertEqual(obj, expected, text)
+            self.assertTrue(report['truncated'], text)
+
+    def test_truncated_scalar_without_complete_member_raises(self):
+        for text in ('{"a": 12', '{"a": "hel', '{"a": tru', '{"a"'):
+            with self.assertRaises(json.JSONDecodeError, msg=text):
+                extract_json(text)
+
+    def test_brace_in_preamble_is_skipped(self):
+        for text in ('pre {x} {"a":1}', 'Use {placeholders} like {this}: {"a": 1}', 'Note {sic: 1, and {"a": 1}'):
+            obj, report = extract_json(text)
+            self.assertEqual(obj, {"a": 1}, text)
+            self.assertTrue(report['preamble'], text)
+
+    def test_no_object_raises(self):
+        for text in ('no json here', 'only {broken} {braces}'):
+            with self.assertRaises(json.JSONDecodeError, msg=text):
+                extract_json(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
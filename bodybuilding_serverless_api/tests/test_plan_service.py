@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.aws.dynamocodec import deserialize, serialize_item
+from src.services.plan_service import PlanService
+
+
+class TestPlanReads(unittest.TestCase):
+    """Plans are read from PLANS_TABLE by userId and planId, as plain dicts"""
+
+    def setUp(self):
+        with patch.dict(os.environ, {'PLANS_TABLE': 'plans-test'}):
+            self.service = PlanService(dynamodb_client=None, bedrock_manager=None)
+        self.client = MagicMock()
+        self.service.dynamo_manager.dynamo_client = MagicMock()
+        self.service.dynamo_manager.dynamo_client.meta.client = self.client
+
+    def test_get_plan_returns_a_plain_dict(self):
+        stored = {"userId": "user-1", "planId": "plan-1", "version": 2, "goals": ["strength"], "nutrition_plan": {"protein_g": 180.5}}
+        self.client.get_item.return_value = {"Item": serialize_item(stored)}
+
+        plan = asyncio.run(self.service.get_plan("plan-1", "user-1"))
+
+        self.assertEqual(plan, stored)
+        self.client.get_item.assert_called_once_with(
+            TableName='plans-test', Key={"userId": {"S": "user-1"}, "planId": {"S": "plan-1"}}
+        )
+
+    def test_missing_plan_is_none(self):
+        self.client.get_item.return_value = {}
+        self.assertIsNone(asyncio.run(self.service.get_plan("plan-1", "user-1")))
+        self.assertEqual(asyncio.run(self.service.get_plan_versions_page("user-1", "plan-1")), ([], None))
+
+    def test_list_plans_queries_by_user_id(self):
+        self.client.query.return_value = {"Items": [serialize_item({"userId": "user-1", "planId": "plan-1"})]}
+
+        plans = asyncio.run(self.service.list_plans("user-1"))
+
+        self.assertEqual(plans, [{"userId": "user-1", "planId": "plan-1"}])
+        params = self.client.query.call_args.kwargs
+        self.assertEqual(params['TableName'], 'plans-test')
+        self.assertEqual(params['ExpressionAttributeNames']['#k'], 'userId')
+
+
+class FakeDynamoClient:
+    """Low-level client over an in-memory table, for the calls PlanService makes through DynamoManager"""
+
+    def __init__(self):
+        self.tables = {}
+
+    @staticmethod
+    def key_of(table_name, item):
+        names = ("planId", "version") if "version" in table_name else ("userId", "planId")
+        return tuple(deserialize(item[name]) for name in names)
+
+    def get_item(self, TableName, Key):
+        item = self.tables.get(TableName, {}).get(self.key_of(TableName, Key))
+        return {"Item": item} if item else {}
+
+    def put_item(self, TableName, Item, **condition):
+        table = self.tables.setdefault(TableName, {})
+        stored = table.get(self.key_of(TableName, Item))
+        if stored and deserialize(stored["version"]) >= deserialize(Item["version"]):
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": ""}}, "PutItem")
+        table[self.key_of(TableName, Item)] = Item
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                    ReturnValues):
+        item = self.tables.setdefault(TableName, {}).setdefault(self.key_of(TableName, Key), dict(Key))
+        add, _, assignments = UpdateExpression.partition(' SET ')
+        _, counter, amount = add.split()
+        name = ExpressionAttributeNames[counter]
+        total = deserialize(item.get(name, {"N": "0"})) + deserialize(ExpressionAttributeValues[amount])
+        item[name] = {"N": str(total)}
+        for assignment in filter(None, assignments.split(', ')):
+            placeholder, value = assignment.split(' = ')
+            item[ExpressionAttributeNames[placeholder]] = ExpressionAttributeValues[value]
+        return {"Attributes": {name: item[name]}}
+
+
+class TestPlanUpdate(unittest.TestCase):
+    """An update merges plain dicts and reads back as saved"""
+
+    def test_update_round_trip(self):
+        service = PlanService(dynamodb_client=None, bedrock_manager=None)
+        service.dynamo_manager.dynamo_client = MagicMock()
+        service.dynamo_manager.dynamo_client.meta.client = FakeDynamoClient()
+        request = {"goals": ["strength"], "experience_level": "beginner", "available_days": ["monday"]}
+
+        async def run():
+            plan = await service.create_plan("user-1", request)
+            updated = await service.update_plan(plan["planId"], "user-1", {
+                "planId": "ignored", "available_days": ["monday", "thursday"],
+                "nutrition_plan": {"calories": 2800, "protein_g": 180.5}
+            })
+            return plan, updated, await service.get_plan(plan["planId"], "user-1")
+
+        plan, updated, stored = asyncio.run(run())
+
+        self.assertEqual(updated["version"], 2)
+        self.assertEqual(updated["planId"], plan["planId"])
+        self.assertEqual(updated["goals"], ["strength"])
+        self.assertEqual(stored, updated)
+        self.assertEqual(stored["nutrition_plan"], {"calories": 2800, "protein_g": 180.5})
+        versions = service.dynamo_manager.dynamo_client.meta.client.tables[service.versions_table_name]
+        self.assertEqual(sorted(version for _, version in versions), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.aws.bedrockgovernor import BedrockBackpressureError
+from src.aws.bedrockmanager import BedrockParseError
+from src.services.shared.retry_policy import (
+    RetryBudget, RetryPolicy, SchemaValidationError, FATAL, PARSE, SCHEMA, THROTTLE, TRANSIENT
+)
+
+REQUEST = {"modelId": "test-model", "messages": [{"role": "user", "content": [{"text": "go"}]}]}
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Converse")
+
+
+class FakeBedrock:
+    """make_detailed_async_call that plays back a list of results and exceptions, running validate like BedrockManager"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    async def make_detailed_async_call(self, request_params, use_cache=None, validate=None):
+        self.requests.append(request_params)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        meta = {"usage": {"inputTokens": 1, "outputTokens": 1}, "stopReason": "end_turn", "cached": False}
+        if validate:
+            validate(outcome, meta)
+        return outcome, meta
+
+
+class TestClassify(unittest.TestCase):
+    """Each failure maps to the retry class that decides its strategy"""
+
+    def test_classes(self):
+        self.assertEqual(RetryPolicy.classify(SchemaValidationError(["a"], {})), SCHEMA)
+        self.assertEqual(RetryPolicy.classify(BedrockParseError("bad", "{")), PARSE)
+        self.assertEqual(RetryPolicy.classify(json.JSONDecodeError("bad", "{", 0)), PARSE)
+        self.assertEqual(RetryPolicy.classify(client_error("ThrottlingException")), THROTTLE)
+        self.assertEqual(RetryPolicy.classify(client_error("ServiceUnavailableException")), THROTTLE)
+        self.assertEqual(RetryPolicy.classify(client_error("ModelTimeoutException")), TRANSIENT)
+        self.assertEqual(RetryPolicy.classify(asyncio.TimeoutError()), TRANSIENT)
+        self.assertEqual(RetryPolicy.classify(ConnectionResetError()), TRANSIENT)
+        self.assertEqual(RetryPolicy.classify(client_error("AccessDeniedException")), FATAL)
+        self.assertEqual(RetryPolicy.classify(ValueError("invalid component")), FATAL)
+
+    def test_backpressure_is_fatal_even_though_it_is_capacity_related(self):
+        self.assertEqual(RetryPolicy.classify(BedrockBackpressureError("queue is full")), FATAL)
+
+
+class TestExecute(unittest.TestCase):
+    """Retries follow the class of each failure"""
+
+    def setUp(self):
+        self.policy = RetryPolicy(logging.getLogger(__name__), budget=RetryBudget(capacity=10, refill_per_second=0))
+        self.policy.backoff = lambda kind, attempt: 0
+
+    def run_policy(self, bedrock, **kwargs):
+        return asyncio.run(self.policy.execute(bedrock, REQUEST, **kwargs))
+
+    def test_throttle_is_retried(self):
+        bedrock = FakeBedrock([client_error("ThrottlingException"), {"a": 1}])
+        self.assertEqual(self.run_policy(bedrock), {"a": 1})
+        self.assertEqual(len(bedrock.requests), 2)
+
+    def test_fatal_is_raised_without_retry(self):
+        bedrock = FakeBedrock([client_error("AccessDeniedException"), {"a": 1}])
+        with self.assertRaises(ClientError):
+            self.run_policy(bedrock)
+        self.assertEqual(len(bedrock.requests), 1)
+
+    def test_missing_keys_are_resent_with_a_correction(self):
+        bedrock = FakeBedrock([{"b": 1}, {"a": 1, "b": 1}])
+        self.assertEqual(self.run_policy(bedrock, required_keys=["a"]), {"a": 1, "b": 1})
+        correction = bedrock.requests[1]["messages"][-1]["content"][-1]["text"]
+        self.assertIn("missing these required keys: a", correction)
+
+    def test_parse_failure_sends_a_repair_request(self):
+        bedrock = FakeBedrock([BedrockParseError("bad", '{"a": 1,,}'), {"a": 1}])
+        self.assertEqual(self.run_policy(bedrock), {"a": 1})
+        self.assertEqual(bedrock.requests[1]["messages"][0]["content"][0]["text"], '{"a": 1,,}')
+
+    def test_failed_repair_falls_back_to_one_resend(self):
+        bedrock = FakeBedrock([BedrockParseError("bad", '{"a": 1,,}'), BedrockParseError("bad", "{"), {"a": 1}])
+        self.assertEqual(self.run_policy(bedrock), {"a": 1})
+        self.assertEqual(bedrock.requests[2], REQUEST)
+        self.assertEqual(self.policy.budget.tokens, 9)
+
+    def test_rejected_repair_falls_back_to_one_resend(self):
+        bedrock = FakeBedrock([BedrockParseError("bad", '{"a": 1,,}'), {"b": 1}, {"a": 1}])
+        self.assertEqual(self.run_policy(bedrock, required_keys=["a"]), {"a": 1})
+        self.assertEqual(bedrock.requests[2], REQUEST)
+
+    def test_parse_failure_after_the_resend_is_raised(self):
+        bedrock = FakeBedrock([BedrockParseError("bad", ""), BedrockParseError("bad", ""), {"a": 1}])
+        with self.assertRaises(BedrockParseError):
+            self.run_policy(bedrock)
+        self.assertEqual(bedrock.requests, [REQUEST, REQUEST])
+
+    def test_exhausted_budget_stops_retries(self):
+        self.policy.budget = RetryBudget(capacity=0, refill_per_second=0)
+        bedrock = FakeBedrock([client_error("ThrottlingException"), {"a": 1}])
+        with self.assertRaises(ClientError):
+            self.run_policy(bedrock)
+
+    def test_validate_rejects_before_the_result_is_returned(self):
+        bedrock = FakeBedrock([{"a": 1}])
+        on_response = MagicMock()
+
+        def validate(result):
+            raise ValueError("not a lesson component")
+        with self.assertRaises(ValueError):
+            self.run_policy(bedrock, on_response=on_response, validate=validate)
+        on_response.assert_called_once()
+
+    def test_cache_hits_are_still_checked(self):
+        bedrock = MagicMock()
+        bedrock.make_detailed_async_call = AsyncMock(return_value=({"b": 1}, {"cached": True}))
+        self.policy.budget = RetryBudget(capacity=0, refill_per_second=0)
+        with self.assertRaises(SchemaValidationError):
+            self.run_policy(bedrock, required_keys=["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+# pylint: disable=C0301
+"""Two-tier content-addressed cache for Bedrock responses"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import boto3
+
+# Request fields that determine the model output; anything else is transport detail
+CACHE_KEY_FIELDS = ('modelId', 'system', 'messages', 'inferenceConfig', 'toolConfig', 'body')
+
+# DynamoDB items are capped at 400KB, leave room for the key and attribute names
+MAX_SHARED_ITEM_BYTES = 350 * 1024
+
+
+def request_cache_key(request_params: Dict[str, Any]) -> str:
+    """Canonical hash of the parts of a request that determine its response"""
+    canonical = {field: request_params[field] for field in CACHE_KEY_FIELDS if field in request_params}
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LocalLRUCache:
+    """Thread-safe in-process LRU with size and TTL eviction"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a value, evicting the least recently used entries over capacity"""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Drop one entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BedrockResponseCache:
+    """Response cache shared by every BedrockManager in the process.
+
+    Tier one is a LocalLRUCache that survives across warm invocations of the
+    same container. Tier two is a DynamoDB table (BEDROCK_CACHE_TABLE) so other
+    containers get hits too; it is skipped when the variable is unset.
+    Responses are stored serialized so callers never share mutable results.
+    """
+
+    _instance: Optional['BedrockResponseCache'] = None
+
+    def __init__(self, logger, table_name: Optional[str] = None,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 max_temperature: Optional[float] = None):
+        self.logger = logger
+        self.table_name = table_name if table_name is not None else os.environ.get('BEDROCK_CACHE_TABLE')
+        self.ttl_seconds = ttl_seconds or float(os.environ.get('BEDROCK_CACHE_TTL_SECONDS', 24 * 60 * 60))
+        # Calls hotter than this are treated as creative and bypass the cache unless forced
+        self.max_temperature = max_temperature if max_temperature is not None else float(os.environ.get('BEDROCK_CACHE_MAX_TEMPERATURE', 0.3))
+        self.local = LocalLRUCache(
+            max_entries=max_entries or int(os.environ.get('BEDROCK_CACHE_MAX_ENTRIES', 256)),
+            ttl_seconds=self.ttl_seconds
+        )
+        # Lookups and stores run on executor threads; each thread gets its own client
+        self._clients = threading.local()
+        self._counter_lock = threading.Lock()
+        self.counters = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'shared_errors': 0
+        }
+
+    @classmethod
+    def get_instance(cls, logger) -> 'BedrockResponseCache':
+        """Get or create the process-wide cache"""
+        if cls._instance is None:
+            cls._instance = BedrockResponseCache(logger)
+        return cls._instance
+
+    def key_for(self, request_params: Dict[str, Any], use_cache: Optional[bool] = None) -> Optional[str]:
+        """Return the cache key for a request, or None when the call should bypass the cache.
+
+        use_cache=False opts out, use_cache=True forces caching of a creative call,
+        and None caches only calls at or below max_temperature.
+        """
+        if use_cache is False or (use_cache is None and self._is_creative(request_params)):
+            self._count('bypassed')
+            return None
+        return request_cache_key(request_params)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Synchronous two-tier lookup"""
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return json.loads(value)
+        value = self._shared_get(key)
+        if value is not None:
+            self._count('shared_hits')
+            self.local.set(key, value)
+            return json.loads(value)
+        self._count('misses')
+        return None
+
+    def store(self, key: str, result: Dict[str, Any]) -> None:
+        """Synchronous write to both tiers"""
+        value = json.dumps(result)
+        self.local.set(key, value)
+        self._shared_put(key, value)
+        self._count('stores')
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Async lookup; the shared tier runs on the default executor"""
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return json.loads(value)
+        if not self.table_name:
+            self._count('misses')
+            return None
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.lookup, key)
+
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Async write to both tiers"""
+        if not self.table_name:
+            self.local.set(key, json.dumps(result))
+            self._count('stores')
+            return
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.store, key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters with the derived hit rate"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        stats['local_entries'] = len(self.local)
+        return stats
+
+    def _is_creative(self, request_params: Dict[str, Any]) -> bool:
+        temperature = request_params.get('inferenceConfig', {}).get('temperature')
+        if temperature is None:
+            temperature = request_params.get('temperature')
+        if temperature is None and 'body' in request_params:
+            try:
+                temperature = json.loads(request_params['body']).get('temperature')
+            except (TypeError, ValueError):
+                temperature = None
+        return temperature is not None and temperature > self.max_temperature
+
+    def _count(self, counter: str) -> None:
+        with self._counter_lock:
+            self.counters[counter] += 1
+
+    def _shared_client(self):
+        client = getattr(self._clients, 'dynamodb', None)
+        if client is None:
+            # Sessions and resources are not thread safe, so the client comes from a session of its own
+            client = boto3.session.Session().client('dynamodb', region_name='us-east-1')
+            self._clients.dynamodb = client
+        return client
+
+    def _shared_get(self, key: str) -> Optional[str]:
+        if not self.table_name:
+            return None
+        try:
+            item = self._shared_client().get_item(TableName=self.table_name, Key={'cacheKey': {'S': key}}).get('Item')
+        except Exception as e:  # pylint: disable=W0703
+            self._count('shared_errors')
+            self.logger.warning(f"Bedrock cache read failed: {str(e)}")
+            return None
+        # DynamoDB TTL deletes lazily, so expired items can still be returned
+        if not item or int(item.get('expiresAt', {}).get('N', 0)) < time.time():
+            return None
+        return item.get('response', {}).get('S')
+
+    def _shared_put(self, key: str, value: str) -> None:
+        if not self.table_name or len(value.encode('utf-8')) > MAX_SHARED_ITEM_BYTES:
+            return
+        try:
+            self._shared_client().put_item(TableName=self.table_name, Item={
+                'cacheKey': {'S': key},
+                'response': {'S': value},
+                'expiresAt': {'N': str(int(time.time() + self.ttl_seconds))}
+            })
+        except Exception as e:  # pylint: disable=W0703
+            self._count('shared_errors')
+            self.logger.warning(f"Bedrock cache write failed: {str(e)}")
@@ -0,0 +1,203 @@
+# pylint: disable=C0301
+"""Hedged Bedrock requests: duplicate a call that runs past its usual latency and keep the first answer"""
+import asyncio
+import collections
+import functools
+import math
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+try:
+    from src.aws.bedrockgovernor import is_throttling_error
+except ImportError:
+    from aws.bedrockgovernor import is_throttling_error
+
+
+class BedrockHedger:
+    """Issues a second copy of a slow Bedrock call and returns whichever copy finishes first.
+
+    A call is hedged once it has run longer than a rolling latency percentile
+    (BEDROCK_HEDGE_PERCENTILE, default p95) of recent calls for the same model
+    and component, so only the stalled tail is duplicated. Hedging is off
+    unless BEDROCK_HEDGING=on. Hedges are capped at BEDROCK_HEDGE_MAX_RATE of
+    calls over a sliding window, and paused for BEDROCK_HEDGE_THROTTLE_PAUSE_SECONDS
+    after any throttle so hedging never adds load while Bedrock is pushing back.
+    Latencies are the service time of the blocking call itself, and the hedge
+    delay counts from when the primary copy starts, so time spent queued for a
+    governor slot neither inflates the percentile nor triggers a hedge. The
+    losing copy is cancelled; a request already sent to Bedrock runs to
+    completion on its executor thread, still holding its governor slot, and
+    its response is discarded.
+    """
+
+    MAX_SAMPLES = 200
+    MIN_SAMPLES = 20
+    RATE_WINDOW_SECONDS = 60.0
+
+    _instance: Optional['BedrockHedger'] = None
+
+    def __init__(self, logger, enabled: Optional[bool] = None, percentile: Optional[float] = None,
+                 max_rate: Optional[float] = None, min_delay_ms: Optional[float] = None,
+                 throttle_pause_seconds: Optional[float] = None):
+        self.logger = logger
+        self.enabled = enabled if enabled is not None else os.environ.get('BEDROCK_HEDGING', 'off').lower() in ('on', 'true', '1')
+        self.percentile = percentile or float(os.environ.get('BEDROCK_HEDGE_PERCENTILE', 0.95))
+        self.max_rate = max_rate if max_rate is not None else float(os.environ.get('BEDROCK_HEDGE_MAX_RATE', 0.05))
+        # Never hedge sooner than this, however fast the recent calls were
+        self.min_delay_ms = min_delay_ms if min_delay_ms is not None else float(os.environ.get('BEDROCK_HEDGE_MIN_DELAY_MS', 1000))
+        self.throttle_pause_seconds = throttle_pause_seconds if throttle_pause_seconds is not None else float(os.environ.get('BEDROCK_HEDGE_THROTTLE_PAUSE_SECONDS', 30))
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._calls: Deque[float] = collections.deque()
+        self._hedges: Deque[float] = collections.deque()
+        self._last_throttle = -math.inf
+        self._lock = threading.Lock()
+        self.counters = {
+            'calls': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'skipped_rate_cap': 0,
+            'skipped_throttled': 0
+        }
+
+    @classmethod
+    def get_instance(cls, logger) -> 'BedrockHedger':
+        """Get or create the process-wide hedger"""
+        if cls._instance is None:
+            cls._instance = BedrockHedger(logger)
+        return cls._instance
+
+    @staticmethod
+    def latency_key(model_id: str, component: Optional[str]) -> str:
+        return f"{model_id}#{component or 'unknown'}"
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging a call, or None until enough latencies are known"""
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        observed = samples[min(len(samples) - 1, math.ceil(self.percentile * len(samples)) - 1)]
+        return max(observed, self.min_delay_ms) / 1000.0
+
+    def record_latency(self, key: str, latency_ms: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(key, collections.deque(maxlen=self.MAX_SAMPLES)).append(latency_ms)
+
+    def record_throttle(self) -> None:
+        """Pause hedging; called for every throttled Bedrock call"""
+        with self._lock:
+            self._last_throttle = time.monotonic()
+
+    async def run(self, key: str, call: Callable[[], Any],
+                  dispatch: Optional[Callable[[Callable[[], Any]], Awaitable[Any]]] = None) -> Any:
+        """Run the blocking call through dispatch, such as a governor slot, starting a second
+        copy if the first is still running after the hedge delay. Without dispatch the call
+        runs on the default executor."""
+        if dispatch is None:
+            dispatch = functools.partial(asyncio.get_running_loop().run_in_executor, None)
+        if not self.enabled:
+            return await dispatch(call)
+        self._count_call()
+        delay = self.hedge_delay(key)
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self._attempt(dispatch, self._timed(key, call, started)))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+            # The delay counts from when the call starts, not from when it was queued
+            waiter = asyncio.ensure_future(started.wait())
+            await asyncio.wait([primary, waiter], return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if primary.done():
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._allow_hedge():
+                return await primary
+
+            self.logger.info(f"Hedging Bedrock call for {key} after {delay:.2f}s")
+            hedge = asyncio.ensure_future(self._attempt(dispatch, self._timed(key, call)))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    task.add_done_callback(self._discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters with the share of calls that were hedged and hedges that won"""
+        with self._lock:
+            stats = dict(self.counters)
+        stats['hedge_rate'] = stats['hedged'] / stats['calls'] if stats['calls'] else 0.0
+        stats['hedge_win_rate'] = stats['hedge_wins'] / stats['hedged'] if stats['hedged'] else 0.0
+        return stats
+
+    def _timed(self, key: str, call: Callable[[], Any], started: Optional[asyncio.Event] = None) -> Callable[[], Any]:
+        """call wrapped to record its own running time on the thread that runs it, and to set started"""
+        loop = asyncio.get_running_loop()
+
+        def timed() -> Any:
+            if started is not None:
+                loop.call_soon_threadsafe(started.set)
+            begun = time.monotonic()
+            result = call()
+            self.record_latency(key, (time.monotonic() - begun) * 1000)
+            return result
+        return timed
+
+    async def _attempt(self, dispatch: Callable[[Callable[[], Any]], Awaitable[Any]], call: Callable[[], Any]) -> Any:
+        try:
+            return await dispatch(call)
+        except Exception as e:
+            if is_throttling_error(e):
+                self.record_throttle()
+            raise
+
+    def _allow_hedge(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_throttle < self.throttle_pause_seconds:
+                self.counters['skipped_throttled'] += 1
+                return False
+            self._trim(now)
+            if len(self._hedges) + 1 > self.max_rate * len(self._calls):
+                self.counters['skipped_rate_cap'] += 1
+                return False
+            self._hedges.append(now)
+            self.counters['hedged'] += 1
+            return True
+
+    def _count_call(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._calls.append(now)
+            self.counters['calls'] += 1
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _trim(self, now: float) -> None:
+        for window in (self._calls, self._hedges):
+            while window and now - window[0] > self.RATE_WINDOW_SECONDS:
+                window.popleft()
+
+    @staticmethod
+    def _discard(task: asyncio.Future) -> None:
+        # Retrieve the losing copy's outcome so asyncio does not log it as unhandled
+        if not task.cancelled():
+            task.exception()
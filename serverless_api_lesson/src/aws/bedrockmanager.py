@@ -2,14 +2,37 @@
 """Class to handle all calls with Amazon Bedrock"""
 import json
 import asyncio
-from typing import Dict, Any
+import time
+from typing import Dict, Any, AsyncIterator, Callable, Optional, Tuple
 import boto3
 from botocore.config import Config
 
 try:
     from src.util.importhelper import ImportHelper
+    from src.util.jsonparser import IncrementalJsonParser, extract_json
+    from src.aws.bedrockcache import BedrockResponseCache, request_cache_key
+    from src.aws.bedrockgovernor import BedrockGovernor, is_throttling_error
+    from src.aws.bedrockhedger import BedrockHedger
+    from src.aws.promptcache import PromptCacheUsage
+    from src.aws.singleflight import SingleFlight
+    from src.util.loggers.emfmetrics import BedrockMetrics, current_labels
 except ImportError:
     from util.importhelper import ImportHelper
+    from util.jsonparser import IncrementalJsonParser, extract_json
+    from aws.bedrockcache import BedrockResponseCache, request_cache_key
+    from aws.bedrockgovernor import BedrockGovernor, is_throttling_error
+    from aws.bedrockhedger import BedrockHedger
+    from aws.promptcache import PromptCacheUsage
+    from aws.singleflight import SingleFlight
+    from util.loggers.emfmetrics import BedrockMetrics, current_labels
+
+class BedrockParseError(ValueError):
+    """Bedrock returned text that is not valid JSON; the raw text is kept for repair"""
+
+    def __init__(self, message: str, content: str, meta: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.content = content
+        self.meta = meta
 
 class BedrockManager:
     """Bedrock manager for handling API calls and response processing"""
@@ -19,56 +42,289 @@ class BedrockManager:
         self.logger = logger
         self.bedrock = self._initialize_bedrock()
         self.executor = None  # Can be set later if needed for async operations
+        self.cache = BedrockResponseCache.get_instance(logger)
+        self.governor = BedrockGovernor.get_instance(logger)
+        self.hedger = BedrockHedger.get_instance(logger)
+        self.usage = PromptCacheUsage.get_instance()
+        self.metrics = BedrockMetrics.get_instance()
 
     def _initialize_bedrock(self):
         """Initialize Bedrock client with retry configuration."""
         config = Config(
-            retries={'max_attempts': 3},
+            retries={'total_max_attempts': 1},  # Retries are handled by RetryPolicy
             read_timeout=30,
             connect_timeout=30,
             max_pool_connections=50
         )
         return boto3.client('bedrock-runtime', config=config)
 
-    async def make_async_call(self, request_params: Dict) -> Dict[str, Any]:
-        """Make async call to Bedrock"""
+    async def make_async_call(self, request_params: Dict, use_cache: Optional[bool] = None) -> Dict[str, Any]:
+        """Make async call to Bedrock, serving identical requests from the response cache.
+
+        Concurrent identical requests on the same event loop share one Bedrock call.
+        use_cache=False skips the cache and the sharing, use_cache=True caches even creative calls.
+        """
+        result, _ = await self.make_detailed_async_call(request_params, use_cache)
+        return result
+
+    async def make_detailed_async_call(self, request_params: Dict, use_cache: Optional[bool] = None,
+                                       validate: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """make_async_call that also returns the call metadata: usage, stopReason and whether it was cached.
+
+        validate(result, meta) is called on a fresh response before it is cached and should raise to
+        reject it. Cache hits, and callers sharing another caller's in-flight call, are returned
+        without calling it; they were validated by whoever stored or started them.
+        """
+        if use_cache is False:
+            return await self._call_bedrock(request_params, use_cache, validate)
+        return await SingleFlight.for_loop().do(
+            request_cache_key(request_params),
+            lambda: self._call_bedrock(request_params, use_cache, validate)
+        )
+
+    async def _call_bedrock(self, request_params: Dict, use_cache: Optional[bool],
+                            validate: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Cache lookup, governed Bedrock call and cache store for make_detailed_async_call"""
+        started = time.monotonic()
+        meta = None
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                self.executor,
-                lambda: self.bedrock.converse(**request_params)
+            cache_key = self.cache.key_for(request_params, use_cache)
+            if cache_key:
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    meta = {"usage": None, "stopReason": None, "cached": True}
+                    self._record_call(request_params, started, meta)
+                    return cached, meta
+            model_id = request_params.get("modelId", "")
+            # Slow calls get a duplicate when hedging is on; each copy takes its own governor slot
+            response = await self.hedger.run(
+                BedrockHedger.latency_key(model_id, current_labels().get("component")),
+                lambda: self.bedrock.converse(**request_params),
+                lambda call: self.governor.run(model_id, call, self.executor)
             )
+            self.usage.record(request_params.get("modelId", ""), response.get("usage"))
+            meta = {
+                "usage": response.get("usage"),
+                "stopReason": response.get("stopReason"),
+                "latencyMs": response.get("metrics", {}).get("latencyMs"),
+                "cached": False
+            }
             content = response["output"]["message"]["content"][0]["text"]
-            cleaned_content = self._clean_json_string(content)
-            return json.loads(cleaned_content)
+            result = self._parse_content(content, meta)
+            self._record_call(request_params, started, meta)
                 
         except Exception as e:
+            self._record_call(request_params, started, meta, e)
             self.logger.error(f"Bedrock API error: {str(e)}")
             self.logger.error(f"Failed to parse response. Raw content: {content if 'content' in locals() else 'No content'}")
             self.logger.error(f"Request params: {str(request_params)}")
             raise
 
-    def make_sync_call(self, request_params: Dict) -> Dict[str, Any]:
-        """Make synchronous call to Bedrock"""
+        # Only results the caller accepts are cached; a rejected result raises to the caller
+        if validate:
+            validate(result, meta)
+        # Truncated output may have been closed by the extractor; never serve it again from cache
+        if cache_key and meta["stopReason"] != "max_tokens":
+            await self.cache.set(cache_key, result)
+        return result, meta
+
+    async def stream_async_call(self, request_params: Dict, root_key: Optional[str] = None, use_cache: Optional[bool] = None,
+                                validate: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream a converse call, yielding (key, value) pairs as soon as each JSON member closes.
+
+        With root_key set the members of response[root_key] are yielded instead of the
+        top-level members. Falls back to the buffered make_async_call when the client or
+        model cannot stream and nothing has been yielded yet. validate(result, meta) is
+        called on the complete response before it is cached, as in make_detailed_async_call.
+        """
+        if not hasattr(self.bedrock, 'converse_stream'):
+            async for item in self._buffered_items(request_params, root_key, use_cache, validate=validate):
+                yield item
+            return
+
+        # Cache hits are replayed without opening a stream
+        cache_key = self.cache.key_for(request_params, use_cache)
+        cached = await self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            async for item in self._buffered_items(request_params, root_key, use_cache, result=cached):
+                yield item
+            return
+
+        parser = IncrementalJsonParser(root_key)
+        meta = {"usage": None, "stopReason": None, "latencyMs": None, "cached": False}
+        yielded = False
+        try:
+            async for delta in self._stream_deltas(request_params, root_key, meta):
+                for key, value in parser.feed(delta):
+                    yielded = True
+                    yield key, value
+        except Exception as e:
+            if yielded:
+                self.logger.error(f"Bedrock stream failed mid-response: {str(e)}")
+                raise
+            self.logger.warning(f"Bedrock streaming unavailable, using buffered call: {str(e)}")
+            async for item in self._buffered_items(request_params, root_key, use_cache, validate=validate):
+                yield item
+            return
+
+        if parser.complete:
+            result = parser.result()
+            if validate:
+                validate(result, meta)
+            if cache_key:
+                await self.cache.set(cache_key, result)
+        else:
+            # Truncated at maxTokens: close what arrived and hand over the members not yet yielded
+            result = self._parse_content(parser.text)
+        # Same unwrapping as _buffered_items: a root_key holding a list or scalar is yielded as one member
+        document = result[root_key] if root_key and isinstance(result.get(root_key), dict) else result
+        for key, value in (document.items() if isinstance(document, dict) else []):
+            if key not in parser.members:
+                yield key, value
+
+    async def _buffered_items(self, request_params: Dict, root_key: Optional[str], use_cache: Optional[bool],
+                              result: Optional[Dict[str, Any]] = None,
+                              validate: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Buffered fallback for stream_async_call, also used to replay cache hits"""
+        if result is None:
+            result, _ = await self.make_detailed_async_call(request_params, use_cache, validate)
+        if root_key and isinstance(result.get(root_key), dict):
+            result = result[root_key]
+        for key, value in result.items():
+            yield key, value
+
+    async def _stream_deltas(self, request_params: Dict, root_key: Optional[str] = None,
+                             meta: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Run converse_stream on the executor and relay text deltas to the event loop.
+
+        The governor slot is held by the worker thread until the stream is drained.
+        One telemetry record is emitted per stream, with the time to the first delta.
+        Usage and stopReason are written into meta once the stream ends.
+        """
+        loop = asyncio.get_event_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = {"requested": False}
+        if meta is None:
+            meta = {"usage": None, "stopReason": None, "latencyMs": None, "cached": False}
+        started = time.monotonic()
+        ttft_ms = None
+        error = None
+        limiter = await self.governor.acquire(request_params.get("modelId", ""))
+
+        def pump():
+            try:
+                response = self.bedrock.converse_stream(**request_params)
+                for event in response["stream"]:
+                    if stop["requested"]:
+                        break
+                    if "metadata" in event:
+                        self.usage.record(limiter.model_id, event["metadata"].get("usage"))
+                        meta["usage"] = event["metadata"].get("usage")
+                        meta["latencyMs"] = event["metadata"].get("metrics", {}).get("latencyMs")
+                    if "messageStop" in event:
+                        meta["stopReason"] = event["messageStop"].get("stopReason")
+                    text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, ("delta", text))
+                limiter.on_success()
+                loop.call_soon_threadsafe(queue.put_nowait, ("end", None))
+            except Exception as e:  # pylint: disable=W0703
+                self.governor.record_failure(limiter, e)
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+            finally:
+                limiter.release()
+
+        loop.run_in_executor(self.executor, pump)
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "delta":
+                    if ttft_ms is None:
+                        ttft_ms = (time.monotonic() - started) * 1000
+                    yield payload
+                elif kind == "error":
+                    error = payload
+                    raise payload
+                else:
+                    break
+        finally:
+            # The worker thread notices on its next event and closes the stream
+            stop["requested"] = True
+            self._record_call(request_params, started, meta, error, ttft_ms=ttft_ms, component=root_key)
+
+    def make_sync_call(self, request_params: Dict, use_cache: Optional[bool] = None,
+                       validate: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """Make synchronous call to Bedrock, serving identical requests from the response cache.
+
+        validate(result, meta) is called on a fresh response before it is cached, as in make_detailed_async_call.
+        """
+        started = time.monotonic()
+        meta = None
         try:
-            response = self.bedrock.converse(**request_params)
+            cache_key = self.cache.key_for(request_params, use_cache)
+            if cache_key:
+                cached = self.cache.lookup(cache_key)
+                if cached is not None:
+                    self._record_call(request_params, started, {"cached": True})
+                    return cached
+            response = self.governor.run_sync(
+                request_params.get("modelId", ""),
+                lambda: self.bedrock.converse(**request_params)
+            )
+            self.usage.record(request_params.get("modelId", ""), response.get("usage"))
+            meta = {
+                "usage": response.get("usage"),
+                "stopReason": response.get("stopReason"),
+                "latencyMs": response.get("metrics", {}).get("latencyMs"),
+                "cached": False
+            }
             content = response["output"]["message"]["content"][0]["text"]
-            cleaned_content = self._clean_json_string(content)
-            return json.loads(cleaned_content)
+            result = self._parse_content(content, meta)
+            self._record_call(request_params, started, meta)
                 
         except Exception as e:
+            self._record_call(request_params, started, meta, e)
             self.logger.error(f"Bedrock API error: {str(e)}")
             self.logger.error(f"Failed to parse response. Raw content: {content if 'content' in locals() else 'No content'}")
             self.logger.error(f"Request params: {str(request_params)}")
             raise
 
-    def _clean_json_string(self, content: str) -> str:
-        """Remove markdown JSON code block markers if present."""
-        content = content.strip()
-        if content.startswith('```json'):
-            content = content[7:]  # Remove ```json
-        elif content.startswith('```'):
-            content = content[3:]  # Remove ```
-        if content.endswith('```'):
-            content = content[:-3]  # Remove trailing ```
-        return content
\ No newline at end of file
+        if validate:
+            validate(result, meta)
+        if cache_key and meta["stopReason"] != "max_tokens":
+            self.cache.store(cache_key, result)
+        return result
+
+    def _record_call(self, request_params: Dict, started: float, meta: Optional[Dict[str, Any]],
+                     error: Optional[Exception] = None, ttft_ms: Optional[float] = None,
+                     component: Optional[str] = None) -> None:
+        """Emit the telemetry record for one call; a metrics failure never fails the call"""
+        try:
+            self.metrics.record(
+                request_params.get("modelId", ""),
+                (time.monotonic() - started) * 1000,
+                meta,
+                ttft_ms=ttft_ms,
+                throttled=error is not None and is_throttling_error(error),
+                parse_failed=isinstance(error, BedrockParseError),
+                failed=error is not None,
+                component=component
+            )
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.warning(f"Failed to record Bedrock metrics: {str(e)}")
+
+    def _parse_content(self, content: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Extract the model's JSON in one pass, raising BedrockParseError with the raw text on failure"""
+        try:
+            result, report = extract_json(content)
+        except json.JSONDecodeError as e:
+            raise BedrockParseError(f"Invalid JSON in Bedrock response: {str(e)}", content, meta) from e
+        if meta is not None:
+            meta["repaired"] = report['repaired']
+        if report['truncated']:
+            self.logger.warning(f"Bedrock response was truncated, closed with '{report['closed']}' (dropped tail: {report['dropped_tail']})")
+        elif report['repaired']:
+            self.logger.info(f"Repaired Bedrock JSON: {report['trailing_commas']} trailing comma(s) removed")
+        if not isinstance(result, dict):
+            raise BedrockParseError("Bedrock response is not a JSON object", content, meta)
+        return result
@@ -0,0 +1,70 @@
+# pylint: disable=C0301
+"""Single-flight coalescing of identical in-flight Bedrock calls"""
+import asyncio
+import copy
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Lets concurrent identical calls on one event loop share a single execution.
+
+    The first caller for a key starts the work as a task; later callers with the
+    same key await that task instead of starting their own. Each waiter awaits
+    through asyncio.shield, so one waiter being cancelled (a client disconnect,
+    a timeout) does not cancel the others; the shared task is only cancelled
+    once every waiter has gone. Futures are bound to their event loop, so there
+    is one SingleFlight per loop.
+    """
+
+    _loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SingleFlight]" = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self.metrics = {
+            'leaders': 0,
+            'coalesced': 0,
+            'cancelled': 0
+        }
+
+    @classmethod
+    def for_loop(cls) -> 'SingleFlight':
+        """Get or create the SingleFlight for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop not in cls._loops:
+            cls._loops[loop] = SingleFlight()
+        return cls._loops[loop]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() once per key at a time and share its outcome with every concurrent caller"""
+        call = self._calls.get(key)
+        if call is None:
+            call = {'task': asyncio.ensure_future(factory()), 'waiters': 0}
+            self._calls[key] = call
+            call['task'].add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.metrics['leaders'] += 1
+        else:
+            self.metrics['coalesced'] += 1
+
+        call['waiters'] += 1
+        try:
+            result = await asyncio.shield(call['task'])
+            # Every waiter but the last to resume gets a copy, so no caller can mutate another's result
+            shared = call['waiters'] > 1
+        except asyncio.CancelledError:
+            if not call['task'].done() and call['waiters'] == 1:
+                # Last one out: nobody is left to receive the result
+                call['task'].cancel()
+                self.metrics['cancelled'] += 1
+            raise
+        finally:
+            call['waiters'] -= 1
+        return copy.deepcopy(result) if shared else result
+
+    def _forget(self, key: str, call: Dict[str, Any]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
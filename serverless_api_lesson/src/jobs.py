@@ -0,0 +1,104 @@
+import json
+import uuid
+from typing import Dict, Any, Awaitable, Callable
+
+try:
+    from util.lambdahelper import LambdaHelper
+    from util.loggers.applogger import AppLogger
+    from services.lessonservice import LessonService
+    from services.jobservice import JobService, CREATE_LESSON
+except ImportError:
+    from src.util.lambdahelper import LambdaHelper
+    from src.util.loggers.applogger import AppLogger
+    from src.services.lessonservice import LessonService
+    from src.services.jobservice import JobService, CREATE_LESSON
+
+LOGGER = AppLogger(__name__)
+LAMBDAHELPER = LambdaHelper(LOGGER)
+LESSON_SERVICE = LessonService(LOGGER)
+JOB_SERVICE = JobService.get_instance(LOGGER)
+
+
+async def run_create_lesson(request: Dict[str, Any], progress: Callable[[str, Any], Awaitable[None]]) -> Dict[str, Any]:
+    """Job runner: the same create_lesson path as /lessons/create, reporting each finished component.
+    The generation id survives SQS redelivery, so a worker that timed out resumes from its checkpoints."""
+    lesson_plan = await LESSON_SERVICE.create_lesson(
+        topic=request.get('topic'),
+        profile=request.get('profile'),
+        existing_plan=request.get('existing_plan'),
+        grade=request.get('grade'),
+        subject=request.get('subject'),
+        user_chat=request.get('user_chat'),
+        on_component=progress,
+        generation_id=request.get('generation_id')
+    )
+    return {"lesson_plan": lesson_plan}
+
+
+JOB_SERVICE.register(CREATE_LESSON, run_create_lesson)
+
+
+def create_lesson_job(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Lambda handler that queues a lesson plan generation and returns its job id at once"""
+    LOGGER.info("create_lesson_job event payload: %s", json.dumps(event))
+
+    try:
+        email = event["requestContext"]["authorizer"]["principalId"]
+        body = json.loads(event.get('body', '{}'))
+
+        if not body.get('topic'):
+            return LAMBDAHELPER.format_response(400, {
+                "error": "Lesson topic is required"
+            })
+
+        request = {
+            key: body.get(key)
+            for key in ('topic', 'profile', 'existing_plan', 'grade', 'subject', 'user_chat')
+        }
+        request['generation_id'] = LAMBDAHELPER.get_idempotency_key(event, body) or f"{email}:{uuid.uuid4()}"
+        job = JOB_SERVICE.submit(email, CREATE_LESSON, request)
+
+        return LAMBDAHELPER.format_response(202, {
+            "jobId": job['jobId'],
+            "status": job['status']
+        })
+
+    except json.JSONDecodeError as err:
+        LOGGER.error("Error parsing JSON: %s", str(err))
+        return LAMBDAHELPER.format_response(400, {
+            "error": "Invalid JSON in request body"
+        })
+    except Exception as err:
+        LOGGER.error("Error in create_lesson_job: %s", str(err))
+        return LAMBDAHELPER.format_response(500, {
+            "error": f"An error occurred: {str(err)}"
+        })
+
+
+def get_job(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Lambda handler for polling a job's status, component progress and partial results"""
+    LOGGER.info("get_job event payload: %s", json.dumps(event))
+
+    try:
+        email = event["requestContext"]["authorizer"]["principalId"]
+        job_id = event["pathParameters"]["jobId"]
+
+        job = JOB_SERVICE.get(job_id, owner=email)
+        if job is None:
+            return LAMBDAHELPER.format_response(404, {
+                "error": "Job not found"
+            })
+
+        return LAMBDAHELPER.format_response(200, JOB_SERVICE.status_view(job))
+
+    except Exception as err:
+        LOGGER.error("Error in get_job: %s", str(err))
+        return LAMBDAHELPER.format_response(500, {
+            "error": f"An error occurred: {str(err)}"
+        })
+
+
+def process_jobs(event: Dict[str, Any], context: Any) -> None:
+    """SQS-triggered worker that runs queued jobs"""
+    LOGGER.info("process_jobs received %s records", len(event.get('Records', [])))
+    JOB_SERVICE.process_records(event.get('Records', []))
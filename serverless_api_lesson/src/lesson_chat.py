@@ -9,12 +9,16 @@ try:
     from aws.dynamomanager import DynamoManager
     from aws.bedrockmanager import BedrockManager
     from util.loggers.applogger import AppLogger
+    from util.lambdahelper import LambdaHelper
+    from util.pagination import parse_page_request, encode_cursor, PageRequestError
 except ImportError:
     from src.services.chat.orchestration.component_orchestrator import ComponentOrchestrator
     from src.services.messageanalysis import MessageAnalyzer
     from src.aws.dynamomanager import DynamoManager
     from src.aws.bedrockmanager import BedrockManager
     from src.util.loggers.applogger import AppLogger
+    from src.util.lambdahelper import LambdaHelper
+    from src.util.pagination import parse_page_request, encode_cursor, PageRequestError
 
 LOGGER = AppLogger(__name__)
 BEDROCK = BedrockManager(LOGGER)
@@ -139,7 +143,8 @@ def chat_with_lesson(event: Dict[str, Any], context: Any):
                     'topic': body.get('topic'),
                     'profile': body.get('profile', {}),
                     'lessonId': body.get('lessonId')
-                }
+                },
+                generation_id=LambdaHelper.get_idempotency_key(event, body)
             )
         )
         
@@ -168,33 +173,53 @@ def chat_with_lesson(event: Dict[str, Any], context: Any):
         }
 
 def get_chat_history(event: Dict[str, Any], context: Any):
-    """Lambda handler for retrieving chat history for a lesson"""
+    """Lambda handler for retrieving chat history for a lesson, oldest first unless order=desc;
+    supports limit, cursor, order and fields query parameters"""
     LOGGER.info("get_chat_history event payload: %s", json.dumps(event))
     
     try:
         # Get user email from authorizer
         email = event["requestContext"]["authorizer"]["principalId"]
         lesson_id = event["pathParameters"]["lessonId"]
+        page = parse_page_request(event)
+        page.check_cursor('lessonId', lesson_id)
+
+        # History is keyed by lesson, so check the lesson belongs to the user first
+        try:
+            DYNAMO_MANAGER.get_dynamo_item_multi_key(os.environ['LESSONS_TABLE'], {'email': email, 'lessonId': lesson_id})
+        except KeyError:
+            return {
+                'statusCode': 404,
+                'body': json.dumps({"error": f"Lesson '{lesson_id}' not found"}),
+                'headers': {'Content-Type': 'application/json'}
+            }
         
-        # Query chat history from DynamoDB
-        chat_history = DYNAMO_MANAGER.query_table(
+        # Query chat history from DynamoDB, ordered by timestamp
+        chat_history, last_key = DYNAMO_MANAGER.query_page(
             table_name=os.environ['CHAT_HISTORY_TABLE'],
-            key_condition_expression='lessonId = :lid AND email = :email',
-            expression_attribute_values={
-                ':lid': lesson_id,
-                ':email': email
-            }
+            filter_key='lessonId',
+            filter_value=lesson_id,
+            limit=page.limit,
+            exclusive_start_key=page.cursor,
+            forward=page.forward(),
+            fields=page.fields
         )
         
         return {
             'statusCode': 200,
-            'body': json.dumps({"chatHistory": chat_history}),
+            'body': json.dumps({"chatHistory": chat_history, "nextCursor": encode_cursor(last_key)}),
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             }
         }
         
+    except PageRequestError as err:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({"error": str(err)}),
+            'headers': {'Content-Type': 'application/json'}
+        }
     except Exception as err:
         LOGGER.error("Error in get_chat_history: %s", str(err))
         return {
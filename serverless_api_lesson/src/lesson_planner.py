@@ -6,18 +6,23 @@ from typing import Dict, Any
 try:
     from util.lambdahelper import LambdaHelper
     from util.loggers.applogger import AppLogger
+    from util.pagination import parse_page_request, encode_cursor, PageRequestError
     from services.lessonservice import LessonService
     from aws.dynamomanager import DynamoManager
+    from services.foundationcache import FoundationCache
 except ImportError:
     from src.util.lambdahelper import LambdaHelper
     from src.util.loggers.applogger import AppLogger
+    from src.util.pagination import parse_page_request, encode_cursor, PageRequestError
     from src.services.lessonservice import LessonService
     from src.aws.dynamomanager import DynamoManager
+    from src.services.foundationcache import FoundationCache
 
 LOGGER = AppLogger(__name__)
 LAMBDAHELPER = LambdaHelper(LOGGER)
 LESSON_SERVICE = LessonService(LOGGER)
 DYNAMO_MANAGER = DynamoManager(LOGGER)
+VERSION_FIELDS = ['lessonId', 'profileVersion', 'content', 'title', 'grade', 'subject', 'timestamp', 'version', 'profileId', 'email']
 
 def create_lesson(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Lambda handler for generating lesson plans"""
@@ -40,7 +45,8 @@ def create_lesson(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 existing_plan=body.get('existing_plan'),
                 grade=body.get('grade'),
                 subject=body.get('subject'),
-                user_chat=body.get('user_chat')  # Add user_chat paramete
+                user_chat=body.get('user_chat'),  # Add user_chat paramete
+                generation_id=LAMBDAHELPER.get_idempotency_key(event, body)
             )
         )
         
@@ -92,20 +98,33 @@ def save_lesson(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         })
 
 def list_lessons(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    """Lambda handler for listing user's lesson plans"""
+    """Lambda handler for listing user's lesson plans; supports limit, cursor, order and fields query parameters"""
     LOGGER.info("list_lessons event payload: %s", json.dumps(event))
     
     try:
         # Get user email from authorizer
         email = event["requestContext"]["authorizer"]["principalId"]
+        page = parse_page_request(event, allowed_fields=LessonService.LESSON_LIST_FIELDS)
+        page.check_cursor('email', email)
         
         # Retrieve lessons
-        lessons = LESSON_SERVICE.get_user_lessons(email)
+        lessons, last_key = LESSON_SERVICE.get_user_lessons_page(
+            email,
+            limit=page.limit,
+            cursor=page.cursor,
+            forward=page.forward(),
+            fields=page.fields
+        )
         
         return LAMBDAHELPER.format_response(200, {
-            "lessons": lessons
+            "lessons": lessons,
+            "nextCursor": encode_cursor(last_key)
         })
         
+    except PageRequestError as err:
+        return LAMBDAHELPER.format_response(400, {
+            "error": str(err)
+        })
     except Exception as err:
         LOGGER.error("Error in list_lessons: %s", str(err))
         return LAMBDAHELPER.format_response(500, {
@@ -165,6 +184,9 @@ def delete_lesson(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         })
     
 def get_lesson_versions(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Versions of one lesson. Unpaginated results are sorted newest first unless an order is given;
+    paginated results (limit or cursor) always come in profileId order, as the table returns them,
+    so that pages neither overlap nor skip versions"""
     LOGGER.info("get_lesson_versions event payload: %s", json.dumps(event))
     try:
         # Get user email from authorizer for access control
@@ -173,8 +195,19 @@ def get_lesson_versions(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Extract lesson ID from request path parameters
         lesson_id = event["pathParameters"]["lessonId"]
         
-        # Retrieve all versions using the lesson service
-        versions = LESSON_SERVICE.get_lesson_versions(email, lesson_id)
+        page = parse_page_request(event, allowed_fields=VERSION_FIELDS)
+        page.check_cursor('lessonId', lesson_id)
+        fields = page.fields or VERSION_FIELDS
+        
+        # Retrieve one page of versions (every version without limit or cursor) using the lesson service
+        versions, last_key = LESSON_SERVICE.get_lesson_versions_page(
+            email,
+            lesson_id,
+            limit=page.limit,
+            cursor=page.cursor,
+            forward=page.forward(),
+            fields=page.fields
+        )
         
         # Format each version while preserving all saved fields
         formatted_versions = []
@@ -191,18 +224,39 @@ def get_lesson_versions(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'profileId': version.get('profileId'),
                 'email': version.get('email')
             }
-            formatted_versions.append(formatted_version)
+            formatted_versions.append({field: formatted_version[field] for field in fields})
 
-        # Sort versions by timestamp for consistent ordering
-        formatted_versions.sort(key=lambda x: x['timestamp'], reverse=True)
+        # Unpaginated results without an explicit order are sorted by timestamp; pages and
+        # explicit orders keep the table's profileId order so the cursor stays consistent
+        if not page.paginated and page.order is None and 'timestamp' in fields:
+            formatted_versions.sort(key=lambda x: x['timestamp'] or '', reverse=True)
 
         return LAMBDAHELPER.format_response(200, {
             "versions": formatted_versions,
-            "totalVersions": len(formatted_versions)
+            "totalVersions": len(formatted_versions),
+            "nextCursor": encode_cursor(last_key)
         })
         
+    except PageRequestError as err:
+        return LAMBDAHELPER.format_response(400, {
+            "error": str(err)
+        })
     except Exception as err:
         LOGGER.error("Error retrieving lesson versions: %s", str(err))
         return LAMBDAHELPER.format_response(500, {
             "error": f"An error occurred while retrieving lesson versions: {str(err)}"
-        })
\ No newline at end of file
+        })
+
+def invalidate_foundation_cache(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Operator-invoked handler that drops cached foundation components for one topic/grade/subject,
+    e.g. serverless invoke -f invalidateFoundationCache --data '{"topic": "fractions", "grade": "4"}'"""
+    LOGGER.info("invalidate_foundation_cache event payload: %s", json.dumps(event))
+
+    if not event.get('topic'):
+        return {"error": "topic is required"}
+    return FoundationCache.get_instance(LOGGER).invalidate(
+        topic=event['topic'],
+        grade=event.get('grade'),
+        subject=event.get('subject'),
+        components=event.get('components')
+    )
@@ -199,14 +199,13 @@ def load_profiles(user_email):
         }
     ]
     
-    # Load each profile into DynamoDB
-    for profile in profiles:
-        try:
-            DYNAMO_MANAGER.put_dynamo_item(
-                table_name=os.environ['PROFILES_TABLE'],
-                payload=profile
-            )
-            print(f"Successfully loaded profile: {profile['profilename']}")
-        except Exception as e:
-            print(f"Error loading profile {profile['profilename']}: {str(e)}")
+    # Load all profiles into DynamoDB with one batch write
+    try:
+        DYNAMO_MANAGER.batch_put(
+            table_name=os.environ['PROFILES_TABLE'],
+            items=profiles
+        )
+        print(f"Successfully loaded profiles: {', '.join(profile['profilename'] for profile in profiles)}")
+    except Exception as e:
+        print(f"Error loading profiles: {str(e)}")
     return profiles
\ No newline at end of file
@@ -1,49 +1,72 @@
 # serverless-api/src/services/chat/generators/chat_generator.py
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
 import json
+import os
 
 try:
     from services.shared.base_generator import BaseGenerator
+    from services.shared.token_budget import TokenBudget
+    from services.shared.retry_policy import chain_observers, SchemaValidationError
     from services.chat.prompts.chat_prompt_builder import ChatPromptBuilder
     from util.loggers.applogger import AppLogger
-    from aws.bedrockmanager import BedrockManager
+    from util.loggers.emfmetrics import metric_labels
+    from util.jsonpatch import apply_patch, same_shape, JsonPatchError
+    from aws.bedrockmanager import BedrockManager, BedrockParseError
+    from aws.modelrouter import ModelRouter, tier_update_task
     from services.chat.prompts.system_prompt_builder import SystemPromptBuilder
 except ImportError:
     from src.services.shared.base_generator import BaseGenerator
+    from src.services.shared.token_budget import TokenBudget
+    from src.services.shared.retry_policy import chain_observers, SchemaValidationError
     from src.services.chat.prompts.chat_prompt_builder import ChatPromptBuilder
     from src.util.loggers.applogger import AppLogger
-    from src.aws.bedrockmanager import BedrockManager
+    from src.util.loggers.emfmetrics import metric_labels
+    from src.util.jsonpatch import apply_patch, same_shape, JsonPatchError
+    from src.aws.bedrockmanager import BedrockManager, BedrockParseError
+    from src.aws.modelrouter import ModelRouter, tier_update_task
     from src.services.chat.prompts.system_prompt_builder import SystemPromptBuilder
 
 class ChatGenerator(BaseGenerator):
+    # Tier 1 and 2 edits are small enough to send as JSON Patch operations; tier 3 rewrites regenerate in full
+    PATCH_TIERS = (1, 2)
+    PATCH_MAX_TOKENS = 1000
+    PATCH_PROMPT = {
+        "text": """This is a patch update. Instead of the whole component, respond only with
+            {"patch": [...]} holding RFC 6902 JSON Patch operations (add, remove, replace, move, copy, test)
+            against the current content. Paths are JSON Pointers relative to the component object itself.
+            Change only what the feedback asks for and leave everything else untouched."""
+    }
+
     def __init__(self, bedrock_client: BedrockManager, logger: Optional[AppLogger] = None):
         """Initialize with Bedrock client and logger"""
         super().__init__(bedrock_client, logger)
         self.prompt_builder = ChatPromptBuilder()
         self.system_prompt_builder = SystemPromptBuilder(logger)
+        self.token_budget = TokenBudget.get_instance(self.logger)
+        self.router = ModelRouter.get_instance(self.logger)
+        self.patch_mode = os.environ.get('CHAT_PATCH_MODE', 'on').lower() in ('on', 'true', '1')
         
     async def update_component(self, message: str, component: str, current_content: Dict[str, Any], context: Dict[str, Any], tier: int = 2) -> Dict[str, Any]:
         try:
-            # Get appropriate system prompt based on component type
-            system_prompt = self._get_system_prompt(component, context)
-            
-            # Build user message
-            user_message = self._build_user_message(
-                message=message,
-                component=component,
-                current_content=current_content,
-                tier=tier
-            )
-            
-            # Prepare request parameters
-            request_params = self.prepare_request_params(
-                messages=[user_message],
-                system_prompt=system_prompt,
-                **self._get_component_config(component, tier)
-            )
+            if self._use_patch(current_content, tier):
+                try:
+                    return await self.patch_component(message, component, current_content, context, tier)
+                except (JsonPatchError, SchemaValidationError, BedrockParseError, json.JSONDecodeError) as e:
+                    # Only unusable patches fall back; throttles and backpressure would fail the full rewrite too
+                    self.logger.warning(f"Patch update of {component} failed, regenerating it in full: {str(e)}")
+
+            request_params = self._build_update_request(message, component, current_content, context, tier)
             
             # Generate update with retry
-            result = await self.generate_with_retry(request_params)
+            with metric_labels(component=component, tier=tier, caller="ChatGenerator"):
+                result = await self.generate_with_retry(
+                    request_params,
+                    required_keys=[component],
+                    on_response=chain_observers(
+                        self.token_budget.observer(component, tier),
+                        self.router.observer(tier_update_task(tier))
+                    )
+                )
             
             # Validate and clean response
             if not self.validate_response(result, [component]):
@@ -54,6 +77,97 @@ class ChatGenerator(BaseGenerator):
         except Exception as e:
             return self.handle_generation_error(e, component, context)
             
+    async def stream_update_component(self, message: str, component: str, current_content: Dict[str, Any], context: Dict[str, Any], tier: int = 2) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream an update, yielding (section, value) pairs of the component as each one closes"""
+        request_params = self._build_update_request(message, component, current_content, context, tier)
+
+        def validate(result: Dict[str, Any], _meta: Optional[Dict[str, Any]]) -> None:
+            if not self.validate_response(result, [component]):
+                raise ValueError(f"Invalid response format for {component}")
+
+        async for section, value in self.bedrock.stream_async_call(request_params, root_key=component, validate=validate):
+            yield section, value
+
+    async def patch_component(self, message: str, component: str, current_content: Dict[str, Any], context: Dict[str, Any], tier: int = 2) -> Dict[str, Any]:
+        """Ask for JSON Patch operations against current_content and apply them locally.
+
+        Raises JsonPatchError when the operations do not apply or change the
+        component's structure, so the caller can fall back to a full update.
+        """
+        request_params = self._build_patch_request(message, component, current_content, context, tier)
+        budget_tier = f"{tier}-patch"
+
+        def apply(result: Dict[str, Any]) -> Any:
+            patched = apply_patch(current_content, result["patch"])
+            if not same_shape(current_content, patched):
+                raise JsonPatchError(f"Patch changed the structure of {component}")
+            return patched
+
+        with metric_labels(component=component, tier=tier, caller="ChatGenerator", mode="patch"):
+            result = await self.generate_with_retry(
+                request_params,
+                required_keys=["patch"],
+                on_response=chain_observers(
+                    self.token_budget.observer(component, budget_tier),
+                    self.router.observer(tier_update_task(tier))
+                ),
+                # Patches that do not apply are rejected before they can be cached
+                validate=apply
+            )
+
+        patched = apply(result)
+        self.logger.info(f"Updated {component} with {len(result['patch'])} patch operations")
+        return self.clean_response({component: patched})
+
+    def _use_patch(self, current_content: Any, tier: int) -> bool:
+        return self.patch_mode and tier in self.PATCH_TIERS and isinstance(current_content, (dict, list)) and bool(current_content)
+
+    def _build_patch_request(self, message: str, component: str, current_content: Dict[str, Any], context: Dict[str, Any], tier: int) -> Dict[str, Any]:
+        """Build the converse request for a patch update; the patch instructions follow the cached system prompt"""
+        config = self._get_component_config(component, tier)
+        config["max_tokens"] = self.token_budget.max_tokens(component, f"{tier}-patch", self.PATCH_MAX_TOKENS)
+        user_message = {
+            "role": "user",
+            "content": [{
+                "text": f"""
+                Component to Update: {component}
+                User Feedback: {message}
+                Update Tier: {tier}
+
+                Current Content:
+                {json.dumps(current_content, separators=(',', ':'))}
+
+                Return only {{"patch": [...]}} with the JSON Patch operations for this change.
+                """
+            }]
+        }
+        return self.prepare_request_params(
+            messages=[user_message],
+            system_prompt=self._get_system_prompt(component, context),
+            dynamic_prompt=self.PATCH_PROMPT,
+            **config
+        )
+
+    def _build_update_request(self, message: str, component: str, current_content: Dict[str, Any], context: Dict[str, Any], tier: int) -> Dict[str, Any]:
+        """Build the converse request for a component update"""
+        # Get appropriate system prompt based on component type
+        system_prompt = self._get_system_prompt(component, context)
+        
+        # Build user message
+        user_message = self._build_user_message(
+            message=message,
+            component=component,
+            current_content=current_content,
+            tier=tier
+        )
+        
+        # Prepare request parameters
+        return self.prepare_request_params(
+            messages=[user_message],
+            system_prompt=system_prompt,
+            **self._get_component_config(component, tier)
+        )
+            
     def _get_system_prompt(self, component: str, context: Dict[str, Any]) -> Dict[str, str]:
         """Get appropriate system prompt based on component type"""
         return self.system_prompt_builder.get_system_prompt(component, context)
@@ -104,6 +218,10 @@ class ChatGenerator(BaseGenerator):
                 else:
                     config[key] += adjustment
                     
+        # The hardcoded budget is the fallback until enough usage has been observed
+        config["max_tokens"] = self.token_budget.max_tokens(component, tier, config["max_tokens"])
+        # Smaller tiers are routed to cheaper models
+        config["model_id"] = self.router.model_for(tier_update_task(tier))
         return config
         
     async def generate_component(self, component: str, context: Dict[str, Any]) -> Dict[str, Any]:
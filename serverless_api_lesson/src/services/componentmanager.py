@@ -1,19 +1,36 @@
 import json
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any, Callable, List, Optional
 import asyncio
 try:
     from services.parallellessonservice import ParallelLessonService
     from util.loggers.applogger import AppLogger
+    from services.shared.retry_policy import RetryPolicy, SchemaValidationError
+    from aws.modelrouter import ModelRouter, tier_update_task
+    from util.loggers.emfmetrics import metric_labels
+    from util.jsonpatch import apply_patch, same_shape, JsonPatchError
+    from aws.bedrockmanager import BedrockParseError
 except ImportError:
     from src.services.parallellessonservice import ParallelLessonService
     from src.util.loggers.applogger import AppLogger
+    from src.services.shared.retry_policy import RetryPolicy, SchemaValidationError
+    from src.aws.modelrouter import ModelRouter, tier_update_task
+    from src.util.loggers.emfmetrics import metric_labels
+    from src.util.jsonpatch import apply_patch, same_shape, JsonPatchError
+    from src.aws.bedrockmanager import BedrockParseError
 
 class ComponentManager:
     """Manages updates to lesson plan components"""
+
+    # Tier 1 and 2 edits come back as JSON Patch operations; tier 3 and regenerations are rewritten in full
+    PATCH_TIERS = (1, 2)
     
     def __init__(self, bedrock_client, logger: Optional[AppLogger] = None):
         self.bedrock = bedrock_client
         self.logger = logger or AppLogger(__name__)
+        self.retry_policy = RetryPolicy(self.logger)
+        self.router = ModelRouter.get_instance(self.logger)
+        self.patch_mode = os.environ.get('CHAT_PATCH_MODE', 'on').lower() in ('on', 'true', '1')
 
     def _get_regenerate_system_prompt(self, component: str, current_plan: Dict, context: Dict) -> Dict[str, str]:
         return {
@@ -72,7 +89,7 @@ class ComponentManager:
         updated_plan = current_plan.copy()
         update_tasks = []
         for component in components:
-            task = self._update_component(component, current_plan, user_feedback, context)
+            task = self._update_component(component, current_plan, user_feedback, context, tier)
             update_tasks.append(task)
         results = await asyncio.gather(*update_tasks, return_exceptions=True)
 
@@ -85,8 +102,10 @@ class ComponentManager:
         return updated_plan
     
     async def _regenerate_component(self, component, current_plan, user_feedback, context=None):
+        # A full regeneration is routed like the largest update tier
+        task = tier_update_task(3)
         request_params = {
-            "modelId": ParallelLessonService.MODEL_ID,
+            "modelId": self.router.model_for(task),
             "messages": [{
                 "role": "user",
                 "content": [{
@@ -104,11 +123,37 @@ class ComponentManager:
             }
         }
         self.logger.info(f"regenerating entire component with this bedrock request: {str(request_params)}")
-        return await self._make_bedrock_call(request_params)
+        with metric_labels(component=component, tier="regenerate", caller="ComponentManager"):
+            return await self._make_bedrock_call(request_params, task)
+
+    def _get_patch_system_prompt(self, component: str, context: Dict) -> Dict[str, str]:
+        return {
+            "text": f"""You are an PHD expert lesson component editor who responds only in RFC8259 compliant JSON.
+
+                Only respond with the JSON object, nothing else.
+
+                Task: Apply the user's feedback to the {component} section as RFC 6902 JSON Patch operations.
 
-    async def _update_component(self, component, current_plan, user_feedback, context=None):
+                Profile of the student json:
+                {json.dumps(context if context else {})}
+
+                Requirements:
+                1. Respond with {{"patch": [...]}} holding add, remove, replace, move, copy or test operations
+                2. Paths are JSON Pointers relative to the {component} object itself
+                3. Change only what the feedback asks for and keep the schema structure"""
+        }
+
+    async def _update_component(self, component, current_plan, user_feedback, context=None, tier=None):
+        if self.patch_mode and tier in self.PATCH_TIERS and isinstance(current_plan.get(component), (dict, list)):
+            try:
+                return await self._patch_component(component, current_plan, user_feedback, context, tier)
+            except (JsonPatchError, SchemaValidationError, BedrockParseError, json.JSONDecodeError) as e:
+                # Throttles and backpressure propagate, since a full rewrite would hit the same limit
+                self.logger.warning(f"Patch update of {component} failed, regenerating it in full: {str(e)}")
+
+        task = tier_update_task(tier)
         request_params = {
-            "modelId": ParallelLessonService.MODEL_ID,
+            "modelId": self.router.model_for(task),
             "messages": [{
                 "role": "user",
                 "content": [{
@@ -127,12 +172,52 @@ class ComponentManager:
             }
         }
         self.logger.info(f"updating component with this bedrock request: {str(request_params)}")
-        return await self._make_bedrock_call(request_params)
+        with metric_labels(component=component, tier=tier, caller="ComponentManager"):
+            return await self._make_bedrock_call(request_params, task)
+
+    async def _patch_component(self, component, current_plan, user_feedback, context=None, tier=None):
+        """Ask for JSON Patch operations against the current component and apply them locally"""
+        task = tier_update_task(tier)
+        current = current_plan[component]
+        request_params = {
+            "modelId": self.router.model_for(task),
+            "messages": [{
+                "role": "user",
+                "content": [{
+                    "text": (
+                        f"User Feedback: {user_feedback}\n\n"
+                        f"Current {component}:\n"
+                        f"{json.dumps(current, separators=(',', ':'))}\n\n"
+                        "Return only {\"patch\": [...]} with the JSON Patch operations for this change."
+                    )
+                }]
+            }],
+            "system": [self._get_patch_system_prompt(component, context)],
+            "inferenceConfig": {
+                "maxTokens": 1000,
+                "temperature": 0.3
+            }
+        }
+
+        def apply(result):
+            patched = apply_patch(current, result["patch"])
+            if not same_shape(current, patched):
+                raise JsonPatchError(f"Patch changed the structure of {component}")
+            return patched
+
+        with metric_labels(component=component, tier=tier, caller="ComponentManager", mode="patch"):
+            # Patches that do not apply are rejected before they can be cached
+            result = await self._make_bedrock_call(request_params, task, required_keys=["patch"], validate=apply)
+
+        patched = apply(result)
+        self.logger.info(f"Updated {component} with {len(result['patch'])} patch operations")
+        return patched
 
-    async def _make_bedrock_call(self, request_params: Dict) -> Dict[str, Any]:
-        """Make async call to Bedrock with error handling"""
+    async def _make_bedrock_call(self, request_params: Dict, task: str, required_keys: Optional[List[str]] = None,
+                                 validate: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """Make async call to Bedrock with error handling, recording stats against the model route"""
         try:
-            return await self.bedrock.make_async_call(request_params)
+            return await self.retry_policy.execute(self.bedrock, request_params, required_keys, on_response=self.router.observer(task), validate=validate)
         except Exception as e:
             self.logger.error(f"Bedrock API error: {str(e)}")
-            raise ValueError(f"Error in Bedrock API call: {str(e)}")
\ No newline at end of file
+            raise
\ No newline at end of file
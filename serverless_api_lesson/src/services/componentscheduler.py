@@ -0,0 +1,144 @@
+# serverless-api/src/services/componentscheduler.py
+from typing import Dict, Any, List, Callable, Awaitable, Tuple, Optional
+import asyncio
+import inspect
+import time
+
+
+class ComponentSkipped(Exception):
+    """A component that was not generated because a component it depends on failed"""
+
+    def __init__(self, component: str, failed: List[str]):
+        super().__init__(f"{component} skipped because {', '.join(failed)} failed")
+        self.component = component
+        self.failed = failed
+
+
+class ComponentScheduler:
+    """Runs lesson component generation as a dependency graph.
+
+    Each component starts as soon as the components it depends on have
+    finished, instead of waiting for a whole phase. The graph comes from the
+    dependsOn lists in schema/json/prompts/components.json, so adding a
+    component or an edge needs no code change.
+    """
+
+    def __init__(self, logger, graph: Dict[str, List[str]]):
+        self.logger = logger
+        self.graph = {component: list(depends_on) for component, depends_on in graph.items()}
+        self.order = self._topological_order(self.graph)
+
+    @classmethod
+    def from_definitions(cls, logger, definitions: Dict[str, Dict[str, Any]]) -> 'ComponentScheduler':
+        """Build the graph from component definitions with optional dependsOn lists"""
+        return cls(logger, {component: definition.get("dependsOn", []) for component, definition in definitions.items()})
+
+    @staticmethod
+    def _topological_order(graph: Dict[str, List[str]]) -> List[str]:
+        """Components in dependency order; raises ValueError on unknown dependencies or cycles"""
+        for component, depends_on in graph.items():
+            unknown = [dependency for dependency in depends_on if dependency not in graph]
+            if unknown:
+                raise ValueError(f"Component {component} depends on unknown components: {', '.join(unknown)}")
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(component: str, path: List[str]) -> None:
+            if state.get(component) == "done":
+                return
+            if state.get(component) == "visiting":
+                raise ValueError(f"Component dependency cycle: {' -> '.join(path + [component])}")
+            state[component] = "visiting"
+            for dependency in graph[component]:
+                visit(dependency, path + [component])
+            state[component] = "done"
+            order.append(component)
+
+        for component in graph:
+            visit(component, [])
+        return order
+
+    async def run(self,
+                  generate: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+                  on_complete: Optional[Callable[[str, Any], Any]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Run generate(component, inputs) for every component, each as soon as its inputs resolve.
+
+        inputs maps each dependency to its result. A component that raises is
+        returned as the exception, and its dependents are not run: each is
+        returned as a ComponentSkipped naming the failed dependencies. on_complete(component, value) is called, and awaited if it is
+        a coroutine, as each component succeeds; its errors are logged and do not
+        fail the component. Returns the results and a timing report with the
+        critical path.
+        """
+        started = time.monotonic()
+        timings: Dict[str, Dict[str, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_node(component: str) -> Any:
+            dependencies = self.graph[component]
+            resolved = await asyncio.gather(*(tasks[dependency] for dependency in dependencies))
+            failed = [dependency for dependency, value in zip(dependencies, resolved) if isinstance(value, Exception)]
+            if failed:
+                skipped = ComponentSkipped(component, failed)
+                self.logger.warning(f"Not generating {str(skipped)}")
+                return skipped
+            inputs = dict(zip(dependencies, resolved))
+            node_start = time.monotonic() - started
+            try:
+                value = await generate(component, inputs)
+            except Exception as e:  # pylint: disable=W0703
+                self.logger.error(f"Error generating {component}: {str(e)}")
+                return e
+            finally:
+                timings[component] = {"start": node_start, "end": time.monotonic() - started}
+            if on_complete is not None:
+                await self._notify(on_complete, component, value)
+            return value
+
+        # Dependencies come first in self.order, so their tasks exist before any dependent awaits them
+        for component in self.order:
+            tasks[component] = asyncio.ensure_future(run_node(component))
+        try:
+            values = await asyncio.gather(*(tasks[component] for component in self.order))
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        results = dict(zip(self.order, values))
+        report = self._report(timings, time.monotonic() - started)
+        self.logger.info(
+            f"Component schedule finished in {report['duration']:.2f}s, "
+            f"critical path: {' -> '.join(report['critical_path'])}"
+        )
+        return results, report
+
+    async def _notify(self, on_complete: Callable[[str, Any], Any], component: str, value: Any) -> None:
+        try:
+            outcome = on_complete(component, value)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.warning(f"Completion callback failed for {component}: {str(e)}")
+
+    def _report(self, timings: Dict[str, Dict[str, float]], duration: float) -> Dict[str, Any]:
+        """Per-component timings and the chain of dependencies that determined the total time"""
+        components = {
+            component: {
+                "start": round(timing["start"], 3),
+                "end": round(timing["end"], 3),
+                "duration": round(timing["end"] - timing["start"], 3)
+            }
+            for component, timing in timings.items()
+        }
+        path: List[str] = []
+        current = max(timings, key=lambda component: timings[component]["end"]) if timings else None
+        while current is not None:
+            path.append(current)
+            dependencies = self.graph[current]
+            current = max(dependencies, key=lambda dependency: timings[dependency]["end"]) if dependencies else None
+        return {
+            "duration": round(duration, 3),
+            "critical_path": list(reversed(path)),
+            "components": components
+        }
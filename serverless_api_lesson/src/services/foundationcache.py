@@ -0,0 +1,188 @@
+# serverless-api/src/services/foundationcache.py
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import boto3
+
+try:
+    from src.aws.bedrockcache import LocalLRUCache
+except ImportError:
+    from aws.bedrockcache import LocalLRUCache
+
+GRADE_WORDS = {
+    "k": "k", "kg": "k", "kindergarten": "k", "pre-k": "pk", "prek": "pk",
+    "first": "1", "second": "2", "third": "3", "fourth": "4", "fifth": "5", "sixth": "6",
+    "seventh": "7", "eighth": "8", "ninth": "9", "tenth": "10", "eleventh": "11", "twelfth": "12"
+}
+SUBJECT_ALIASES = {
+    "math": "mathematics", "maths": "mathematics", "mathematics": "mathematics"
+}
+NON_WORD = re.compile(r"[^a-z0-9]+")
+GRADE_NUMBER = re.compile(r"\d{1,2}")
+
+
+def normalize_topic(topic: Optional[str]) -> str:
+    """Lowercase words of the topic, ignoring punctuation, spacing and case"""
+    return " ".join(NON_WORD.sub(" ", (topic or "").lower()).split())
+
+
+def normalize_grade(grade: Optional[str]) -> str:
+    """'Grade 4', '4th', 'fourth' and '4' all become '4'; kindergarten becomes 'k'"""
+    text = (str(grade) if grade is not None else "").strip().lower()
+    if not text or text == "default":
+        return "default"
+    number = GRADE_NUMBER.search(text)
+    if number:
+        return str(int(number.group()))
+    for word in NON_WORD.split(text):
+        if word in GRADE_WORDS:
+            return GRADE_WORDS[word]
+    return normalize_topic(text)
+
+
+def normalize_subject(subject: Optional[str]) -> str:
+    """'Math', 'Maths' and 'Mathematics' share one key; the default subject is mathematics"""
+    text = normalize_topic(subject) or "mathematics"
+    return SUBJECT_ALIASES.get(text, text)
+
+
+class FoundationCache:
+    """Cross-user cache of foundation components keyed by topic, grade and subject.
+
+    standardsAddressed depends only on (topic, grade, subject), so every
+    teacher asking for grade 4 fractions can share one generation. The key is
+    normalized so spelling variants of the same request hit. Entries live in
+    an in-process LRU and in DynamoDB (FOUNDATION_CACHE_TABLE) with a TTL.
+    invalidate() drops a single entry; bumping FOUNDATION_CACHE_VERSION
+    retires every entry at once, e.g. after a prompt or schema change.
+    """
+
+    DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+    _instance: Optional['FoundationCache'] = None
+
+    def __init__(self, logger, table_name: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 version: Optional[str] = None):
+        self.logger = logger
+        self.table_name = table_name if table_name is not None else os.environ.get('FOUNDATION_CACHE_TABLE')
+        self.ttl_seconds = ttl_seconds or float(os.environ.get('FOUNDATION_CACHE_TTL_SECONDS', self.DEFAULT_TTL_SECONDS))
+        self.version = version or os.environ.get('FOUNDATION_CACHE_VERSION', '1')
+        self.enabled = os.environ.get('FOUNDATION_CACHE', 'on').lower() in ('on', 'true', '1')
+        self.local = LocalLRUCache(
+            max_entries=int(os.environ.get('FOUNDATION_CACHE_MAX_ENTRIES', 512)),
+            ttl_seconds=self.ttl_seconds
+        )
+        self._tables = threading.local()
+        self._counter_lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'shared_errors': 0}
+
+    @classmethod
+    def get_instance(cls, logger) -> 'FoundationCache':
+        """Get or create the process-wide foundation cache"""
+        if cls._instance is None:
+            cls._instance = FoundationCache(logger)
+        return cls._instance
+
+    def key_for(self, component: str, topic: str, grade: Optional[str], subject: Optional[str]) -> str:
+        """Normalized cache key, e.g. v1#standardsAddressed#mathematics#4#fractions"""
+        return "#".join([
+            f"v{self.version}",
+            component,
+            normalize_subject(subject),
+            normalize_grade(grade),
+            normalize_topic(topic)
+        ])
+
+    async def get(self, key: str) -> Optional[Any]:
+        """The cached component, or None on a miss"""
+        value = self.local.get(key)
+        if value is None and self.table_name:
+            loop = asyncio.get_event_loop()
+            value = await loop.run_in_executor(None, self._shared_get, key)
+            if value is not None:
+                self.local.set(key, value)
+        self._count('hits' if value is not None else 'misses')
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, component_value: Any) -> None:
+        """Store a generated component in both tiers"""
+        value = json.dumps(component_value)
+        self.local.set(key, value)
+        self._count('stores')
+        if self.table_name:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._shared_put, key, value)
+
+    def invalidate(self, topic: str, grade: Optional[str], subject: Optional[str],
+                   components: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Drop the cached components of one topic/grade/subject.
+
+        Returns the keys removed from both tiers as 'invalidated' and the keys
+        whose shared entry could not be deleted as 'failed'; those are gone from
+        this container only and can be retried.
+        """
+        keys = [self.key_for(component, topic, grade, subject)
+                for component in (components or ['standardsAddressed', 'pedagogicalContext'])]
+        invalidated, failed = [], []
+        for key in keys:
+            self.local.delete(key)
+            if self.table_name:
+                try:
+                    self._shared_table().delete_item(Key={'cacheKey': key})
+                except Exception as e:  # pylint: disable=W0703
+                    self._count('shared_errors')
+                    self.logger.warning(f"Foundation cache delete failed for {key}: {str(e)}")
+                    failed.append(key)
+                    continue
+            invalidated.append(key)
+        self._count('invalidations', len(invalidated))
+        self.logger.info(f"Invalidated foundation cache entries: {', '.join(invalidated)}")
+        return {'invalidated': invalidated, 'failed': failed}
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters with the derived hit rate"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            self.counters[counter] += amount
+
+    def _shared_table(self):
+        table = getattr(self._tables, 'foundations', None)
+        if table is None:
+            # Reads and writes run on executor threads, and resources are not thread safe,
+            # so each thread gets a table from a session of its own
+            table = boto3.session.Session().resource('dynamodb', region_name='us-east-1').Table(self.table_name)
+            self._tables.foundations = table
+        return table
+
+    def _shared_get(self, key: str) -> Optional[str]:
+        try:
+            item = self._shared_table().get_item(Key={'cacheKey': key}).get('Item')
+        except Exception as e:  # pylint: disable=W0703
+            self._count('shared_errors')
+            self.logger.warning(f"Foundation cache read failed: {str(e)}")
+            return None
+        # DynamoDB TTL deletes lazily, so expired items can still be returned
+        if not item or int(item.get('expiresAt', 0)) < time.time():
+            return None
+        return item.get('component')
+
+    def _shared_put(self, key: str, value: str) -> None:
+        try:
+            self._shared_table().put_item(Item={
+                'cacheKey': key,
+                'component': value,
+                'expiresAt': int(time.time() + self.ttl_seconds)
+            })
+        except Exception as e:  # pylint: disable=W0703
+            self._count('shared_errors')
+            self.logger.warning(f"Foundation cache write failed: {str(e)}")
@@ -0,0 +1,147 @@
+# serverless-api/src/services/intentclassifier.py
+from typing import Dict, Any, List, Optional, Tuple
+import re
+
+try:
+    from util.importhelper import ImportHelper
+except ImportError:
+    from src.util.importhelper import ImportHelper
+
+FOUNDATION_COMPONENTS = ['standardsAddressed', 'pedagogicalContext']
+DEPENDENT_COMPONENTS = ['objectives', 'lessonFlow', 'assessments', 'markupProblemSets', 'accessibility', 'materials']
+NON_COMPONENT_KEYS = {'metadata', 'studentProfile'}
+# Section keys too generic to identify a component on their own
+GENERIC_KEYS = {'content', 'language', 'required', 'optional'}
+
+# Words teachers use for a component that do not appear in lesson.json
+SYNONYMS = {
+    'standardsAddressed': ['standard', 'common core', 'ccss', 'teks', 'alignment'],
+    'pedagogicalContext': ['pedagogy', 'pedagogical', 'big idea', 'background knowledge', 'learning progression'],
+    'objectives': ['objective', 'learning goal', 'learning target', 'goal', 'i can statement'],
+    'lessonFlow': ['lesson flow', 'flow', 'activity', 'activities', 'pacing', 'timing', 'agenda'],
+    'markupProblemSets': ['warm up', 'problem', 'problem set', 'practice problem', 'practice', 'question', 'exercise', 'worksheet', 'word problem'],
+    'markupProblemSetsAboveGradeLevel': ['harder problem', 'challenge problem', 'advanced problem', 'above grade level', 'above-grade'],
+    'markupProblemSetsBelowGradeLevel': ['easier problem', 'simpler problem', 'remedial problem', 'below grade level', 'below-grade'],
+    'assessments': ['assessment', 'quiz', 'test', 'exit ticket', 'rubric', 'check for understanding'],
+    'accessibility': ['accessibility', 'accommodation', 'scaffold', 'ell', 'esl', 'iep', 'sentence frame', 'visual support'],
+    'materials': ['material', 'supplies', 'manipulative', 'handout', 'resource']
+}
+
+# Keyword rules in the style of the bodybuilding ChatService._analyze_message_type
+MODIFICATION_WORDS = ['modify', 'change', 'update', 'adjust', 'add', 'remove', 'delete', 'replace', 'make', 'more', 'fewer',
+                      'less', 'simplify', 'harder', 'easier', 'include', 'focus', 'swap', 'fix', 'shorten', 'expand',
+                      'rewrite', 'redo', 'improve', 'increase', 'decrease', 'align']
+QUESTION_WORDS = ['explain', 'why', 'how', 'what', 'which', 'who', 'when', 'does', 'is', 'can you tell']
+REWRITE_WORDS = ['rewrite', 'redo', 'start over', 'from scratch', 'completely', 'entirely', 'overhaul', 'regenerate', 'replace all']
+SMALL_EDIT_WORDS = ['typo', 'spelling', 'grammar', 'rename', 'reword', 'wording', 'title', 'shorten', 'one more', 'one less']
+
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])")
+WORD_SEPARATOR = re.compile(r"[\s-]+")
+
+
+def _phrase(key: str) -> str:
+    """'successCriteria' and 'success_criteria' become 'success criteria'"""
+    return CAMEL_BOUNDARY.sub(" ", key).replace("_", " ").lower()
+
+
+def _pattern(phrase: str) -> str:
+    # Trailing 's?' so singular and plural forms of a phrase both match
+    stem = phrase[:-1] if phrase.endswith("s") and not phrase.endswith("ss") else phrase
+    return r"\b" + r"[\s-]+".join(re.escape(word) for word in WORD_SEPARATOR.split(stem)) + r"s?\b"
+
+
+def _contains(text: str, words: List[str]) -> bool:
+    return any(re.search(_pattern(word), text) for word in words)
+
+
+class IntentClassifier:
+    """Resolves chat messages to lesson components without a model call.
+
+    Component names, their section keys from lesson.json and a synonym list are
+    matched longest phrase first, so "harder problems" resolves to the above
+    grade level problem set and not also to the base one. Keyword rules pick the
+    tier. classify() returns None when nothing matches or the message is a
+    question rather than an edit; those still go to the model.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        schema = schema if schema is not None else ImportHelper.get_json("schema/json/lessons/lesson.json")
+        self.components = [key for key in schema if key not in NON_COMPONENT_KEYS]
+        self.vocabulary = self._build_vocabulary(schema)
+
+    def classify(self, message: str) -> Optional[Dict[str, Any]]:
+        """An analyze_intent-shaped result, or None when the model should decide"""
+        text = (message or "").lower().strip()
+        if not text:
+            return None
+        matched = self.match_components(text)
+        if not matched:
+            return None
+        if self._is_question(text) and not _contains(text, MODIFICATION_WORDS):
+            return None
+
+        requires_foundation_update = any(component in FOUNDATION_COMPONENTS for component in matched)
+        if requires_foundation_update:
+            # A foundation change invalidates everything built on top of it
+            matched += [component for component in DEPENDENT_COMPONENTS if component not in matched and component in self.components]
+        tier = self._tier(text, requires_foundation_update)
+
+        return {
+            "components": matched,
+            "intent": message.strip(),
+            "tier": tier,
+            "rationale": self._rationale(matched, requires_foundation_update),
+            "requires_foundation_update": requires_foundation_update,
+            "source": "local"
+        }
+
+    def match_components(self, text: str) -> List[str]:
+        """Components mentioned in the text, in the order they are first mentioned"""
+        found: List[Tuple[int, str]] = []
+        masked = text
+        for phrase, component in self.vocabulary:
+            for match in re.finditer(_pattern(phrase), masked):
+                found.append((match.start(), component))
+                # Mask the match so shorter phrases inside it cannot match again
+                masked = masked[:match.start()] + " " * (match.end() - match.start()) + masked[match.end():]
+        matched: List[str] = []
+        for _, component in sorted(found):
+            if component not in matched:
+                matched.append(component)
+        return matched
+
+    def _build_vocabulary(self, schema: Dict[str, Any]) -> List[Tuple[str, str]]:
+        phrases: Dict[str, str] = {}
+        for component in self.components:
+            phrases.setdefault(_phrase(component), component)
+            phrases.setdefault(component.lower(), component)
+            sections = schema.get(component)
+            if isinstance(sections, dict):
+                for key in sections:
+                    if key not in GENERIC_KEYS:
+                        # Problem set sections are shared by every level; they name the base set
+                        phrases.setdefault(_phrase(key), component)
+        for component, synonyms in SYNONYMS.items():
+            if component in self.components:
+                for synonym in synonyms:
+                    phrases[synonym] = component
+        return sorted(phrases.items(), key=lambda item: len(item[0]), reverse=True)
+
+    @staticmethod
+    def _is_question(text: str) -> bool:
+        return text.endswith("?") or any(text.startswith(word + " ") for word in QUESTION_WORDS)
+
+    @staticmethod
+    def _tier(text: str, requires_foundation_update: bool) -> int:
+        if requires_foundation_update or _contains(text, REWRITE_WORDS):
+            return 3
+        if _contains(text, SMALL_EDIT_WORDS):
+            return 1
+        return 2
+
+    @staticmethod
+    def _rationale(components: List[str], requires_foundation_update: bool) -> str:
+        names = ", ".join(_phrase(component) for component in components)
+        if requires_foundation_update:
+            return f"Since this changes the lesson's foundation, I'll update {names} so everything stays aligned."
+        return f"I'll update {names} based on your feedback."
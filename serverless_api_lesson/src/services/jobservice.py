@@ -0,0 +1,240 @@
+# serverless-api/src/services/jobservice.py
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+from datetime import datetime
+from decimal import Decimal
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import boto3
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+CREATE_LESSON = "createLesson"
+
+# A runner gets the job request and an async progress(step, value) callback and returns the job result
+Runner = Callable[[Dict[str, Any], Callable[[str, Any], Awaitable[None]]], Awaitable[Any]]
+
+
+def to_dynamo(value: Any) -> Any:
+    """Round-trip through JSON so floats become Decimal, which is all DynamoDB accepts"""
+    return json.loads(json.dumps(value, default=str), parse_float=Decimal)
+
+
+def from_dynamo(value: Any) -> Any:
+    """Turn the Decimals DynamoDB returns back into ints and floats for JSON responses"""
+    if isinstance(value, dict):
+        return {key: from_dynamo(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_dynamo(item) for item in value]
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+class JobService:
+    """Runs long generations as background jobs that clients poll instead of holding a request open.
+
+    submit() stores a queued job in DynamoDB (JOBS_TABLE) and sends its id to
+    SQS (JOBS_QUEUE_URL), whose worker Lambda calls process_records(). Each
+    finished component is written to the job as it lands, so GET /jobs/{id}
+    can show progress and partial results. Without a queue URL, e.g. locally,
+    jobs run on a background thread of the same process, and without a table
+    they are kept in memory.
+    """
+
+    JOB_TTL_SECONDS = 7 * 24 * 60 * 60
+
+    _instance: Optional['JobService'] = None
+
+    def __init__(self, logger, table_name: Optional[str] = None, queue_url: Optional[str] = None):
+        self.logger = logger
+        self.table_name = table_name if table_name is not None else os.environ.get('JOBS_TABLE')
+        self.queue_url = queue_url if queue_url is not None else os.environ.get('JOBS_QUEUE_URL')
+        self.ttl_seconds = int(os.environ.get('JOBS_TTL_SECONDS', self.JOB_TTL_SECONDS))
+        self.runners: Dict[str, Runner] = {}
+        self._tables = threading.local()
+        self._sqs = None
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local_queue: Optional[queue.Queue] = None
+
+    @classmethod
+    def get_instance(cls, logger) -> 'JobService':
+        """Get or create the process-wide job service"""
+        if cls._instance is None:
+            cls._instance = JobService(logger)
+        return cls._instance
+
+    def register(self, kind: str, runner: Runner) -> None:
+        """Register the coroutine that runs jobs of a kind"""
+        self.runners[kind] = runner
+
+    def submit(self, owner: str, kind: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a queued job and hand it to the worker; returns the job without waiting for it"""
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        now = datetime.utcnow().isoformat()
+        job = {
+            'jobId': str(uuid.uuid4()),
+            'owner': owner,
+            'kind': kind,
+            'status': QUEUED,
+            'request': request,
+            'progress': {},
+            'partial': {},
+            'createdAt': now,
+            'updatedAt': now,
+            'expiresAt': int(time.time()) + self.ttl_seconds
+        }
+        self._put(job)
+        self._enqueue(job['jobId'])
+        self.logger.info(f"Queued {kind} job {job['jobId']}")
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The job as stored, or None when it does not exist or belongs to someone else"""
+        if self.table_name:
+            item = self._jobs_table().get_item(Key={'jobId': job_id}).get('Item')
+            job = from_dynamo(item) if item else None
+        else:
+            with self._lock:
+                job = json.loads(json.dumps(self._memory[job_id])) if job_id in self._memory else None
+        if job is None or (owner is not None and job.get('owner') != owner):
+            return None
+        return job
+
+    @staticmethod
+    def status_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields a polling client needs"""
+        return {
+            'jobId': job['jobId'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'progress': job.get('progress', {}),
+            'partial': job.get('partial', {}),
+            'result': job.get('result'),
+            'error': job.get('error'),
+            'createdAt': job['createdAt'],
+            'updatedAt': job['updatedAt']
+        }
+
+    async def run(self, job_id: str) -> None:
+        """Run a queued job to completion, recording progress, the result or the error"""
+        job = self.get(job_id)
+        if job is None:
+            self.logger.error(f"Job {job_id} not found")
+            return
+        if job['status'] in (SUCCEEDED, FAILED):
+            # SQS delivers at least once; a finished job is not run again
+            self.logger.info(f"Job {job_id} already {job['status']}")
+            return
+        self._update(job_id, {'status': RUNNING})
+
+        async def progress(step: str, value: Any) -> None:
+            await asyncio.get_event_loop().run_in_executor(None, self.record_progress, job_id, step, value)
+
+        try:
+            result = await self.runners[job['kind']](job['request'], progress)
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.error(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, {'status': FAILED, 'error': str(e)})
+            return
+        self._update(job_id, {'status': SUCCEEDED, 'result': result}, remove=['partial'])
+        self.logger.info(f"Job {job_id} succeeded")
+
+    def record_progress(self, job_id: str, step: str, value: Any) -> None:
+        """Mark one step done and keep its output as a partial result; failures only log"""
+        try:
+            if self.table_name:
+                self._jobs_table().update_item(
+                    Key={'jobId': job_id},
+                    UpdateExpression='SET progress.#step = :done, partial.#step = :value, updatedAt = :now',
+                    ExpressionAttributeNames={'#step': step},
+                    ExpressionAttributeValues={
+                        ':done': datetime.utcnow().isoformat(),
+                        ':value': to_dynamo(value),
+                        ':now': datetime.utcnow().isoformat()
+                    }
+                )
+            else:
+                with self._lock:
+                    job = self._memory[job_id]
+                    job['progress'][step] = datetime.utcnow().isoformat()
+                    job['partial'][step] = json.loads(json.dumps(value, default=str))
+                    job['updatedAt'] = datetime.utcnow().isoformat()
+        except Exception as e:  # pylint: disable=W0703
+            self.logger.warning(f"Could not record progress of {step} for job {job_id}: {str(e)}")
+
+    def process_records(self, records: List[Dict[str, Any]]) -> None:
+        """Run the jobs named in a batch of SQS records"""
+        for record in records:
+            job_id = json.loads(record['body'])['jobId']
+            asyncio.run(self.run(job_id))
+
+    def _put(self, job: Dict[str, Any]) -> None:
+        if self.table_name:
+            self._jobs_table().put_item(Item=to_dynamo(job))
+        else:
+            with self._lock:
+                self._memory[job['jobId']] = json.loads(json.dumps(job, default=str))
+
+    def _update(self, job_id: str, fields: Dict[str, Any], remove: Optional[List[str]] = None) -> None:
+        fields = {**fields, 'updatedAt': datetime.utcnow().isoformat()}
+        if self.table_name:
+            names = {f"#{field}": field for field in fields}
+            expression = 'SET ' + ', '.join(f"#{field} = :{field}" for field in fields)
+            if remove:
+                names.update({f"#{field}": field for field in remove})
+                expression += ' REMOVE ' + ', '.join(f"#{field}" for field in remove)
+            self._jobs_table().update_item(
+                Key={'jobId': job_id},
+                UpdateExpression=expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={f":{field}": to_dynamo(value) for field, value in fields.items()}
+            )
+        else:
+            with self._lock:
+                job = self._memory[job_id]
+                job.update(json.loads(json.dumps(fields, default=str)))
+                for field in remove or []:
+                    job.pop(field, None)
+
+    def _enqueue(self, job_id: str) -> None:
+        if self.queue_url:
+            if self._sqs is None:
+                self._sqs = boto3.client('sqs', region_name='us-east-1')
+            self._sqs.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps({'jobId': job_id}))
+            return
+        with self._lock:
+            if self._local_queue is None:
+                self._local_queue = queue.Queue()
+                threading.Thread(target=self._local_worker, name='job-worker', daemon=True).start()
+        self._local_queue.put(job_id)
+
+    def _local_worker(self) -> None:
+        """Stand-in for the SQS worker: runs queued jobs one at a time on its own event loop"""
+        loop = asyncio.new_event_loop()
+        while True:
+            job_id = self._local_queue.get()
+            try:
+                loop.run_until_complete(self.run(job_id))
+            except Exception as e:  # pylint: disable=W0703
+                self.logger.error(f"Local job worker error for {job_id}: {str(e)}")
+            finally:
+                self._local_queue.task_done()
+
+    def _jobs_table(self):
+        table = getattr(self._tables, 'jobs', None)
+        if table is None:
+            # Progress is recorded from executor threads, and resources are not thread safe,
+            # so each thread gets a table from a session of its own
+            table = boto3.session.Session().resource('dynamodb', region_name='us-east-1').Table(self.table_name)
+            self._tables.jobs = table
+        return table
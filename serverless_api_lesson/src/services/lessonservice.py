@@ -1,40 +1,46 @@
+import asyncio
 import json
 import os
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-import boto3
-from botocore.config import Config
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from boto3.dynamodb.conditions import Key 
 
 try:
     from services.parallellessonservice import ParallelLessonService
     from aws.dynamomanager import DynamoManager
+    from aws.bedrockmanager import BedrockManager
     from util.loggers.applogger import AppLogger
 except ImportError:
     from src.services.parallellessonservice import ParallelLessonService
     from src.aws.dynamomanager import DynamoManager
+    from src.aws.bedrockmanager import BedrockManager
     from src.util.loggers.applogger import AppLogger
 
 class LessonService:
     """Service class for managing lesson-related operations with versioning support"""
     MODEL_ID = "us.amazon.nova-pro-v1:0"
+    # Lessons table attribute holding the last allocated version number
+    VERSION_COUNTER = 'versionCounter'
+    # List response fields and the lessons table attribute behind each; None comes from the versions table
+    LESSON_LIST_FIELDS = {
+        'lessonId': 'lessonId',
+        'title': 'title',
+        'grade': 'grade',
+        'subject': 'original_subject',
+        'status': 'status',
+        'lastModified': 'last_modified',
+        'content': 'content',
+        'currentVersion': None
+    }
     
     def __init__(self, logger: Optional[AppLogger] = None):
         """Initialize the lesson service with dependencies"""
         self.logger = logger or AppLogger(__name__)
         self.dynamo_manager = DynamoManager(self.logger)
-        self.bedrock = self._initialize_bedrock()
-
-    def _initialize_bedrock(self):
-        """Initialize the Bedrock client with retry configuration"""
-        config = Config(
-            retries={'max_attempts': 3},
-            read_timeout=30,
-            connect_timeout=30,
-            max_pool_connections=50
-        )
-        return boto3.client('bedrock-runtime', config=config)
+        self.bedrock = BedrockManager(self.logger)
+        # Profiles generated at once by create_differentiated_lessons; each runs several Bedrock calls in parallel
+        self.differentiation_concurrency = int(os.environ.get('LESSON_DIFFERENTIATION_CONCURRENCY', 3))
 
     ##########
     ##########
@@ -45,7 +51,13 @@ class LessonService:
                             existing_plan: Optional[str] = None, 
                             grade: Optional[str] = None,
                             subject: Optional[str] = None,
-                            user_chat: Optional[str] = None) -> Dict[str, Any]:
+                            user_chat: Optional[str] = None,
+                            on_component: Optional[Callable[[str, Any], Any]] = None,
+                            generation_id: Optional[str] = None,
+                            shared_components: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate a lesson plan; on_component(component, value) is called as each component finishes.
+        A generation_id (idempotency key) lets a retry resume from the components already generated,
+        and shared_components are profile-independent components generated once for several profiles."""
         if not topic:
             raise ValueError("Topic is required to generate a lesson plan")
             
@@ -68,7 +80,10 @@ class LessonService:
                     profile=merged_profile,
                     grade=grade or existing_context.get('grade'),
                     subject=subject or existing_context.get('subject'),
-                    user_chat=user_chat
+                    user_chat=user_chat,
+                    on_component=on_component,
+                    generation_id=generation_id,
+                    shared_components=shared_components
                 )
                 # Preserve any existing metadata
                 if 'metadata' in existing_context:
@@ -80,7 +95,10 @@ class LessonService:
                     topic=topic,
                     profile=profile,
                     grade=grade,
-                    subject=subject
+                    subject=subject,
+                    on_component=on_component,
+                    generation_id=generation_id,
+                    shared_components=shared_components
                 )
             
             # Update metadata with correct profile information and grade
@@ -187,17 +205,19 @@ class LessonService:
                 'last_modified': datetime.utcnow().isoformat()
             }
             
-            # Save to primary lessons table
-            self.dynamo_manager.put_dynamo_item(
-                table_name=os.environ['LESSONS_TABLE'],
-                payload=lesson_item
+            # Save to primary lessons table, allocating the version number in the same write
+            new_version = self._allocate_versions(
+                email=email,
+                lesson_id=lesson_id,
+                attributes={key: value for key, value in lesson_item.items() if key not in ('email', 'lessonId')}
             )
             
             # Save version
             version_item = self._save_lesson_version(
                 lesson_id=lesson_id,
                 profile_id=profile_id,
-                lesson_data={**lesson_item, 'email': email}
+                lesson_data={**lesson_item, 'email': email},
+                version=new_version
             )
             
             return {**lesson_item, 'version': version_item}
@@ -206,38 +226,60 @@ class LessonService:
             self.logger.error("Error saving lesson: %s", str(err))
             raise
 
-    def _save_lesson_version(self, lesson_id: str, profile_id: str, lesson_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Save a version of a lesson to the versions table"""
-        try:
-            # Use DynamoDB's query with both hash and range key
-            table = self.dynamo_manager.dynamo_client.Table(os.environ['LESSON_VERSIONS_TABLE'])
-            response = table.query(
-                KeyConditionExpression=Key('lessonId').eq(lesson_id)
-            )
+    def _allocate_versions(self, email: str, lesson_id: str, count: int = 1,
+                           attributes: Optional[Dict[str, Any]] = None) -> int:
+        """Reserve count consecutive version numbers from the lesson's atomic counter; returns the first.
 
-            new_version = len(response.get('Items', [])) + 1
+        attributes are written to the lesson item in the same UpdateItem.
+        """
+        key = {'email': email, 'lessonId': lesson_id}
+        current = self.dynamo_manager.increment_counter(
+            os.environ['LESSONS_TABLE'], key, self.VERSION_COUNTER, amount=count, attributes=attributes
+        )
+        if current == count:
+            # The counter was just created; lessons saved before it existed continue after their highest version
+            latest = self._latest_version_number(lesson_id)
+            if latest:
+                current = self.dynamo_manager.increment_counter(
+                    os.environ['LESSONS_TABLE'], key, self.VERSION_COUNTER, amount=latest
+                )
+        return current - count + 1
 
-            print(response)
-            print("new version: " +str(new_version) )
-            
+    def _latest_version_number(self, lesson_id: str) -> int:
+        """Highest version number of a lesson, read from one VersionIndex item"""
+        versions, _ = self.dynamo_manager.query_page(
+            table_name=os.environ['LESSON_VERSIONS_TABLE'],
+            filter_key='lessonId',
+            filter_value=lesson_id,
+            limit=1,
+            forward=False,
+            fields=['version'],
+            index_name='VersionIndex'
+        )
+        return int(versions[0]['version']) if versions else 0
+
+    def _save_lesson_version(self, lesson_id: str, profile_id: str, lesson_data: Dict[str, Any],
+                             version: int) -> Dict[str, Any]:
+        """Save a version of a lesson to the versions table"""
+        try:
             # Create version item
             version_item = {
                 'lessonId': lesson_id,
                 'profileId': profile_id,
-                'profileVersion': f"{profile_id}#v{new_version}",
+                'profileVersion': f"{profile_id}#v{version}",
                 'content': lesson_data['content'],
                 'title': lesson_data['title'],
                 'grade': lesson_data['grade'],
                 'subject': lesson_data.get('original_subject'),
                 'timestamp': datetime.utcnow().isoformat(),
-                'version': new_version,
+                'version': version,
                 'email': lesson_data['email']
             }
             
-            # Save version
-            self.dynamo_manager.put_dynamo_item(
+            # Save version, unless a concurrent save already stored a newer one for this profile
+            self.dynamo_manager.put_if_newer(
                 table_name=os.environ['LESSON_VERSIONS_TABLE'],
-                payload=version_item
+                item=version_item
             )
             
             return version_item
@@ -248,42 +290,72 @@ class LessonService:
 
     def get_user_lessons(self, email: str) -> List[Dict[str, Any]]:
         """Retrieve all lessons for a user with their latest versions"""
+        lessons, _ = self.get_user_lessons_page(email)
+        return lessons
+
+    def get_user_lessons_page(self, email: str, limit: Optional[int] = None, cursor: Optional[Dict[str, Any]] = None,
+                              forward: bool = True, fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """One page of a user's lessons with their latest versions, and the key to continue from.
+
+        fields selects from LESSON_LIST_FIELDS; only the lesson attributes they
+        need are read, and versions are only fetched for content or currentVersion.
+        """
         ##email field is provided from cognotio for secure access
         try:
-            lessons = self.dynamo_manager.query_table(
+            wanted = fields or list(self.LESSON_LIST_FIELDS)
+            attributes = sorted({self.LESSON_LIST_FIELDS[field] for field in wanted if self.LESSON_LIST_FIELDS[field]} | {'lessonId'})
+            lessons, last_key = self.dynamo_manager.query_page(
                 table_name=os.environ['LESSONS_TABLE'],
                 filter_key='email',
-                filter_value=email
+                filter_value=email,
+                limit=limit,
+                exclusive_start_key=cursor,
+                forward=forward,
+                fields=attributes if fields else None
             )
             
-            # For each lesson, get its latest version
+            # The versions table keeps one item per (lessonId, profileId), so the base
+            # item is the latest version; fetch all of them in one batch
+            latest_versions = {}
+            if lessons and ('content' in wanted or 'currentVersion' in wanted):
+                latest_versions = {
+                    version['lessonId']: version
+                    for version in self.dynamo_manager.batch_get(
+                        table_name=os.environ['LESSON_VERSIONS_TABLE'],
+                        keys=[{'lessonId': lesson['lessonId'], 'profileId': 'base'} for lesson in lessons]
+                    )
+                }
+
             enriched_lessons = []
             for lesson in lessons:
-                latest_version = self.get_latest_version(
-                    email=email,
-                    lesson_id=lesson['lessonId']
-                )
+                latest_version = latest_versions.get(lesson['lessonId'])
                 
                 enriched_lesson = {
                     'lessonId': lesson['lessonId'],
-                    'title': lesson['title'],
-                    'grade': lesson['grade'],
+                    'title': lesson.get('title'),
+                    'grade': lesson.get('grade'),
                     'subject': lesson.get('original_subject'),
                     'status': lesson.get('status'),
                     'lastModified': lesson.get('last_modified'),
-                    'content': latest_version['content'] if latest_version else lesson['content'],
+                    'content': latest_version['content'] if latest_version else lesson.get('content'),
                     'currentVersion': latest_version['version'] if latest_version else 1
                 }
-                enriched_lessons.append(enriched_lesson)
+                enriched_lessons.append({field: enriched_lesson[field] for field in wanted})
             
-            return enriched_lessons
+            return enriched_lessons, last_key
             
         except Exception as err:
             self.logger.error("Error retrieving lessons: %s", str(err))
             raise
 
-    def create_differentiated_lessons(self, email: str, lesson_id: str) -> List[Dict[str, Any]]:
-        """Create differentiated versions of a lesson for all active profiles"""
+    async def create_differentiated_lessons(self, email: str, lesson_id: str) -> List[Dict[str, Any]]:
+        """Create differentiated versions of a lesson for all active profiles.
+
+        Profile-independent components are generated once and shared; the rest
+        are generated for up to differentiation_concurrency profiles at a time.
+        Profiles that fail are logged and skipped, and the versions of the
+        others are written in one batch.
+        """
         try:
             # Verify user has access to lesson
             lesson = self._get_lesson_by_id(email, lesson_id)
@@ -297,35 +369,89 @@ class LessonService:
                 filter_value=email
             )
             active_profiles = [p for p in profiles if p.get('active', True)]
+            if not active_profiles:
+                return []
 
-            differentiated_versions = []
-            for profile in active_profiles:
-                # Generate differentiated content
-                differentiated_content = self.create_lesson(
-                    topic=lesson['title'],
-                    profile=profile,
-                    existing_plan=json.dumps(lesson['content'])
-                )
+            content = lesson['content']
+            existing_context = json.loads(content) if isinstance(content, str) else content
+            grade = existing_context.get('grade') or lesson.get('grade')
+            subject = existing_context.get('subject') or lesson.get('original_subject')
 
-                # Save as new version
-                version = self._save_lesson_version(
-                    lesson_id=lesson_id,
-                    profile_id=profile['profilename'],
-                    lesson_data={
-                        **lesson,
-                        'content': differentiated_content,
-                        'email': email
-                    }
-                )
-                
-                differentiated_versions.append(version)
+            # Standards and other profile-independent components are the same for every profile
+            parallel_service = ParallelLessonService(self.logger, self.bedrock)
+            shared_components = await parallel_service.generate_shared_components(lesson['title'], grade, subject)
+
+            semaphore = asyncio.Semaphore(self.differentiation_concurrency)
 
-            return differentiated_versions
+            async def differentiate(profile: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.create_lesson(
+                        topic=lesson['title'],
+                        profile=profile,
+                        existing_plan=json.dumps(existing_context),
+                        grade=grade,
+                        subject=subject,
+                        shared_components=shared_components
+                    )
+
+            results = await asyncio.gather(*(differentiate(profile) for profile in active_profiles), return_exceptions=True)
+
+            variants = []
+            for profile, result in zip(active_profiles, results):
+                if isinstance(result, Exception):
+                    self.logger.error("Error differentiating lesson %s for profile %s: %s", lesson_id, profile.get('profilename'), str(result))
+                    continue
+                variants.append((profile['profilename'], result))
+            if not variants:
+                raise ValueError(f"Differentiation failed for all {len(active_profiles)} profiles")
+
+            return self._save_lesson_versions(
+                lesson_id=lesson_id,
+                lesson_data={**lesson, 'email': email},
+                variants=variants
+            )
             
         except Exception as err:
             self.logger.error("Error creating differentiated lessons: %s", str(err))
             raise
 
+    def _save_lesson_versions(self, lesson_id: str, lesson_data: Dict[str, Any], variants: List[Any]) -> List[Dict[str, Any]]:
+        """Save one version per (profile_id, content) pair, numbered from one counter allocation"""
+        try:
+            next_version = self._allocate_versions(
+                email=lesson_data['email'],
+                lesson_id=lesson_id,
+                count=len(variants)
+            )
+            timestamp = datetime.utcnow().isoformat()
+
+            version_items = []
+            for offset, (profile_id, content) in enumerate(variants):
+                version = next_version + offset
+                version_items.append({
+                    'lessonId': lesson_id,
+                    'profileId': profile_id,
+                    'profileVersion': f"{profile_id}#v{version}",
+                    'content': content,
+                    'title': lesson_data['title'],
+                    'grade': lesson_data['grade'],
+                    'subject': lesson_data.get('original_subject'),
+                    'timestamp': timestamp,
+                    'version': version,
+                    'email': lesson_data['email']
+                })
+
+            # One item per (lessonId, profileId), so the last variant of a profile wins; conditional
+            # puts keep a concurrent, newer differentiation from being overwritten
+            latest_by_profile = {version_item['profileId']: version_item for version_item in version_items}
+            self.dynamo_manager.put_all_if_newer(os.environ['LESSON_VERSIONS_TABLE'], list(latest_by_profile.values()))
+
+            return version_items
+
+        except Exception as err:
+            self.logger.error("Error saving lesson versions: %s", str(err))
+            raise
+
     def _get_lesson_by_id(self, email: str, lesson_id: str) -> Optional[Dict[str, Any]]:
         try:
             return self.dynamo_manager.get_dynamo_item_multi_key(
@@ -364,13 +490,39 @@ class LessonService:
             self.logger.error("Error retrieving lesson versions: %s", str(err))
             raise
 
+    def get_lesson_versions_page(self, email: str, lesson_id: str, limit: Optional[int] = None,
+                                 cursor: Optional[Dict[str, Any]] = None, forward: bool = True,
+                                 fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """One page of a lesson's versions, in profileId order, after verifying access"""
+        try:
+            if not self._get_lesson_by_id(email, lesson_id):
+                return [], None
+            return self.dynamo_manager.query_page(
+                table_name=os.environ['LESSON_VERSIONS_TABLE'],
+                filter_key='lessonId',
+                filter_value=lesson_id,
+                limit=limit,
+                exclusive_start_key=cursor,
+                forward=forward,
+                fields=fields
+            )
+        except Exception as err:
+            self.logger.error("Error retrieving lesson versions: %s", str(err))
+            raise
+
     def get_latest_version(self, email: str, lesson_id: str, 
                         profile_id: str = 'base') -> Optional[Dict[str, Any]]:
         """Get latest version of a lesson for a specific profile"""
         try:
-            versions = self.get_lesson_versions(email, lesson_id)
-            profile_versions = [v for v in versions if v['profileId'] == profile_id]
-            return profile_versions[-1] if profile_versions else None
+            if not self._get_lesson_by_id(email, lesson_id):
+                return None
+            # The versions table keeps only the newest item per (lessonId, profileId)
+            return self.dynamo_manager.get_dynamo_item_multi_key(
+                table_name=os.environ['LESSON_VERSIONS_TABLE'],
+                lookup_keys={'lessonId': lesson_id, 'profileId': profile_id}
+            )
+        except KeyError:
+            return None
         except Exception as err:
             self.logger.error("Error retrieving latest version: %s", str(err))
             raise
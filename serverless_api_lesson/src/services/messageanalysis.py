@@ -1,19 +1,32 @@
 import json
+import os
 from typing import Dict, Any
 
 try:
-    from services.parallellessonservice import ParallelLessonService
     from util.loggers.applogger import AppLogger
+    from services.intentclassifier import IntentClassifier
+    from services.shared.retry_policy import RetryPolicy
+    from aws.modelrouter import ModelRouter, INTENT_ANALYSIS
+    from util.loggers.emfmetrics import metric_labels
 except ImportError:
-    from src.services.parallellessonservice import ParallelLessonService
     from src.util.loggers.applogger import AppLogger
+    from src.services.intentclassifier import IntentClassifier
+    from src.services.shared.retry_policy import RetryPolicy
+    from src.aws.modelrouter import ModelRouter, INTENT_ANALYSIS
+    from src.util.loggers.emfmetrics import metric_labels
 
 class MessageAnalyzer:
+    # Longest string kept per field of the plan skeleton sent to the model
+    SUMMARY_CHARS = 80
     
     def __init__(self, bedrock_client):
         """Initialize with bedrock client."""
         self.bedrock = bedrock_client
         self.logger = AppLogger(__name__)  # Add logger for error handling
+        self.retry_policy = RetryPolicy(self.logger)
+        self.router = ModelRouter.get_instance(self.logger)
+        self.classifier = IntentClassifier()
+        self.fast_path = os.environ.get('INTENT_FAST_PATH', 'on').lower() in ('on', 'true', '1')
 
     def _get_intent_analysis_system_prompt(self) -> Dict[str, str]:
         """Get system prompt for intent analysis with proper JSON formatting."""
@@ -86,8 +99,19 @@ class MessageAnalyzer:
 
     async def analyze_intent(self, message: str, current_plan: Dict[str, Any], 
                             context: Dict[str, Any]) -> Dict[str, Any]:
+        """Components, intent and tier for a chat message.
+
+        Messages that name their components are resolved locally; the rest go to
+        the model with the plan's key skeleton instead of the whole plan.
+        """
+        if self.fast_path:
+            local = self.classifier.classify(message)
+            if local is not None:
+                self.logger.info(f"Resolved intent locally: {json.dumps(local)}")
+                return local
+
         request_params = {
-            "modelId": ParallelLessonService.MODEL_ID,
+            "modelId": self.router.model_for(INTENT_ANALYSIS),
             "messages": [{
                 "role": "user",
                 "content": [{
@@ -102,14 +126,32 @@ class MessageAnalyzer:
                         Profile: {json.dumps(context.get('profile', {}))}
 
                         Current Plan Structure:
-                        {json.dumps(current_plan, indent=2)}"""
+                        {json.dumps(self.plan_skeleton(current_plan), separators=(',', ':'))}"""
                 }]
             }],
             "system": [self._get_intent_analysis_system_prompt()],
             "inferenceConfig": {
-                "maxTokens": 4000,
+                "maxTokens": 600,
                 "temperature": 0.2
             }
         }
-        response = await self.bedrock.make_async_call(request_params)
+        with metric_labels(component="intent", caller="MessageAnalyzer"):
+            response = await self.retry_policy.execute(
+                self.bedrock, request_params, on_response=self.router.observer(INTENT_ANALYSIS)
+            )
         return response
+
+    @classmethod
+    def plan_skeleton(cls, value: Any, depth: int = 0) -> Any:
+        """The plan's keys with short summaries: strings are truncated and lists become their size and first item"""
+        if isinstance(value, dict):
+            if depth >= 3:
+                return sorted(value)
+            return {key: cls.plan_skeleton(item, depth + 1) for key, item in value.items()}
+        if isinstance(value, list):
+            if not value:
+                return []
+            return {"count": len(value), "first": cls.plan_skeleton(value[0], depth + 1)}
+        if isinstance(value, str) and len(value) > cls.SUMMARY_CHARS:
+            return value[:cls.SUMMARY_CHARS] + "..."
+        return value
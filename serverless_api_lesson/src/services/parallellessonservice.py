@@ -1,27 +1,70 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
 import json
 from datetime import datetime
 try:
     from src.util.importhelper import ImportHelper
+    from src.services.shared.retry_policy import RetryPolicy, chain_observers
+    from src.services.shared.token_budget import TokenBudget
+    from src.aws.promptcache import build_system_blocks
+    from src.aws.bedrockgovernor import background_calls
+    from src.services.componentscheduler import ComponentScheduler
+    from src.services.speculation import SpeculationTracker, HIT, INVALIDATED, FAILED
+    from src.services.shared.checkpoint_store import CheckpointStore
+    from src.services.foundationcache import FoundationCache
+    from src.aws.modelrouter import ModelRouter, FOUNDATION, COMPONENT, PROBLEM_SETS
+    from src.util.loggers.emfmetrics import metric_labels
 except ImportError:
     from util.importhelper import ImportHelper
+    from services.shared.retry_policy import RetryPolicy, chain_observers
+    from services.shared.token_budget import TokenBudget
+    from aws.promptcache import build_system_blocks
+    from aws.bedrockgovernor import background_calls
+    from services.componentscheduler import ComponentScheduler
+    from services.speculation import SpeculationTracker, HIT, INVALIDATED, FAILED
+    from services.shared.checkpoint_store import CheckpointStore
+    from services.foundationcache import FoundationCache
+    from aws.modelrouter import ModelRouter, FOUNDATION, COMPONENT, PROBLEM_SETS
+    from util.loggers.emfmetrics import metric_labels
 
 class ParallelLessonService:
-    MODEL_ID = "us.amazon.nova-pro-v1:0" 
+    FOUNDATION_COMPONENTS = ['pedagogicalContext', 'standardsAddressed']
+    PROBLEM_SET_COMPONENTS = ['markupProblemSets', 'markupProblemSetsAboveGradeLevel', 'markupProblemSetsBelowGradeLevel']
+    # Token budgets for full generation are learned separately from chat update tiers
+    GENERATION_TIER = "generate"
     SCHEMA = ImportHelper.get_json("schema/json/lessons/lesson.json")
+    # Component generation graph; each entry's dependsOn lists the components it needs
+    COMPONENTS = ImportHelper.get_json("schema/json/prompts/components.json")
+    # Components flagged profileIndependent are generated once when differentiating across profiles
+    PROFILE_INDEPENDENT_COMPONENTS = [component for component, definition in COMPONENTS.items() if definition.get("profileIndependent")]
+    # Difficulty range asked of each problem-set section when they are generated as separate shards
+    DIFFICULTY_BANDS = {"warmup": (1, 2), "corePractice": (2, 4), "extension": (4, 5)}
 
     def __init__(self, logger, bedrock_client):
+        """Initialize with logger and a BedrockManager"""
         self.logger = logger
         self.bedrock = bedrock_client
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        self.retry_policy = RetryPolicy(logger)
+        self.token_budget = TokenBudget.get_instance(logger)
+        self.router = ModelRouter.get_instance(logger)
+        self.scheduler = ComponentScheduler.from_definitions(logger, self.COMPONENTS)
+        self.speculation = SpeculationTracker.get_instance(logger)
+        self.checkpoints = CheckpointStore.get_instance(logger)
+        self.foundation_cache = FoundationCache.get_instance(logger)
+        self.speculative = os.environ.get('LESSON_SPECULATIVE_GENERATION', 'off').lower() in ('on', 'true', '1')
+        # Speculative components generated at once per lesson plan; the rest wait for one of these to finish
+        self.speculative_concurrency = int(os.environ.get('LESSON_SPECULATIVE_CONCURRENCY', 2))
+        # Problem sets are the longest outputs; generating each section as its own call cuts their tail latency
+        self.shard_problem_sets = os.environ.get('PROBLEM_SET_SHARDING', 'on').lower() in ('on', 'true', '1')
+        # Rounds of generation a problem-set section gets before its component fails
+        self.shard_attempts = max(1, int(os.environ.get('PROBLEM_SET_SHARD_ATTEMPTS', 2)))
 
     def _get_component_schema(self, component: str) -> Dict:
         """Get schema for a specific component"""
         return self.SCHEMA[component]
     
-    def _get_problem_set_system_prompt(self, grade: str = None, subject: str = None, component: str = None) -> Dict[str, str]:
+    def _get_problem_set_system_prompt(self, component: str = None) -> Dict[str, str]:
         problem_sets_schema = self.SCHEMA[component]
         # Define the example JSON separately with proper escaping
         example_json = '''{
@@ -50,7 +93,7 @@ class ParallelLessonService:
 
         return {
             "text": f"""
-            You are an expert mathematics education content creator specializing in {grade or 'default'} {subject or 'Mathematics'}.
+            You are an expert mathematics education content creator.
             Create clear, engaging problems using LaTeX math notation between single $ delimiters for inline math and double $$ for display math.
 
             LaTeX Formatting Rules:
@@ -69,8 +112,8 @@ class ParallelLessonService:
             """
         }
 
-    def _get_pedagogical_system_prompt(self, grade: str = None, subject: str = None, component_schema: Dict = None) -> Dict[str, str]:
-        """Get system prompt for pedagogical framework with grade and subject alignment"""
+    def _get_pedagogical_system_prompt(self, component_schema: Dict = None) -> Dict[str, str]:
+        """Get system prompt for pedagogical framework; grade and subject alignment comes from _get_alignment_prompt"""
         return {
             "text": f"""
             You are an PHD with 24 years of experience and educational agent specializing in differentiated instruction who only reponds in RFC8259 compliant JSON.
@@ -80,19 +123,15 @@ class ParallelLessonService:
             3. Ensure cognitive and linguistic scaffolding in all components
             4. Maintain coherence between objectives, activities, and assessments
             5. Include formative assessment opportunities throughout
-
-            You must ensure all content is developmentally appropriate for grade level {grade or 'default'} 
-            and aligns with typical {subject or 'Mathematics'} standards and practices.
-
             6. respond with  a  RFC8259 compliant JSON follwing this format without deviation :
             {json.dumps(component_schema )}
             """
         }
     
-    def _get_educational_standards_system_prompt(self, grade: str = None, subject: str = None, component_schema: Dict = None) -> Dict[str, str]:
+    def _get_educational_standards_system_prompt(self, component_schema: Dict = None) -> Dict[str, str]:
         """Get system prompt for educational standards generation."""
         return {
-            "text": f"""You are an educational standards specialist focusing on grade {grade} {subject or 'Mathematics'}.
+            "text": f"""You are an educational standards specialist.
             IMPORTANT: You are mathtilda who focuses on  inclusive and equitable educational standards, must ONLY output a pure RFC8259 compliant JSON object with no additional text, preamble, or explanation.
             
             DO NOT include phrases like:
@@ -126,12 +165,32 @@ class ParallelLessonService:
             """
         }
 
-    async def _generate_component(self, component: str, topic: str, context: Dict, profile: Optional[Dict]) -> Dict[str, Any]:
-        """Generate a specific lesson plan component with appropriate system prompt"""
-        
+    def _get_alignment_prompt(self, component: str, grade: str = None, subject: str = None) -> Dict[str, str]:
+        """Per-request grade and subject alignment, kept out of the static prompts so their prefix can be cached"""
         if component == 'standardsAddressed':
-            request_params = {
-                "modelId": self.MODEL_ID,
+            text = f"Focus on grade {grade} {subject or 'Mathematics'} standards."
+        elif component in self.PROBLEM_SET_COMPONENTS:
+            text = f"You specialize in {grade or 'default'} {subject or 'Mathematics'}."
+        else:
+            text = f"""You must ensure all content is developmentally appropriate for grade level {grade or 'default'}
+            and aligns with typical {subject or 'Mathematics'} standards and practices."""
+        return {"text": text}
+
+    def _route_for(self, component: str) -> str:
+        """Model route for generating a component"""
+        if component in self.FOUNDATION_COMPONENTS:
+            return FOUNDATION
+        if component in self.PROBLEM_SET_COMPONENTS:
+            return PROBLEM_SETS
+        return COMPONENT
+
+    def _build_component_request(self, component: str, topic: str, context: Dict, profile: Optional[Dict]) -> Dict[str, Any]:
+        """Build the converse request for a lesson plan component with appropriate system prompt"""
+        model_id = self.router.model_for(self._route_for(component))
+
+        if component == 'standardsAddressed':
+            return {
+                "modelId": model_id,
                 "messages": [{
                     "role": "user",
                     "content": [{
@@ -149,45 +208,31 @@ class ParallelLessonService:
                         }}"""
                     }]
                 }],
-                "system": [self._get_educational_standards_system_prompt(
-                    grade=context.get('grade'),
-                    subject=context.get('subject'),
-                    component_schema=self._get_component_schema(component)
-                )],
+                "system": build_system_blocks(
+                    model_id,
+                    self._get_educational_standards_system_prompt(
+                        component_schema=self._get_component_schema(component)
+                    ),
+                    self._get_alignment_prompt(component, context.get('grade'), context.get('subject'))
+                ),
                 "inferenceConfig": {
-                    "maxTokens": 1000,
+                    "maxTokens": self.token_budget.max_tokens(component, self.GENERATION_TIER, 1000),
                     "temperature": 0.1
                 }
             }
-            result = await self._make_bedrock_call(request_params)
-            
-            # Validate and restructure response if needed
-            if 'standardsAddressed' not in result:
-                if 'focalStandard' in result and 'supportingStandards' in result:
-                    result = {'standardsAddressed': result}
-                else:
-                    raise ValueError("Invalid standards response structure")
-            
-            return result
         else:
             # Select appropriate system prompt based on component
-            if component in ['markupProblemSets', 'markupProblemSetsAboveGradeLevel', 'markupProblemSetsBelowGradeLevel']:
-                system_prompt = self._get_problem_set_system_prompt(
-                    grade=context.get('grade'),
-                    subject=context.get('subject'),
-                    component=component
-                )
+            if component in self.PROBLEM_SET_COMPONENTS:
+                system_prompt = self._get_problem_set_system_prompt(component=component)
             else:
                 system_prompt = self._get_pedagogical_system_prompt(
-                    grade=context.get('grade'),
-                    subject=context.get('subject'),
                     component_schema=self._get_component_schema(component)
                 )
 
             # Configure the API request for Bedrock model inference
-            request_params = {
-                # Specify which Anthropic Claude model to use
-                "modelId": self.MODEL_ID,
+            return {
+                # Model chosen by the router for this component's task type
+                "modelId": model_id,
                 
                 # Structure the conversation with a clear user prompt
                 "messages": [{
@@ -217,31 +262,258 @@ class ParallelLessonService:
                 # - The AI's role and expertise
                 # - Content generation guidelines
                 # - Required format and structure
-                "system": [system_prompt],
+                # The static prompt comes first so Bedrock can cache it, grade/subject alignment after
+                "system": build_system_blocks(
+                    model_id,
+                    system_prompt,
+                    self._get_alignment_prompt(component, context.get('grade'), context.get('subject'))
+                ),
                 
                 # Configure generation parameters:
-                # - maxTokens: Allow for detailed, comprehensive responses
+                # - maxTokens: Learned from observed usage, 4000 until there is enough history
                 # - temperature: Balance creativity with consistency (0.7 is moderately creative)
                 "inferenceConfig": {
-                    "maxTokens": 4000,
+                    "maxTokens": self.token_budget.max_tokens(component, self.GENERATION_TIER, 4000),
                     "temperature": 0.7
                 }
             }
-            
-            result = await self._make_bedrock_call(request_params)
-            # Validate response has expected component
-            if component not in result:
-                raise ValueError(f"Generated content missing '{component}' key")
-            return result
+
+    def _validate_component_result(self, component: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a generated component, restructuring unwrapped standards responses"""
+        if component == 'standardsAddressed' and 'standardsAddressed' not in result:
+            if 'focalStandard' in result and 'supportingStandards' in result:
+                return {'standardsAddressed': result}
+            raise ValueError("Invalid standards response structure")
+        if component not in result:
+            raise ValueError(f"Generated content missing '{component}' key")
+        return result
+
+    async def _generate_component(self, component: str, topic: str, context: Dict, profile: Optional[Dict],
+                                  on_response: Optional[Callable] = None) -> Dict[str, Any]:
+        """Generate a specific lesson plan component with appropriate system prompt"""
+        if component in self.PROBLEM_SET_COMPONENTS and self.shard_problem_sets:
+            return await self._generate_problem_set_shards(component, topic, context, profile, on_response)
+        request_params = self._build_component_request(component, topic, context, profile)
+        with metric_labels(component=component, tier=self.GENERATION_TIER, caller="ParallelLessonService"):
+            result = await self._make_bedrock_call(
+                request_params,
+                on_response=chain_observers(
+                    self.token_budget.observer(component, self.GENERATION_TIER),
+                    self.router.observer(self._route_for(component)),
+                    on_response
+                ),
+                validate=lambda result: self._validate_component_result(component, result)
+            )
+        return self._validate_component_result(component, result)
+
+    def _build_problem_set_shard_request(self, component: str, section: str, topic: str, context: Dict,
+                                         profile: Optional[Dict]) -> Dict[str, Any]:
+        """The component request narrowed to one section of a problem set and its difficulty band"""
+        request_params = self._build_component_request(component, topic, context, profile)
+        low, high = self.DIFFICULTY_BANDS.get(section, (1, 5))
+        request_params["messages"] = [{
+            "role": "user",
+            "content": [{
+                "text": f"""
+                Create only the {section} section of {component} for:
+                Topic: {topic}
+                Grade Level: {context.get('grade', 'default')}
+                Subject: {context.get('subject', 'Mathematics')}
+                Context: {json.dumps(context)}
+                Profile: {json.dumps(profile) if profile else 'default'}
+                Every problem's difficulty must be between {low} and {high}, never decreasing through the list.
+                Use this RFC8259 compliant JSON as a response
+                {json.dumps({component: {section: self._get_component_schema(component)[section]}}, indent=2)}
+                """
+            }]
+        }]
+        request_params["inferenceConfig"]["maxTokens"] = self.token_budget.max_tokens(
+            f"{component}.{section}", self.GENERATION_TIER, 2000
+        )
+        return request_params
+
+    async def _generate_problem_set_shards(self, component: str, topic: str, context: Dict, profile: Optional[Dict],
+                                           on_response: Optional[Callable] = None) -> Dict[str, Any]:
+        """Generate each section of a problem set concurrently and merge them in schema order.
+        Failed sections are generated again, alone, up to shard_attempts rounds; the component
+        fails if any section still has not succeeded, so a partial set is never returned or checkpointed."""
+        sections = list(self._get_component_schema(component))
+
+        async def generate_section(section: str) -> List[Any]:
+            shard = f"{component}.{section}"
+            request_params = self._build_problem_set_shard_request(component, section, topic, context, profile)
+            with metric_labels(component=shard, tier=self.GENERATION_TIER, caller="ParallelLessonService"):
+                result = await self._make_bedrock_call(
+                    request_params,
+                    on_response=chain_observers(
+                        self.token_budget.observer(shard, self.GENERATION_TIER),
+                        self.router.observer(self._route_for(component)),
+                        on_response
+                    ),
+                    validate=lambda result: self._shard_problems(component, section, result)
+                )
+            return self._shard_problems(component, section, result)
+
+        shards: Dict[str, List[Any]] = {}
+        pending = sections
+        for attempt in range(1, self.shard_attempts + 1):
+            results = await asyncio.gather(*(generate_section(section) for section in pending), return_exceptions=True)
+            failed = []
+            for section, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Error generating {component}.{section} (attempt {attempt}): {str(result)}")
+                    failed.append(section)
+                else:
+                    shards[section] = result
+            if not failed:
+                return {component: self._merge_problem_set_shards(sections, shards)}
+            pending = failed
+        raise ValueError(f"{component} shards failed after {self.shard_attempts} attempts: {', '.join(pending)}")
+
+    @staticmethod
+    def _shard_problems(component: str, section: str, result: Dict[str, Any]) -> List[Any]:
+        """The problems of one problem-set shard response, accepting it with or without the component wrapper"""
+        document = result.get(component, result)
+        problems = document.get(section) if isinstance(document, dict) else None
+        if not isinstance(problems, list):
+            raise ValueError(f"Generated {component}.{section} is not a list of problems")
+        return problems
+
+    @staticmethod
+    def _merge_problem_set_shards(sections: List[str], shards: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+        """Merge shards in section order, sorting each by difficulty and raising any difficulty
+        below an earlier problem's, so difficulty never decreases across the whole set"""
+        merged: Dict[str, List[Any]] = {}
+        highest = None
+        for section in sections:
+            problems = sorted(shards.get(section, []), key=lambda problem: ParallelLessonService._difficulty(problem) or 0)
+            for problem in problems:
+                difficulty = ParallelLessonService._difficulty(problem)
+                if difficulty is None:
+                    continue
+                if highest is not None and difficulty < highest:
+                    problem["difficulty"] = int(highest) if highest.is_integer() else highest
+                else:
+                    highest = difficulty
+            merged[section] = problems
+        return merged
+
+    @staticmethod
+    def _difficulty(problem: Any) -> Optional[float]:
+        try:
+            return float(problem["difficulty"])
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def _foundation_cacheable(self, component: str, context: Dict, profile: Optional[Dict]) -> bool:
+        """Profile-independent components can be shared across users, and the other foundations
+        can too when no profile is supplied; user feedback makes a generation specific to its lesson"""
+        if not self.foundation_cache.enabled or context.get("user_feedback"):
+            return False
+        return component in self.PROFILE_INDEPENDENT_COMPONENTS or (component in self.FOUNDATION_COMPONENTS and not profile)
+
+    async def _generate_with_foundation_cache(self, component: str, topic: str, context: Dict, profile: Optional[Dict]) -> Dict[str, Any]:
+        """_generate_component through the cross-user foundation cache when the component is cacheable"""
+        if not self._foundation_cacheable(component, context, profile):
+            return await self._generate_component(component, topic, context, profile)
+        key = self.foundation_cache.key_for(component, topic, context.get("grade"), context.get("subject"))
+        cached = await self.foundation_cache.get(key)
+        if cached is not None:
+            self.logger.info(f"Foundation cache hit for {key}")
+            return {component: cached}
+        result = await self._generate_component(component, topic, context, profile)
+        await self.foundation_cache.set(key, result[component])
+        return result
+
+    async def _speculate(self, component: str, topic: str, context: Dict, profile: Optional[Dict],
+                         limit: asyncio.Semaphore) -> Tuple[Any, Dict[str, int]]:
+        """Generate a dependent component from the initial context only, returning it with its token usage.
+        At most `limit` speculations run at once, and their Bedrock calls queue behind regular calls."""
+        usage = {"inputTokens": 0, "outputTokens": 0}
+
+        def count(_, meta):
+            for field in usage:
+                usage[field] += int(((meta or {}).get("usage") or {}).get(field) or 0)
+
+        try:
+            async with limit:
+                with background_calls():
+                    result = await self._generate_component(component, topic, context, profile, on_response=count)
+        except Exception as e:
+            # Keep the usage so a failed speculation is still counted as waste
+            e.speculation_usage = usage
+            raise
+        return result[component], usage
+
+    async def _resolve_speculation(self, component: str, speculation: asyncio.Future, inputs: Dict[str, Any]) -> Optional[Any]:
+        """The speculative result if it is still relevant to the generated foundations, otherwise None"""
+        try:
+            value, usage = await speculation
+        except Exception as e:
+            self.logger.warning(f"Speculative {component} failed, generating with foundations: {str(e)}")
+            self.speculation.record(FAILED, getattr(e, 'speculation_usage', None))
+            return None
+        invalidated_by = self.speculation.invalidated_by(value, inputs)
+        if invalidated_by:
+            self.logger.info(f"Speculative {component} invalidated by {', '.join(invalidated_by)}, regenerating")
+            self.speculation.record(INVALIDATED, usage)
+            return None
+        self.speculation.record(HIT, usage)
+        return value
+
+    async def generate_shared_components(self, topic: str, grade: Optional[str] = None,
+                                         subject: Optional[str] = None) -> Dict[str, Any]:
+        """Generate the profile-independent components once, for reuse by every profile's lesson plan.
+        Components that fail are left out, so each profile generates its own copy instead."""
+        context = {
+            "grade": grade or "default",
+            "subject": subject or "Mathematics",
+            "topic": topic,
+            "profile": None
+        }
+        # Raises ValueError if a profile-independent component depends on a profile-dependent one
+        scheduler = ComponentScheduler(self.logger, {
+            component: self.scheduler.graph[component] for component in self.PROFILE_INDEPENDENT_COMPONENTS
+        })
+
+        async def generate(component: str, inputs: Dict[str, Any]) -> Any:
+            result = await self._generate_with_foundation_cache(component, topic, {**context, **inputs}, None)
+            return result[component]
+
+        results, _ = await scheduler.run(generate)
+        return {component: value for component, value in results.items() if not isinstance(value, Exception)}
+
+    async def stream_component(self, component: str, topic: str, context: Dict, profile: Optional[Dict]) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream a component, yielding (section, value) pairs as each top-level section closes"""
+        request_params = self._build_component_request(component, topic, context, profile)
+        async for section, value in self.bedrock.stream_async_call(
+            request_params,
+            root_key=component,
+            validate=lambda result, _meta: self._validate_component_result(component, result)
+        ):
+            yield section, value
 
     async def generate_lesson_plan(self, topic: str, profile: Optional[Dict] = None,
                                 grade: Optional[str] = None, 
                                 subject: Optional[str] = None,
-                                user_chat: Optional[str] = None) -> Dict[str, Any]:
+                                user_chat: Optional[str] = None,
+                                speculative: Optional[bool] = None,
+                                on_component: Optional[Callable[[str, Any], Any]] = None,
+                                generation_id: Optional[str] = None,
+                                shared_components: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
             """
-            Generates a complete lesson plan by orchestrating parallel generation of components.
-            Uses a three-part workflow to ensure pedagogical coherence and standards alignment.
+            Generates a complete lesson plan by scheduling components along their dependency graph.
+            Each component starts as soon as the standards or pedagogy it builds on are ready.
+            With speculative=True (default: the LESSON_SPECULATIVE_GENERATION setting) dependent
+            components start at once from the initial context and are only regenerated if the
+            foundations invalidate them. on_component(component, value) is called as each
+            component finishes, e.g. to report job progress. With a generation_id (the
+            client's idempotency key) each generated component is checkpointed, and a retry
+            with the same id and inputs only generates the components that are missing.
+            shared_components (from generate_shared_components) are used as generated.
             """
+            speculations: Dict[str, asyncio.Future] = {}
+            shared_components = shared_components or {}
             try:
                 #############################################################
                 # PART 1: Initial Setup and Context Creation
@@ -257,62 +529,79 @@ class ParallelLessonService:
                     "profile": profile,
                     "user_feedback": user_chat  # Add user feedback to context
                 }
+
+                # Components finished by an earlier attempt with the same idempotency key and inputs
+                checkpoint = await self.checkpoints.open(generation_id, initial_context)
+                # Learned maxTokens budgets, loaded on the executor before the first request is built
+                await self.token_budget.warm()
                 
                 #############################################################
-                # PART 2: Parallel Generation of Foundation Components
-                # Here we generate pedagogicalContext and standardsAddressed in parallel
-                # because:
-                # 1. These components are independent of each other
-                # 2. They form the foundation for other components
-                # 3. Running them in parallel improves performance
-                # 4. Both need the same initial context but don't depend on each other
+                # PART 2: Dependency-Driven Generation of Components
+                # Components are generated as a graph declared in
+                # schema/json/prompts/components.json rather than in fixed phases:
+                # 1. Each component lists the components it needs in dependsOn
+                # 2. A component starts as soon as those have finished, e.g.
+                #    problem sets only wait for standards, accessibility only
+                #    for the pedagogical context
+                # 3. Each component's context holds only the results it depends on
+                # 4. A failed component falls back to its schema so dependents still run;
+                #    an error that escapes generate skips its dependents, which fall back too
+                # 5. Generated components are checkpointed; restored ones are not regenerated
                 #############################################################
-                
-                # Define components for parallel generation
-                initial_components = ['pedagogicalContext', 'standardsAddressed']
-                initial_tasks = [
-                    self._generate_component(component, topic, initial_context, profile)
-                    for component in initial_components
-                ]
-                
-                # Execute parallel generation
-                initial_results = await asyncio.gather(*initial_tasks, return_exceptions=True)
-                
-                # Process results and build enriched context
-                generation_context = {**initial_context}
-                for component, result in zip(initial_components, initial_results):
-                    if isinstance(result, Exception):
-                        self.logger.error(f"Error generating {component}: {str(result)}")
-                        generation_context[component] = self._get_component_schema(component)
-                    else:
-                        generation_context[component] = result[component]
-                
-                
+
                 #############################################################
-                # PART 3: Parallel Generation of Lesson Components
-                # Now that we have the foundational context established, we can
-                # generate the rest of the components in parallel because:
-                # 1. Each component uses the same enriched context
-                # 2. Components are independent but aligned through the context
-                # 3. Parallel generation significantly reduces total generation time
+                # Speculative mode: dependent components start immediately with
+                # the initial context. When their foundations land, a keyword
+                # relevance check decides whether the speculative output is kept
+                # or regenerated with the foundation results.
                 #############################################################
-                
-                # Define main components for parallel generation
-                components = ['objectives', 'lessonFlow', 'markupProblemSets', 'markupProblemSetsAboveGradeLevel', 'markupProblemSetsBelowGradeLevel', 'assessments', 'accessibility']
-                tasks = [
-                    self._generate_component(
-                        component, 
-                        topic, 
-                        {**generation_context, "user_feedback": user_chat}, 
-                        profile
-                    )
-                    for component in components
-                ]
-                
-                # Execute parallel generation of main components
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Assemble the final plan with metadata
+
+                if speculative is None:
+                    speculative = self.speculative
+                if speculative:
+                    # The governor serves the foundations first, however early the speculations queue
+                    limit = asyncio.Semaphore(max(1, self.speculative_concurrency))
+                    speculations = {
+                        component: asyncio.ensure_future(self._speculate(component, topic, initial_context, profile, limit))
+                        for component, depends_on in self.scheduler.graph.items()
+                        if depends_on and component not in checkpoint and component not in shared_components
+                    }
+
+                async def generate(component: str, inputs: Dict[str, Any]) -> Any:
+                    if component in shared_components:
+                        return shared_components[component]
+                    if component in checkpoint:
+                        return checkpoint.get(component)
+                    try:
+                        value = None
+                        if component in speculations:
+                            value = await self._resolve_speculation(component, speculations[component], inputs)
+                        if value is None:
+                            result = await self._generate_with_foundation_cache(component, topic, {**initial_context, **inputs}, profile)
+                            value = result[component]
+                        await checkpoint.save(component, value)
+                        return value
+                    except Exception as e:
+                        self.logger.error(f"Error generating {component}: {str(e)}")
+                        return self._get_component_schema(component)
+
+                results, schedule = await self.scheduler.run(generate, on_complete=on_component)
+                self.logger.info(f"Lesson component schedule: {json.dumps(schedule)}")
+                # Failures that escaped generate, and the dependents skipped because of them, get the same schema fallback
+                for component, value in results.items():
+                    if isinstance(value, Exception):
+                        self.logger.error(f"Using the {component} schema after: {str(value)}")
+                        results[component] = self._get_component_schema(component)
+                if speculations:
+                    self.logger.info(f"Speculative generation stats: {json.dumps(self.speculation.stats())}")
+                self.logger.info(f"Foundation cache stats: {json.dumps(self.foundation_cache.stats())}")
+
+                #############################################################
+                # PART 3: Assemble the Lesson Plan
+                # Standards are kept in the metadata, the pedagogical context and
+                # every other component at the top level
+                #############################################################
+
                 assembled_plan = {
                     "metadata": {
                         "topic": topic,
@@ -320,54 +609,37 @@ class ParallelLessonService:
                         "subject": subject or "Mathematics",
                         "lastModified": datetime.utcnow().isoformat(),
                         "profileId": profile.get("profileId") if profile else "default",
-                        "standardsAddressed": generation_context.get('standardsAddressed', {
+                        "standardsAddressed": results.get('standardsAddressed', {
                             "focal": [],
                             "supporting": []
                         })
                     },
                     # Include foundation components
-                    "pedagogicalContext": generation_context.get('pedagogicalContext', {})
+                    "pedagogicalContext": results.get('pedagogicalContext', {})
                 }
-                
-                # Add generated components to final plan
-                for component, result in zip(components, results):
-                    if isinstance(result, Exception):
-                        self.logger.error(f"Error generating {component}: {str(result)}")
-                        assembled_plan[component] = self._get_component_schema(component)
-                    else:
-                        assembled_plan[component] = result[component]
-                
+
+                # Add generated components to final plan in the order they are declared
+                for component in self.COMPONENTS:
+                    if component not in self.FOUNDATION_COMPONENTS:
+                        assembled_plan[component] = results[component]
+
+                # Flush the usage observed during this fan-out before the container is frozen
+                await asyncio.get_event_loop().run_in_executor(None, self.token_budget.persist)
                 return assembled_plan
                 
             except Exception as e:
                 self.logger.error(f"Error in lesson generation: {str(e)}")
                 raise
+            finally:
+                for speculation in speculations.values():
+                    speculation.cancel()
 
-    async def _make_bedrock_call(self, request_params: Dict) -> Dict[str, Any]:
-        """Make async call to Bedrock"""
+    async def _make_bedrock_call(self, request_params: Dict, on_response: Optional[Callable] = None,
+                                 validate: Optional[Callable] = None) -> Dict[str, Any]:
+        """Make async call to Bedrock through the shared BedrockManager and RetryPolicy;
+        validate(result) rejects a response before it is cached"""
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                self.executor,
-                lambda: self.bedrock.converse(**request_params)
-            )
-            content = response["output"]["message"]["content"][0]["text"]
-            cleaned_content = self._clean_json_string(content)
-            return json.loads(cleaned_content)
-                
+            return await self.retry_policy.execute(self.bedrock, request_params, on_response=on_response, validate=validate)
         except Exception as e:
-            self.logger.error(f"Bedrock API error: {str(e)}")
-            self.logger.error(f"Failed to parse response into JSON. Raw content: {content}")
-            self.logger.error(f"Request params: {str(request_params)}")
-
-    def _clean_json_string(self, content: str) -> str:
-        """Remove markdown JSON code block markers if present."""
-        # Remove ```json from start and ``` from end if they exist
-        content = content.strip()
-        if content.startswith('```json'):
-            content = content[7:]  # Remove ```json
-        elif content.startswith('```'):
-            content = content[3:]  # Remove ```
-        if content.endswith('```'):
-            content = content[:-3]  # Remove trailing ```
-        return content
\ No newline at end of file
+            self.logger.error(f"Error generating component: {str(e)}")
+            raise
\ No newline at end of file
@@ -1,17 +1,19 @@
 # serverless-api/src/services/shared/base_generator.py
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from abc import ABC, abstractmethod
 import json
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 
 try:
     from aws.bedrockmanager import BedrockManager
+    from aws.promptcache import build_system_blocks
+    from services.shared.retry_policy import RetryPolicy
     from util.loggers.applogger import AppLogger
     from util.importhelper import ImportHelper
 except ImportError:
     from src.aws.bedrockmanager import BedrockManager
+    from src.aws.promptcache import build_system_blocks
+    from src.services.shared.retry_policy import RetryPolicy
     from src.util.importhelper import ImportHelper
     from src.util.loggers.applogger import AppLogger
 
@@ -25,40 +27,37 @@ class BaseGenerator(ABC):
     def __init__(self, bedrock_client: BedrockManager, logger: Optional[AppLogger] = None):
         self.bedrock = bedrock_client
         self.logger = logger or AppLogger(__name__)
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        self.retry_policy = RetryPolicy(self.logger)
         
     async def generate_with_retry(self, 
                                 request_params: Dict[str, Any],
-                                max_retries: int = 3,
-                                retry_delay: float = 1.0) -> Dict[str, Any]:
-        last_error = None
-        
-        for attempt in range(max_retries):
-            try:
-                return await self.bedrock.make_async_call(request_params)
-                
-            except Exception as e:
-                last_error = e
-                self.logger.warning(
-                    f"Generation attempt {attempt + 1} failed: {str(e)}"
-                )
-                
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay * (attempt + 1))
-                    
-        self.logger.error(f"All generation attempts failed: {str(last_error)}")
-        raise last_error
+                                required_keys: Optional[List[str]] = None,
+                                on_response: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None,
+                                validate: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """Generate through the shared RetryPolicy; required_keys turns missing keys into a schema retry
+        and validate(result) rejects a response before it can be cached"""
+        try:
+            return await self.retry_policy.execute(self.bedrock, request_params, required_keys, on_response, validate)
+        except Exception as e:
+            self.logger.error(f"All generation attempts failed: {str(e)}")
+            raise
         
     def prepare_request_params(self,
                              messages: List[Dict[str, Any]],
                              system_prompt: Dict[str, str],
                              model_id: Optional[str] = None,
                              max_tokens: Optional[int] = None,
-                             temperature: Optional[float] = None) -> Dict[str, Any]:
+                             temperature: Optional[float] = None,
+                             dynamic_prompt: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Build a converse request; system_prompt must be static so its prefix can be prompt-cached.
+
+        Per-request instructions go in dynamic_prompt, which is placed after the cachePoint.
+        """
+        model_id = model_id or self.DEFAULT_MODEL_ID
         return {
-            "modelId": model_id or self.DEFAULT_MODEL_ID,
+            "modelId": model_id,
             "messages": messages,
-            "system": [system_prompt],
+            "system": build_system_blocks(model_id, system_prompt, dynamic_prompt),
             "inferenceConfig": {
                 "maxTokens": max_tokens or self.DEFAULT_MAX_TOKENS,
                 "temperature": temperature or self.DEFAULT_TEMPERATURE
@@ -0,0 +1,102 @@
+# serverless-api/src/services/speculation.py
+from typing import Dict, Any, List, Optional
+import collections
+import json
+import os
+import re
+import threading
+
+HIT = "hits"
+INVALIDATED = "invalidated"
+FAILED = "failed"
+
+STANDARD_CODE = re.compile(r"\b[0-9A-Z]{1,3}(?:\.[A-Z0-9]{1,5}){1,3}\b")
+WORD = re.compile(r"[a-z][a-z'-]{3,}")
+STOPWORDS = frozenset("""
+    about above after also among and another around based because been before being below between both
+    could does doing down during each either every from further have having here into itself just more
+    most much must need only other over same should since some such than that their them then there
+    these they this those through under until upon used using very well were what when where which
+    while will with within without would your string students student grade level lesson
+""".split())
+
+
+class SpeculationTracker:
+    """Cheap relevance check for speculative components, plus hit-rate and waste counters.
+
+    A speculative component is generated from the initial topic/grade/subject
+    context while its foundations are still generating. Once they land it is
+    kept if it covers enough of each foundation's most frequent keywords and
+    standard codes; otherwise it is invalidated and regenerated, and its
+    tokens are counted as wasted.
+    """
+
+    TOP_KEYWORDS = 20
+
+    _instance: Optional['SpeculationTracker'] = None
+
+    def __init__(self, logger, min_overlap: Optional[float] = None):
+        self.logger = logger
+        self.min_overlap = min_overlap if min_overlap is not None else float(os.environ.get('SPECULATION_MIN_OVERLAP', 0.3))
+        self._lock = threading.Lock()
+        self.counters = {
+            'speculated': 0,
+            'hits': 0,
+            'invalidated': 0,
+            'failed': 0,
+            'wasted_input_tokens': 0,
+            'wasted_output_tokens': 0
+        }
+
+    @classmethod
+    def get_instance(cls, logger) -> 'SpeculationTracker':
+        """Get or create the process-wide tracker"""
+        if cls._instance is None:
+            cls._instance = SpeculationTracker(logger)
+        return cls._instance
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        """All string values of a component, without its keys"""
+        if isinstance(value, dict):
+            return " ".join(SpeculationTracker._text(item) for item in value.values())
+        if isinstance(value, list):
+            return " ".join(SpeculationTracker._text(item) for item in value)
+        return value if isinstance(value, str) else json.dumps(value)
+
+    def keywords(self, value: Any) -> List[str]:
+        """The most frequent content words and every standard code in a component"""
+        text = self._text(value)
+        codes = set(STANDARD_CODE.findall(text))
+        words = collections.Counter(word for word in WORD.findall(text.lower()) if word not in STOPWORDS)
+        return sorted(codes) + [word for word, _ in words.most_common(self.TOP_KEYWORDS)]
+
+    def invalidated_by(self, output: Any, inputs: Dict[str, Any]) -> List[str]:
+        """Foundations whose keywords the speculative output does not cover well enough"""
+        text = self._text(output)
+        words = set(WORD.findall(text.lower()))
+        invalid = []
+        for name, value in inputs.items():
+            keywords = self.keywords(value)
+            if not keywords:
+                continue
+            covered = sum(1 for keyword in keywords if keyword in words or keyword in text)
+            if covered / len(keywords) < self.min_overlap:
+                invalid.append(name)
+        return invalid
+
+    def record(self, outcome: str, usage: Optional[Dict[str, int]] = None) -> None:
+        """Count a speculative component as a hit, invalidated or failed; the last two waste its tokens"""
+        with self._lock:
+            self.counters['speculated'] += 1
+            self.counters[outcome] += 1
+            if outcome != HIT and usage:
+                self.counters['wasted_input_tokens'] += usage.get('inputTokens', 0)
+                self.counters['wasted_output_tokens'] += usage.get('outputTokens', 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters with the share of speculative components that were kept"""
+        with self._lock:
+            counters = dict(self.counters)
+        counters['hit_rate'] = counters['hits'] / counters['speculated'] if counters['speculated'] else 0.0
+        return counters
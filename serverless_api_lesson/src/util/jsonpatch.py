@@ -0,0 +1,145 @@
+# pylint: disable=C0301
+"""RFC 6902 JSON Patch for applying model-proposed edits to a component"""
+import copy
+from typing import Any, Dict, List, Tuple
+
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+
+class JsonPatchError(ValueError):
+    """A patch that is malformed or does not apply to the document"""
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens"""
+    if not isinstance(pointer, str):
+        raise JsonPatchError(f"JSON pointer must be a string: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"JSON pointer must start with '/': {pointer}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def apply_patch(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """Apply a list of RFC 6902 operations and return the patched copy.
+
+    The input document is never modified. Operations apply in order and the
+    whole patch fails with JsonPatchError if any one of them does not apply,
+    including a failed 'test'.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("A JSON patch must be a list of operations")
+    result = copy.deepcopy(document)
+    for index, operation in enumerate(operations):
+        try:
+            result = _apply_operation(result, operation)
+        except JsonPatchError as e:
+            raise JsonPatchError(f"Operation {index} {operation!r}: {str(e)}") from e
+    return result
+
+
+def same_shape(original: Any, patched: Any) -> bool:
+    """True when the patched document keeps the original's type and top-level keys with the same value types"""
+    if _kind(original) != _kind(patched):
+        return False
+    if isinstance(original, dict):
+        return all(key in patched and _kind(value) == _kind(patched[key]) for key, value in original.items())
+    return True
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool) or value is None:
+        return type(value).__name__
+    if isinstance(value, (int, float)):
+        return "number"
+    return type(value).__name__
+
+
+def _apply_operation(document: Any, operation: Dict[str, Any]) -> Any:
+    if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+        raise JsonPatchError("unknown or missing 'op'")
+    op = operation['op']
+    path = parse_pointer(_member(operation, 'path'))
+
+    if op == 'add':
+        return _add(document, path, copy.deepcopy(_member(operation, 'value')))
+    if op == 'remove':
+        return _remove(document, path)[0]
+    if op == 'replace':
+        document, _ = _remove(document, path)
+        return _add(document, path, copy.deepcopy(_member(operation, 'value')))
+    if op == 'test':
+        if _get(document, path) != _member(operation, 'value'):
+            raise JsonPatchError("test failed")
+        return document
+
+    source = parse_pointer(_member(operation, 'from'))
+    if op == 'move':
+        if path[:len(source)] == source and path != source:
+            raise JsonPatchError("cannot move a value into one of its own children")
+        document, value = _remove(document, source)
+        return _add(document, path, value)
+    return _add(document, path, copy.deepcopy(_get(document, source)))
+
+
+def _member(operation: Dict[str, Any], name: str) -> Any:
+    if name not in operation:
+        raise JsonPatchError(f"missing '{name}'")
+    return operation[name]
+
+
+def _get(document: Any, path: List[str]) -> Any:
+    for token in path:
+        document = _child(document, token)
+    return document
+
+
+def _child(container: Any, token: str) -> Any:
+    if isinstance(container, dict):
+        if token not in container:
+            raise JsonPatchError(f"no member '{token}'")
+        return container[token]
+    if isinstance(container, list):
+        index = _index(container, token, allow_end=False)
+        return container[index]
+    raise JsonPatchError(f"cannot reference '{token}' inside a scalar")
+
+
+def _index(container: List[Any], token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchError(f"invalid array index '{token}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"array index {index} out of range")
+    return index
+
+
+def _add(document: Any, path: List[str], value: Any) -> Any:
+    if not path:
+        return value
+    parent = _get(document, path[:-1])
+    token = path[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"cannot add '{token}' to a scalar")
+    return document
+
+
+def _remove(document: Any, path: List[str]) -> Tuple[Any, Any]:
+    if not path:
+        return None, document
+    parent = _get(document, path[:-1])
+    token = path[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError(f"no member '{token}'")
+        return document, parent.pop(token)
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, token, allow_end=False))
+    raise JsonPatchError(f"cannot remove '{token}' from a scalar")
@@ -40,3 +40,13 @@ class LambdaHelper:
 
     def set_headers(self, header):
         self.headers = header
+
+    @staticmethod
+    def get_idempotency_key(event, body=None):
+        """Idempotency-Key header, or idempotency_key in the body, scoped to the caller; None when absent"""
+        headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+        key = headers.get('idempotency-key') or (body or {}).get('idempotency_key')
+        if not key:
+            return None
+        principal = ((event.get('requestContext') or {}).get('authorizer') or {}).get('principalId', '')
+        return f"{principal}:{key}"
@@ -0,0 +1,96 @@
+# pylint: disable=C0301
+"""Cursor pagination for list endpoints: limit, cursor, order and fields query parameters"""
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+MAX_LIMIT = 100
+ORDERS = {'asc': True, 'desc': False}
+
+
+class PageRequestError(ValueError):
+    """Invalid pagination query parameters; handlers answer 400"""
+
+
+class PageRequest:
+    """Pagination parameters of a list request.
+
+    limit and cursor map to Limit and ExclusiveStartKey, order to
+    ScanIndexForward and fields to ProjectionExpression. Without limit or
+    cursor the request is unpaginated and every page is read.
+    """
+
+    def __init__(self, limit: Optional[int] = None, cursor: Optional[Dict[str, Any]] = None,
+                 order: Optional[str] = None, fields: Optional[List[str]] = None):
+        self.limit = limit
+        self.cursor = cursor
+        self.order = order
+        self.fields = fields
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.cursor is not None
+
+    def forward(self, default_order: str = 'asc') -> bool:
+        return ORDERS[self.order or default_order]
+
+    def check_cursor(self, key_name: str, key_value: Any) -> None:
+        """Reject a cursor taken from another list, e.g. another user's"""
+        if self.cursor is not None and self.cursor.get(key_name) != key_value:
+            raise PageRequestError("cursor does not belong to this list")
+
+
+def parse_page_request(event: Dict[str, Any], allowed_fields: Optional[Iterable[str]] = None,
+                       max_limit: int = MAX_LIMIT) -> PageRequest:
+    """Read limit, cursor, order and fields from the query string"""
+    params = event.get('queryStringParameters') or {}
+
+    limit = params.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError as err:
+            raise PageRequestError("limit must be an integer") from err
+        if not 1 <= limit <= max_limit:
+            raise PageRequestError(f"limit must be between 1 and {max_limit}")
+
+    order = params.get('order')
+    if order is not None and order not in ORDERS:
+        raise PageRequestError("order must be 'asc' or 'desc'")
+
+    fields = None
+    if params.get('fields'):
+        fields = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        if allowed_fields is not None:
+            unknown = [field for field in fields if field not in allowed_fields]
+            if unknown:
+                raise PageRequestError(f"unknown fields: {', '.join(unknown)}")
+
+    cursor = decode_cursor(params['cursor']) if params.get('cursor') else None
+    return PageRequest(limit=limit, cursor=cursor, order=order, fields=fields)
+
+
+def encode_cursor(last_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Opaque cursor for a LastEvaluatedKey; None when there are no more pages"""
+    if not last_key:
+        return None
+    payload = json.dumps(last_key, separators=(',', ':'), default=_decimal_default)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')), parse_float=Decimal)
+    except (ValueError, binascii.Error, UnicodeError) as err:
+        raise PageRequestError("invalid cursor") from err
+    if not isinstance(key, dict):
+        raise PageRequestError("invalid cursor")
+    return key
+
+
+def _decimal_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
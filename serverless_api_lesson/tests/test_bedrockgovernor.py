@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import unittest
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.aws.bedrockgovernor import BedrockBackpressureError, BedrockGovernor, ModelLimiter, background_calls
+
+
+def limiter(initial=4, max_queue_depth=8, cooldown=0):
+    return ModelLimiter("test-model", initial, 1, 16, max_queue_depth, cooldown)
+
+
+class TestModelLimiterAimd(unittest.TestCase):
+    """Additive increase per success, multiplicative decrease per throttle"""
+
+    def test_success_adds_one_slot_per_limit_calls(self):
+        model = limiter(initial=4)
+        for _ in range(4):
+            model.on_success()
+        self.assertEqual(model.slots, 4)
+        self.assertGreater(model.limit, 4.9)
+        model.on_success()
+        self.assertEqual(model.slots, 5)
+
+    def test_throttle_halves_down_to_the_minimum(self):
+        model = limiter(initial=8)
+        model.on_throttle()
+        self.assertEqual(model.limit, 4)
+        for _ in range(5):
+            model.on_throttle()
+        self.assertEqual(model.limit, 1)
+
+    def test_burst_of_throttles_counts_once_per_cooldown(self):
+        model = limiter(initial=8, cooldown=60)
+        for _ in range(3):
+            model.on_throttle()
+        self.assertEqual(model.limit, 4)
+        self.assertEqual(model.metrics['throttles'], 3)
+
+    def test_limit_is_capped(self):
+        model = limiter(initial=16)
+        model.on_success()
+        self.assertEqual(model.limit, 16)
+
+
+class TestGovernorQueue(unittest.TestCase):
+    """Calls over the limit wait in arrival order and overflow raises backpressure"""
+
+    def setUp(self):
+        self.governor = BedrockGovernor(logging.getLogger(__name__), initial_limit=1, max_queue_depth=2, queue_timeout=1)
+
+    def test_waiters_are_served_in_arrival_order(self):
+        order = []
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def call(name):
+                await self.governor.acquire("m")
+                order.append(name)
+                if name == "first":
+                    await gate.wait()
+                self.governor.limiter("m").release()
+
+            first = asyncio.ensure_future(call("first"))
+            await asyncio.sleep(0)
+            rest = [asyncio.ensure_future(call(name)) for name in ("second", "third")]
+            await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(first, *rest)
+
+        asyncio.run(run())
+        self.assertEqual(order, ["first", "second", "third"])
+
+    def test_background_waiters_go_after_regular_waiters(self):
+        order = []
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def call(name, background):
+                if background:
+                    with background_calls():
+                        await self.governor.acquire("m")
+                else:
+                    await self.governor.acquire("m")
+                order.append(name)
+                if name == "first":
+                    await gate.wait()
+                self.governor.limiter("m").release()
+
+            first = asyncio.ensure_future(call("first", False))
+            await asyncio.sleep(0)
+            speculative = [asyncio.ensure_future(call(f"speculative{i}", True)) for i in range(2)]
+            await asyncio.sleep(0)
+            regular = asyncio.ensure_future(call("regular", False))
+            await asyncio.sleep(0)
+            self.assertEqual(self.governor.limiter("m").stats()["background_queue_depth"], 2)
+            gate.set()
+            await asyncio.gather(first, regular, *speculative)
+
+        self.governor = BedrockGovernor(logging.getLogger(__name__), initial_limit=1, max_queue_depth=4, queue_timeout=1)
+        asyncio.run(run())
+        self.assertEqual(order, ["first", "regular", "speculative0", "speculative1"])
+
+    def test_full_queue_raises_backpressure(self):
+        async def run():
+            await self.governor.acquire("m")
+            waiters = [asyncio.ensure_future(self.governor.acquire("m")) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(BedrockBackpressureError):
+                await self.governor.acquire("m")
+            for waiter in waiters:
+                waiter.cancel()
+
+        asyncio.run(run())
+
+    def test_throttled_call_shrinks_the_limit(self):
+        governor = BedrockGovernor(logging.getLogger(__name__), initial_limit=8, throttle_cooldown=0)
+
+        def throttled():
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "Converse")
+
+        with self.assertRaises(ClientError):
+            asyncio.run(governor.run("m", throttled))
+        self.assertEqual(governor.limiter("m").limit, 4)
+        asyncio.run(governor.run("m", lambda: "ok"))
+        self.assertAlmostEqual(governor.limiter("m").limit, 4.25)
+        self.assertEqual(governor.limiter("m").in_flight, 0)
+
+
+    def test_cancelled_caller_keeps_the_slot_until_the_thread_finishes(self):
+        governor = BedrockGovernor(logging.getLogger(__name__), initial_limit=1, max_queue_depth=2, queue_timeout=1)
+        release = threading.Event()
+
+        async def run():
+            call = asyncio.ensure_future(governor.run("m", release.wait))
+            await asyncio.sleep(0.05)
+            call.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await call
+            self.assertEqual(governor.limiter("m").in_flight, 1)
+            release.set()
+            for _ in range(100):
+                if governor.limiter("m").in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(governor.limiter("m").in_flight, 0)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
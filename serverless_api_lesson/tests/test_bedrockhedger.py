@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.aws.bedrockgovernor import BedrockGovernor
+from src.aws.bedrockhedger import BedrockHedger
+
+
+def hedger():
+    return BedrockHedger(logging.getLogger(__name__), enabled=True, percentile=0.95, max_rate=1.0,
+                         min_delay_ms=0, throttle_pause_seconds=0)
+
+
+class TestHedgerLatency(unittest.TestCase):
+    """Latencies and the hedge delay exclude time spent queued for a governor slot"""
+
+    def setUp(self):
+        self.governor = BedrockGovernor(logging.getLogger(__name__), initial_limit=1, max_queue_depth=4, queue_timeout=5)
+
+    def test_samples_are_service_time(self):
+        subject = hedger()
+
+        async def run():
+            dispatch = lambda call: self.governor.run("m", call)
+            # The second call queues behind the first for about 0.1s
+            await asyncio.gather(*(subject.run("key", lambda: time.sleep(0.1), dispatch) for _ in range(2)))
+
+        asyncio.run(run())
+        samples = list(subject._latencies["key"])
+        self.assertEqual(len(samples), 2)
+        self.assertLess(max(samples), 180)
+
+    def test_queued_call_is_not_hedged(self):
+        subject = hedger()
+        for _ in range(BedrockHedger.MIN_SAMPLES):
+            subject.record_latency("key", 50)
+
+        async def run():
+            await self.governor.acquire("m")
+            call = asyncio.ensure_future(subject.run("key", lambda: "ok", lambda call: self.governor.run("m", call)))
+            # Queued well past the 50ms hedge delay
+            await asyncio.sleep(0.2)
+            self.governor.limiter("m").release()
+            return await call
+
+        self.assertEqual(asyncio.run(run()), "ok")
+        self.assertEqual(subject.stats()["hedged"], 0)
+
+    def test_slow_call_is_hedged(self):
+        subject = hedger()
+        for _ in range(BedrockHedger.MIN_SAMPLES):
+            subject.record_latency("key", 50)
+        calls = []
+
+        def call():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.3)
+                return "primary"
+            return "hedge"
+
+        self.assertEqual(asyncio.run(subject.run("key", call)), "hedge")
+        self.assertEqual(subject.stats()["hedge_wins"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.aws.bedrockcache import BedrockResponseCache
+from src.aws.bedrockmanager import BedrockManager
+
+REQUEST = {"modelId": "test-model", "messages": [{"role": "user", "content": [{"text": "go"}]}]}
+
+
+def stream_events(text, chunk_size, stop_reason="end_turn"):
+    """converse_stream events delivering text in chunks of chunk_size characters"""
+    events = [{"contentBlockDelta": {"delta": {"text": text[i:i + chunk_size]}}} for i in range(0, len(text), chunk_size)]
+    events.append({"messageStop": {"stopReason": stop_reason}})
+    events.append({"metadata": {"usage": {"inputTokens": 10, "outputTokens": 20}, "metrics": {"latencyMs": 5}}})
+    return {"stream": events}
+
+
+def collect(manager, root_key=None):
+    async def run():
+        return [item async for item in manager.stream_async_call(REQUEST, root_key=root_key, use_cache=False)]
+    return asyncio.run(run())
+
+
+class TestStreamAsyncCall(unittest.TestCase):
+    """stream_async_call against a fake converse_stream client"""
+
+    def setUp(self):
+        self.manager = BedrockManager(logging.getLogger(__name__))
+        self.manager.bedrock = MagicMock()
+
+    def test_yields_component_sections_across_chunk_sizes(self):
+        text = 'Sure: {"warmUp": {"title": "t", "steps": ["a", "b"], "minutes": 5}}'
+        for chunk_size in (1, 3, 7, len(text)):
+            self.manager.bedrock.converse_stream.return_value = stream_events(text, chunk_size)
+            items = collect(self.manager, "warmUp")
+            self.assertEqual(items, [("title", "t"), ("steps", ["a", "b"]), ("minutes", 5)], chunk_size)
+
+    def test_root_key_with_non_dict_value_is_yielded_whole(self):
+        text = '{"warmUp": ["a", "b"]}'
+        self.manager.bedrock.converse_stream.return_value = stream_events(text, 4)
+        self.assertEqual(collect(self.manager, "warmUp"), [("warmUp", ["a", "b"])])
+
+    def test_truncated_stream_yields_only_complete_members(self):
+        text = '{"warmUp": {"title": "t", "steps": ["a", "b"], "notes": "cut off mid'
+        self.manager.bedrock.converse_stream.return_value = stream_events(text, 5, "max_tokens")
+        self.assertEqual(collect(self.manager, "warmUp"), [("title", "t"), ("steps", ["a", "b"])])
+
+    def test_falls_back_to_buffered_call_when_stream_fails_before_output(self):
+        self.manager.bedrock.converse_stream.side_effect = RuntimeError("streaming not supported")
+        self.manager.bedrock.converse.return_value = {
+            "output": {"message": {"content": [{"text": json.dumps({"warmUp": {"title": "t"}})}]}},
+            "stopReason": "end_turn",
+            "usage": {"inputTokens": 1, "outputTokens": 1}
+        }
+        self.assertEqual(collect(self.manager, "warmUp"), [("title", "t")])
+
+
+def converse_response(result, stop_reason="end_turn"):
+    return {
+        "output": {"message": {"content": [{"text": json.dumps(result)}]}},
+        "stopReason": stop_reason,
+        "usage": {"inputTokens": 1, "outputTokens": 1}
+    }
+
+
+def reject(result, meta):
+    raise ValueError("rejected by caller")
+
+
+class TestCacheAfterValidation(unittest.TestCase):
+    """Only responses the caller accepts reach the response cache"""
+
+    def setUp(self):
+        self.manager = BedrockManager(logging.getLogger(__name__))
+        self.manager.bedrock = MagicMock()
+        self.manager.cache = BedrockResponseCache(logging.getLogger(__name__), table_name='')
+
+    def call(self, validate=None):
+        return asyncio.run(self.manager.make_detailed_async_call(REQUEST, use_cache=True, validate=validate))
+
+    def test_rejected_result_is_not_cached(self):
+        self.manager.bedrock.converse.return_value = converse_response({"warmUp": {}})
+        with self.assertRaises(ValueError):
+            self.call(reject)
+        self.assertEqual(len(self.manager.cache.local), 0)
+        result, meta = self.call()
+        self.assertEqual(result, {"warmUp": {}})
+        self.assertFalse(meta["cached"])
+        self.assertEqual(self.manager.bedrock.converse.call_count, 2)
+
+    def test_accepted_result_is_cached(self):
+        self.manager.bedrock.converse.return_value = converse_response({"warmUp": {}})
+        seen = []
+        self.call(lambda result, meta: seen.append(result))
+        _, meta = self.call()
+        self.assertEqual(seen, [{"warmUp": {}}])
+        self.assertTrue(meta["cached"])
+        self.assertEqual(self.manager.bedrock.converse.call_count, 1)
+
+    def test_rejected_stream_is_not_cached(self):
+        self.manager.bedrock.converse_stream.return_value = stream_events('{"warmUp": {"title": "t"}}', 4)
+
+        async def run():
+            return [item async for item in self.manager.stream_async_call(REQUEST, root_key="warmUp", use_cache=True, validate=reject)]
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+        self.assertEqual(len(self.manager.cache.local), 0)
+
+    def test_sync_call_skips_truncated_and_rejected_results(self):
+        self.manager.bedrock.converse.return_value = converse_response({"warmUp": {}}, "max_tokens")
+        self.manager.make_sync_call(REQUEST, use_cache=True)
+        self.assertEqual(len(self.manager.cache.local), 0)
+        self.manager.bedrock.converse.return_value = converse_response({"warmUp": {}})
+        with self.assertRaises(ValueError):
+            self.manager.make_sync_call(REQUEST, use_cache=True, validate=reject)
+        self.assertEqual(len(self.manager.cache.local), 0)
+        self.manager.make_sync_call(REQUEST, use_cache=True)
+        self.assertEqual(len(self.manager.cache.local), 1)
+
+
+class TestSharedCacheClients(unittest.TestCase):
+    """The DynamoDB tier uses one low-level client per thread"""
+
+    def test_each_thread_gets_its_own_client(self):
+        cache = BedrockResponseCache(logging.getLogger(__name__), table_name='cache-table')
+        clients = []
+
+        def client():
+            clients.append(cache._shared_client())
+            clients.append(cache._shared_client())
+        with ThreadPoolExecutor(max_workers=1) as first, ThreadPoolExecutor(max_workers=1) as second:
+            first.submit(client).result()
+            second.submit(client).result()
+        self.assertIs(clients[0], clients[1])
+        self.assertIs(clients[2], clients[3])
+        self.assertIsNot(clients[0], clients[2])
+
+    def test_round_trip_through_low_level_items(self):
+        cache = BedrockResponseCache(logging.getLogger(__name__), table_name='cache-table')
+        client = MagicMock()
+        cache._clients.dynamodb = client
+        cache.store("key", {"warmUp": {"title": "t"}})
+        item = client.put_item.call_args.kwargs["Item"]
+        self.assertEqual(item["cacheKey"], {"S": "key"})
+        cache.local.clear()
+        client.get_item.return_value = {"Item": item}
+        self.assertEqual(cache.lookup("key"), {"warmUp": {"title": "t"}})
+        self.assertEqual(client.get_item.call_args.kwargs, {"TableName": "cache-table", "Key": {"cacheKey": {"S": "key"}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
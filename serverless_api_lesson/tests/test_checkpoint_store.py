@@ -0,0 +1,37 @@
+import logging
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.services.shared.checkpoint_store import CheckpointStore
+
+
+class TestCheckpointTables(unittest.TestCase):
+    """Checkpoint saves and loads on different threads never share a table"""
+
+    def test_each_thread_gets_its_own_table(self):
+        store = CheckpointStore(logging.getLogger("test"), table_name='checkpoints')
+        with patch('src.services.shared.checkpoint_store.boto3.session.Session') as session:
+            session.side_effect = lambda: MagicMock()
+            tables = [store._checkpoint_table(), store._checkpoint_table()]
+            thread = threading.Thread(target=lambda: tables.append(store._checkpoint_table()))
+            thread.start()
+            thread.join()
+        self.assertIs(tables[0], tables[1])
+        self.assertIsNot(tables[0], tables[2])
+
+    def test_save_writes_through_the_threads_table(self):
+        store = CheckpointStore(logging.getLogger("test"), table_name='checkpoints')
+        with patch('src.services.shared.checkpoint_store.boto3.session.Session') as session:
+            store.save('generation#hash', 'objectives', {"goals": []})
+        table = session.return_value.resource.return_value.Table.return_value
+        self.assertEqual(table.put_item.call_args.kwargs['Item']['component'], 'objectives')
+
+
+if __name__ == '__main__':
+    unittest.main()
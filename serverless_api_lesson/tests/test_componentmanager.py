@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.aws.bedrockgovernor import BedrockBackpressureError
+from src.aws.bedrockmanager import BedrockParseError
+from src.services.componentmanager import ComponentManager
+from src.services.shared.retry_policy import SchemaValidationError
+from src.util.jsonpatch import JsonPatchError
+
+PLAN = {"objectives": {"goals": ["add fractions"]}}
+
+
+class TestPatchFallback(unittest.TestCase):
+    """Only unusable patches are regenerated in full; Bedrock pushback reaches the caller"""
+
+    def setUp(self):
+        self.manager = ComponentManager(MagicMock(), logging.getLogger(__name__))
+        self.manager.patch_mode = True
+        self.calls = []
+
+    def run_update(self, patch_error):
+        async def patch_component(*args, **kwargs):
+            self.calls.append("patch")
+            raise patch_error
+
+        async def make_bedrock_call(request_params, task, required_keys=None, validate=None):
+            self.calls.append("rewrite")
+            return {"objectives": {"goals": ["rewritten"]}}
+
+        self.manager._patch_component = patch_component
+        self.manager._make_bedrock_call = make_bedrock_call
+        return asyncio.run(self.manager._update_component("objectives", PLAN, "simpler", tier=1))
+
+    def test_unusable_patches_fall_back_to_a_rewrite(self):
+        for error in (JsonPatchError("bad path"), SchemaValidationError(["patch"], {}),
+                      BedrockParseError("not json", "{")):
+            self.calls = []
+            self.assertEqual(self.run_update(error), {"objectives": {"goals": ["rewritten"]}})
+            self.assertEqual(self.calls, ["patch", "rewrite"])
+
+    def test_throttles_and_backpressure_propagate(self):
+        throttle = ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "Converse")
+        for error in (throttle, BedrockBackpressureError("queue full")):
+            self.calls = []
+            with self.assertRaises(type(error)):
+                self.run_update(error)
+            self.assertEqual(self.calls, ["patch"])
+
+
+if __name__ == '__main__':
+    unittest.main()
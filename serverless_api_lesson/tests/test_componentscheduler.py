@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.componentscheduler import ComponentScheduler, ComponentSkipped
+
+GRAPH = {
+    "objectives": ["standardsAddressed", "pedagogicalContext"],
+    "standardsAddressed": [],
+    "pedagogicalContext": [],
+    "assessments": ["standardsAddressed"],
+    "accessibility": ["pedagogicalContext"]
+}
+
+
+class TestComponentScheduler(unittest.TestCase):
+    """Components run as soon as their dependencies finish"""
+
+    def setUp(self):
+        self.scheduler = ComponentScheduler(logging.getLogger(__name__), GRAPH)
+
+    def test_order_puts_dependencies_first(self):
+        order = self.scheduler.order
+        for component, depends_on in GRAPH.items():
+            for dependency in depends_on:
+                self.assertLess(order.index(dependency), order.index(component))
+
+    def test_unknown_dependency_and_cycle_raise(self):
+        with self.assertRaises(ValueError):
+            ComponentScheduler(logging.getLogger(__name__), {"a": ["missing"]})
+        with self.assertRaises(ValueError):
+            ComponentScheduler(logging.getLogger(__name__), {"a": ["b"], "b": ["c"], "c": ["a"]})
+
+    def test_dependents_start_after_dependencies_and_get_their_results(self):
+        events = []
+        delays = {"standardsAddressed": 0.02, "pedagogicalContext": 0.0}
+
+        async def generate(component, inputs):
+            events.append(("start", component, sorted(inputs)))
+            await asyncio.sleep(delays.get(component, 0))
+            events.append(("end", component))
+            return f"{component} result"
+
+        results, report = asyncio.run(self.scheduler.run(generate))
+        self.assertEqual(results["objectives"], "objectives result")
+        for event in events:
+            if event[0] == "start":
+                self.assertEqual(event[2], sorted(GRAPH[event[1]]))
+        finished = [event[1] for event in events if event[0] == "end"]
+        # accessibility only waits for the faster foundation, so it finishes before standards do
+        self.assertLess(finished.index("pedagogicalContext"), finished.index("accessibility"))
+        self.assertLess(finished.index("accessibility"), finished.index("standardsAddressed"))
+        self.assertEqual(report["critical_path"][0], "standardsAddressed")
+
+    def test_on_complete_is_called_for_each_success(self):
+        completed = []
+
+        async def generate(component, inputs):
+            return component
+
+        asyncio.run(self.scheduler.run(generate, on_complete=lambda component, value: completed.append(component)))
+        self.assertEqual(sorted(completed), sorted(GRAPH))
+
+    def test_dependents_of_a_failed_component_are_skipped(self):
+        generated = []
+
+        async def generate(component, inputs):
+            if component == "standardsAddressed":
+                raise RuntimeError("throttled")
+            generated.append(component)
+            return component
+
+        results, _ = asyncio.run(self.scheduler.run(generate))
+        self.assertIsInstance(results["standardsAddressed"], RuntimeError)
+        for component in ("objectives", "assessments"):
+            self.assertIsInstance(results[component], ComponentSkipped)
+            self.assertEqual(results[component].failed, ["standardsAddressed"])
+        self.assertEqual(sorted(generated), ["accessibility", "pedagogicalContext"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import logging
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.services.foundationcache import FoundationCache
+
+
+class TestFoundationCacheTables(unittest.TestCase):
+    """Shared reads and writes on executor threads never share a table"""
+
+    def test_each_thread_gets_its_own_table(self):
+        cache = FoundationCache(logging.getLogger("test"), table_name='foundations')
+        with patch('src.services.foundationcache.boto3.session.Session') as session:
+            session.side_effect = lambda: MagicMock()
+            tables = [cache._shared_table(), cache._shared_table()]
+            thread = threading.Thread(target=lambda: tables.append(cache._shared_table()))
+            thread.start()
+            thread.join()
+        self.assertIs(tables[0], tables[1])
+        self.assertIsNot(tables[0], tables[2])
+
+
+class TestInvalidate(unittest.TestCase):
+    """Failed shared deletes are counted and reported instead of raised"""
+
+    def test_failed_deletes_are_reported(self):
+        cache = FoundationCache(logging.getLogger("test"), table_name='foundations')
+        standards = cache.key_for('standardsAddressed', 'Fractions', '4', 'Math')
+        cache.local.set(standards, '[]')
+        table = MagicMock()
+        table.delete_item.side_effect = [ConnectionError("reset"), None]
+
+        with patch.object(cache, '_shared_table', return_value=table):
+            result = cache.invalidate('fractions', 'Grade 4', 'Mathematics')
+
+        self.assertEqual(result['failed'], [standards])
+        self.assertEqual(result['invalidated'], [cache.key_for('pedagogicalContext', 'fractions', '4', 'mathematics')])
+        self.assertIsNone(cache.local.get(standards))
+        self.assertEqual(cache.counters['shared_errors'], 1)
+        self.assertEqual(cache.counters['invalidations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
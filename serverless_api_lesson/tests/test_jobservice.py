@@ -0,0 +1,30 @@
+import logging
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.services.jobservice import JobService
+
+
+class TestJobTables(unittest.TestCase):
+    """DynamoDB tables are never shared between threads"""
+
+    def test_each_thread_gets_its_own_table(self):
+        service = JobService(logging.getLogger("test"), table_name='jobs', queue_url='')
+        with patch('src.services.jobservice.boto3.session.Session') as session:
+            session.side_effect = lambda: MagicMock()
+            tables = [service._jobs_table(), service._jobs_table()]
+            thread = threading.Thread(target=lambda: tables.append(service._jobs_table()))
+            thread.start()
+            thread.join()
+        self.assertIs(tables[0], tables[1])
+        self.assertIsNot(tables[0], tables[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
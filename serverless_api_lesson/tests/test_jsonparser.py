@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.util.jsonparser import IncrementalJsonParser, extract_json
+
+
+WRAPPED = '```json\n{"warmUp": {"title": "Fractions, {part} of a whole", "steps": ["a", "b\\"c"], "minutes": 5}, "summary": "done"}\n```'
+
+
+def feed_split(parser, text, split):
+    """Feed text in two chunks cut at split and return everything emitted"""
+    return parser.feed(text[:split]) + parser.feed(text[split:])
+
+
+class TestIncrementalJsonParser(unittest.TestCase):
+    """Members are emitted once, whatever the chunk boundaries"""
+
+    def test_root_members_at_every_split(self):
+        text = 'Here it is: {"a": 1, "b": {"c": [1, 2]}, "d": "x,}"} trailing'
+        for split in range(len(text) + 1):
+            parser = IncrementalJsonParser()
+            emitted = feed_split(parser, text, split)
+            self.assertEqual(emitted, [("a", 1), ("b", {"c": [1, 2]}), ("d", "x,}")], split)
+            self.assertTrue(parser.complete)
+            self.assertEqual(parser.result(), {"a": 1, "b": {"c": [1, 2]}, "d": "x,}"})
+
+    def test_root_key_members_at_every_split(self):
+        expected = json.loads(WRAPPED.strip('`').replace('json\n', '', 1))
+        for split in range(len(WRAPPED) + 1):
+            parser = IncrementalJsonParser("warmUp")
+            emitted = feed_split(parser, WRAPPED, split)
+            self.assertEqual(emitted, list(expected["warmUp"].items()), split)
+            self.assertEqual(parser.result(), expected)
+
+    def test_one_character_chunks(self):
+        parser = IncrementalJsonParser("warmUp")
+        emitted = []
+        for char in WRAPPED:
+            emitted.extend(parser.feed(char))
+        self.assertEqual([key for key, _ in emitted], ["title", "steps", "minutes"])
+
+    def test_unwrapped_response_emits_root_members(self):
+        parser = IncrementalJsonParser("warmUp")
+        emitted = parser.feed('{"title": "t", "minutes": 5}')
+        self.assertEqual(emitted, [("title", "t"), ("minutes", 5)])
+
+    def test_root_key_with_non_dict_value_emits_nothing(self):
+        text = '{"warmUp": ["a", {"b": 1}], "summary": "s"}'
+        for split in range(len(text) + 1):
+            parser = IncrementalJsonParser("warmUp")
+            self.assertEqual(feed_split(parser, text, split), [], split)
+            self.assertEqual(parser.result(), {"warmUp": ["a", {"b": 1}], "summary": "s"})
+
+    def test_result_before_close_raises(self):
+        parser = IncrementalJsonParser()
+        parser.feed('{"a": 1, "b": ')
+        self.assertFalse(parser.complete)
+        with self.assertRaises(ValueError):
+            parser.result()
+
+
+class TestExtractJson(unittest.TestCase):
+    """Tolerant extraction of the model's JSON object"""
+
+    def test_well_formed_with_preamble_and_fence(self):
+        obj, report = extract_json('Here you go:\n```json\n{"a": 1}\n```')
+        self.assertEqual(obj, {"a": 1})
+        self.assertTrue(report['preamble'])
+        self.assertTrue(report['trailing_text'])
+        self.assertFalse(report['repaired'])
+
+    def test_trailing_commas_are_dropped(self):
+        obj, report = extract_json('{"a": [1, 2,], "b": {"c": 3,},}')
+        self.assertEqual(obj, {"a": [1, 2], "b": {"c": 3}})
+        self.assertEqual(report['trailing_commas'], 3)
+
+    def test_truncation_cuts_back_to_the_last_complete_member(self):
+        cases = {
+            '{"a": 1, "b": 12': {"a": 1},
+            '{"a": 1, "b": "hel': {"a": 1},
+            '{"a": 1, "b"': {"a": 1},
+            '{"a": 1, "b":': {"a": 1},
+            '{"a": [1, 2, 3': {"a": [1, 2]},
+            '{"a": {"x": 1}': {"a": {"x": 1}},
+            '{"a": {"x": 1, "y": tr': {"a": {"x": 1}},
+            '{"a": "x\\"y", "b": "p': {"a": 'x"y'}
+        }
+        for text, expected in cases.items():
+            obj, report = extract_json(text)
+            self.assertEqual(obj, expected, text)
+            self.assertTrue(report['truncated'], text)
+
+    def test_truncated_scalar_without_complete_member_raises(self):
+        for text in ('{"a": 12', '{"a": "hel', '{"a": tru', '{"a"'):
+            with self.assertRaises(json.JSONDecodeError, msg=text):
+                extract_json(text)
+
+    def test_brace_in_preamble_is_skipped(self):
+        for text in ('pre {x} {"a":1}', 'Use {placeholders} like {this}: {"a": 1}', 'Note {sic: 1, and {"a": 1}'):
+            obj, report = extract_json(text)
+            self.assertEqual(obj, {"a": 1}, text)
+            self.assertTrue(report['preamble'], text)
+
+    def test_no_object_raises(self):
+        for text in ('no json here', 'only {broken} {braces}'):
+            with self.assertRaises(json.JSONDecodeError, msg=text):
+                extract_json(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
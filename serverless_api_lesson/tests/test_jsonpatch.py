@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.util.jsonpatch import JsonPatchError, apply_patch, parse_pointer, same_shape
+
+DOCUMENT = {"title": "Fractions", "steps": ["launch", "explore"], "meta": {"minutes": 45, "a/b": 1}}
+
+
+class TestApplyPatch(unittest.TestCase):
+    """RFC 6902 operations against a lesson component"""
+
+    def test_operations(self):
+        patched = apply_patch(DOCUMENT, [
+            {"op": "replace", "path": "/title", "value": "Adding fractions"},
+            {"op": "add", "path": "/steps/-", "value": "close"},
+            {"op": "add", "path": "/steps/1", "value": "discuss"},
+            {"op": "remove", "path": "/meta/a~1b"},
+            {"op": "copy", "from": "/meta/minutes", "path": "/meta/planned"},
+            {"op": "move", "from": "/meta/planned", "path": "/meta/actual"},
+            {"op": "test", "path": "/meta/minutes", "value": 45}
+        ])
+        self.assertEqual(patched, {
+            "title": "Adding fractions",
+            "steps": ["launch", "discuss", "explore", "close"],
+            "meta": {"minutes": 45, "actual": 45}
+        })
+
+    def test_input_is_not_modified(self):
+        apply_patch(DOCUMENT, [{"op": "add", "path": "/steps/-", "value": "close"}])
+        self.assertEqual(DOCUMENT["steps"], ["launch", "explore"])
+
+    def test_failures_raise_json_patch_error(self):
+        failing = [
+            [{"op": "test", "path": "/title", "value": "Decimals"}],
+            [{"op": "remove", "path": "/missing"}],
+            [{"op": "add", "path": "/steps/5", "value": "x"}],
+            [{"op": "move", "from": "/meta", "path": "/meta/inner"}],
+            [{"op": "rename", "path": "/title"}],
+            [{"op": "replace", "path": "title", "value": "x"}],
+            {"op": "replace", "path": "/title", "value": "x"}
+        ]
+        for operations in failing:
+            with self.assertRaises(JsonPatchError, msg=operations):
+                apply_patch(DOCUMENT, operations)
+
+    def test_whole_patch_fails_when_one_operation_does(self):
+        with self.assertRaises(JsonPatchError):
+            apply_patch(DOCUMENT, [
+                {"op": "replace", "path": "/title", "value": "x"},
+                {"op": "remove", "path": "/missing"}
+            ])
+
+    def test_parse_pointer_unescapes(self):
+        self.assertEqual(parse_pointer(""), [])
+        self.assertEqual(parse_pointer("/a~1b/c~0d/0"), ["a/b", "c~d", "0"])
+
+    def test_same_shape(self):
+        self.assertTrue(same_shape(DOCUMENT, apply_patch(DOCUMENT, [{"op": "replace", "path": "/meta/minutes", "value": 50.5}])))
+        self.assertFalse(same_shape(DOCUMENT, apply_patch(DOCUMENT, [{"op": "remove", "path": "/steps"}])))
+        self.assertFalse(same_shape(DOCUMENT, apply_patch(DOCUMENT, [{"op": "replace", "path": "/steps", "value": "launch"}])))
+        self.assertFalse(same_shape(DOCUMENT, ["launch"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.services.lessonservice import LessonService
+from src.services.parallellessonservice import ParallelLessonService
+
+TABLES = {'LESSONS_TABLE': 'lessons', 'LESSON_VERSIONS_TABLE': 'versions', 'PROFILES_TABLE': 'profiles'}
+
+LESSON = {'lessonId': 'lesson-1', 'title': 'Fractions', 'grade': '4', 'original_subject': 'Mathematics',
+          'content': {'grade': '4', 'subject': 'Mathematics'}}
+
+
+class TestCreateDifferentiatedLessons(unittest.TestCase):
+    """Profiles are generated a few at a time and their versions numbered from one allocation"""
+
+    def setUp(self):
+        env = patch.dict(os.environ, TABLES)
+        env.start()
+        self.addCleanup(env.stop)
+        shared = patch.object(ParallelLessonService, 'generate_shared_components',
+                              AsyncMock(return_value={'standardsAddressed': ['4.NF.1']}))
+        self.shared = shared.start()
+        self.addCleanup(shared.stop)
+
+        self.service = LessonService(logging.getLogger(__name__))
+        self.service.differentiation_concurrency = 2
+        self.dynamo = MagicMock()
+        self.dynamo.get_dynamo_item_multi_key.return_value = dict(LESSON)
+        # Four versions were allocated before this differentiation
+        self.dynamo.increment_counter.side_effect = lambda table, key, counter, amount=1, attributes=None: 4 + amount
+        self.service.dynamo_manager = self.dynamo
+        self.active = {'now': 0, 'max': 0}
+        self.calls = []
+
+        async def create_lesson(topic, profile=None, existing_plan=None, grade=None, subject=None,
+                                shared_components=None, **kwargs):
+            self.calls.append((profile['profilename'], shared_components))
+            self.active['now'] += 1
+            self.active['max'] = max(self.active['max'], self.active['now'])
+            await asyncio.sleep(0.01)
+            self.active['now'] -= 1
+            if profile['profilename'] == 'broken':
+                raise ValueError("generation failed")
+            return {'profile': profile['profilename']}
+
+        self.service.create_lesson = create_lesson
+
+    def profiles(self, *names, inactive=()):
+        self.dynamo.query_table.return_value = [
+            {'profilename': name, 'active': name not in inactive} for name in names
+        ]
+
+    def test_concurrency_and_versions(self):
+        self.profiles('a', 'b', 'c', 'd', 'broken', 'e', inactive=('e',))
+        versions = asyncio.run(self.service.create_differentiated_lessons('me@example.com', 'lesson-1'))
+
+        self.assertEqual(self.active['max'], 2)
+        self.assertEqual(sorted(name for name, _ in self.calls), ['a', 'b', 'broken', 'c', 'd'])
+        self.shared.assert_awaited_once()
+        for _, shared_components in self.calls:
+            self.assertEqual(shared_components, {'standardsAddressed': ['4.NF.1']})
+
+        self.assertEqual([(item['profileId'], item['version']) for item in versions],
+                         [('a', 5), ('b', 6), ('c', 7), ('d', 8)])
+        self.dynamo.increment_counter.assert_called_once()
+        self.assertEqual(self.dynamo.increment_counter.call_args.kwargs['amount'], 4)
+        table, written = self.dynamo.put_all_if_newer.call_args.args
+        self.assertEqual(table, 'versions')
+        self.assertEqual([item['profileVersion'] for item in written], ['a#v5', 'b#v6', 'c#v7', 'd#v8'])
+
+    def test_every_profile_failing_raises(self):
+        self.profiles('broken')
+        with self.assertRaises(ValueError):
+            asyncio.run(self.service.create_differentiated_lessons('me@example.com', 'lesson-1'))
+        self.dynamo.put_all_if_newer.assert_not_called()
+
+    def test_no_active_profiles(self):
+        self.profiles('a', inactive=('a',))
+        self.assertEqual(asyncio.run(self.service.create_differentiated_lessons('me@example.com', 'lesson-1')), [])
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
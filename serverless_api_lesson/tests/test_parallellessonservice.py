@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.aws import bedrockgovernor
+from src.services.parallellessonservice import ParallelLessonService
+
+REQUEST = {"modelId": "test-model", "messages": [{"role": "user", "content": [{"text": "go"}]}]}
+
+
+class TestMakeBedrockCall(unittest.TestCase):
+    """Bedrock failures reach the caller instead of turning into a None result"""
+
+    def setUp(self):
+        self.bedrock = MagicMock()
+        self.service = ParallelLessonService(logging.getLogger(__name__), self.bedrock)
+
+    def test_returns_result(self):
+        self.bedrock.make_detailed_async_call = AsyncMock(return_value=({"objectives": {}}, {"stopReason": "end_turn"}))
+        self.assertEqual(asyncio.run(self.service._make_bedrock_call(REQUEST)), {"objectives": {}})
+
+    def test_raises_bedrock_errors(self):
+        self.bedrock.make_detailed_async_call = AsyncMock(side_effect=PermissionError("AccessDeniedException"))
+        with self.assertRaises(PermissionError):
+            asyncio.run(self.service._make_bedrock_call(REQUEST))
+        self.assertEqual(self.bedrock.make_detailed_async_call.await_count, 1)
+
+    def test_component_generation_raises_instead_of_returning_none(self):
+        self.bedrock.make_detailed_async_call = AsyncMock(side_effect=PermissionError("AccessDeniedException"))
+        self.service.shard_problem_sets = False
+        with self.assertRaises(PermissionError):
+            asyncio.run(self.service._generate_component("objectives", "fractions", {}, None))
+
+
+class FailingCheckpoint:
+    """Checkpoint that claims standardsAddressed but fails to restore it"""
+
+    enabled = True
+
+    def __contains__(self, component):
+        return component == "standardsAddressed"
+
+    def get(self, component):
+        raise RuntimeError("checkpoint table unavailable")
+
+    async def save(self, component, value):
+        pass
+
+
+class TestGenerateLessonPlan(unittest.TestCase):
+    """Component failures end up as schema fallbacks, never as exception objects in the plan"""
+
+    def setUp(self):
+        self.service = ParallelLessonService(logging.getLogger(__name__), MagicMock())
+        persist = patch.object(self.service.token_budget, 'persist')
+        persist.start()
+        self.addCleanup(persist.stop)
+        self.generated = []
+
+        async def generate(component, topic, context, profile):
+            self.generated.append(component)
+            return {component: {"generated": component}}
+
+        self.service._generate_with_foundation_cache = generate
+
+    def test_failure_outside_generate_falls_back_and_skips_dependents(self):
+        with patch.object(self.service.checkpoints, 'open', AsyncMock(return_value=FailingCheckpoint())):
+            plan = asyncio.run(self.service.generate_lesson_plan("fractions", speculative=False))
+        json.dumps(plan)
+        schema = ParallelLessonService.SCHEMA
+        self.assertEqual(plan["metadata"]["standardsAddressed"], schema["standardsAddressed"])
+        for component, definition in ParallelLessonService.COMPONENTS.items():
+            if "standardsAddressed" in definition.get("dependsOn", []):
+                self.assertNotIn(component, self.generated)
+                self.assertEqual(plan[component], schema[component])
+        self.assertEqual(plan["accessibility"], {"generated": "accessibility"})
+
+
+class TestSpeculation(unittest.TestCase):
+    """Speculative components run in the governor's background lane, a few at a time"""
+
+    def test_speculations_are_capped_and_marked_background(self):
+        service = ParallelLessonService(logging.getLogger(__name__), MagicMock())
+        service.speculative_concurrency = 2
+        active = {"now": 0, "max": 0}
+        background = {}
+
+        async def generate(component, topic, context, profile, on_response=None):
+            is_background = bedrockgovernor._BACKGROUND.get()
+            background.setdefault(component, []).append(is_background)
+            if is_background:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.01)
+            if is_background:
+                active["now"] -= 1
+            return {component: {"generated": component}}
+
+        service._generate_component = generate
+        with patch.object(service.token_budget, 'persist'), patch.object(service.foundation_cache, 'enabled', False):
+            asyncio.run(service.generate_lesson_plan("fractions", speculative=True))
+        self.assertEqual(active["max"], 2)
+        for component in ParallelLessonService.FOUNDATION_COMPONENTS:
+            self.assertEqual(background[component], [False])
+        speculated = [component for component, flags in background.items() if True in flags]
+        self.assertGreater(len(speculated), 2)
+
+
+class RecordingCheckpoint:
+    """Empty checkpoint that records what is saved"""
+
+    enabled = True
+
+    def __init__(self):
+        self.saved = {}
+
+    def __contains__(self, component):
+        return False
+
+    async def save(self, component, value):
+        self.saved[component] = value
+
+
+class TestProblemSetShards(unittest.TestCase):
+    """A problem set is only returned, and checkpointed, when every shard succeeds"""
+
+    def setUp(self):
+        self.service = ParallelLessonService(logging.getLogger(__name__), MagicMock())
+        persist = patch.object(self.service.token_budget, 'persist')
+        persist.start()
+        self.addCleanup(persist.stop)
+        self.failing = set()
+        self.requested = []
+        self.service._build_problem_set_shard_request = lambda component, section, *args: {"section": section}
+
+        async def make_bedrock_call(request_params, on_response=None, validate=None):
+            section = request_params["section"]
+            self.requested.append(section)
+            if section in self.failing:
+                raise ValueError(f"{section} failed")
+            return {section: [{"difficulty": 2}, {"difficulty": 1}]}
+
+        self.service._make_bedrock_call = make_bedrock_call
+
+    def test_merges_every_section(self):
+        result = asyncio.run(self.service._generate_problem_set_shards("markupProblemSets", "fractions", {}, None))
+        self.assertEqual(list(result["markupProblemSets"]), ["warmup", "corePractice", "extension"])
+
+    def test_failed_shard_fails_the_component(self):
+        self.failing = {"extension"}
+        with self.assertRaises(ValueError):
+            asyncio.run(self.service._generate_problem_set_shards("markupProblemSets", "fractions", {}, None))
+        self.assertEqual(self.requested.count("extension"), self.service.shard_attempts)
+        self.assertEqual(self.requested.count("warmup"), 1)
+
+    def test_only_failed_shards_are_retried(self):
+        real = self.service._make_bedrock_call
+
+        async def flaky(request_params, on_response=None, validate=None):
+            if request_params["section"] == "corePractice" and "corePractice" not in self.requested:
+                self.requested.append("corePractice")
+                raise ValueError("throttled")
+            return await real(request_params, on_response, validate)
+
+        self.service._make_bedrock_call = flaky
+        result = asyncio.run(self.service._generate_problem_set_shards("markupProblemSets", "fractions", {}, None))
+        self.assertEqual(sorted(self.requested), ["corePractice", "corePractice", "extension", "warmup"])
+        self.assertEqual([problem["difficulty"] for problem in result["markupProblemSets"]["corePractice"]], [2, 2])
+
+    def test_failed_shard_is_not_checkpointed(self):
+        self.failing = {"corePractice"}
+        checkpoint = RecordingCheckpoint()
+
+        async def generate(component, topic, context, profile):
+            if component in ParallelLessonService.PROBLEM_SET_COMPONENTS:
+                return await self.service._generate_problem_set_shards(component, topic, context, profile)
+            return {component: {"generated": component}}
+
+        self.service._generate_with_foundation_cache = generate
+        with patch.object(self.service.checkpoints, 'open', AsyncMock(return_value=checkpoint)):
+            plan = asyncio.run(self.service.generate_lesson_plan("fractions", speculative=False))
+        for component in ParallelLessonService.PROBLEM_SET_COMPONENTS:
+            self.assertNotIn(component, checkpoint.saved)
+            self.assertEqual(plan[component], ParallelLessonService.SCHEMA[component])
+        self.assertIn("accessibility", checkpoint.saved)
+
+    def test_kept_speculation_checkpoint_failure_falls_back(self):
+        class BrokenSave(RecordingCheckpoint):
+            async def save(self, component, value):
+                raise RuntimeError("checkpoint table unavailable")
+
+        async def speculate(component, topic, context, profile, limit):
+            return {"generated": component}, {"inputTokens": 0, "outputTokens": 0}
+
+        async def generate(component, topic, context, profile):
+            return {component: {"generated": component}}
+
+        self.service._speculate = speculate
+        self.service._generate_with_foundation_cache = generate
+        with patch.object(self.service.checkpoints, 'open', AsyncMock(return_value=BrokenSave())), \
+                patch.object(self.service.speculation, 'invalidated_by', return_value=[]):
+            plan = asyncio.run(self.service.generate_lesson_plan("fractions", speculative=True))
+        json.dumps(plan)
+        self.assertEqual(plan["accessibility"], ParallelLessonService.SCHEMA["accessibility"])
+
+
+if __name__ == '__main__':
+    unittest.main()
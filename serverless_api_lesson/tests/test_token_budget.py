@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from src.services.shared.token_budget import TokenBudget
+
+STOPPED = {'stopReason': 'end_turn', 'usage': {'outputTokens': 500}}
+TRUNCATED = {'stopReason': 'max_tokens', 'usage': {'outputTokens': 1000}}
+REQUEST = {'inferenceConfig': {'maxTokens': 1000}}
+
+
+class TestTokenBudgetStorage(unittest.TestCase):
+    """Budgets never load or persist on the calling thread, which is the event loop"""
+
+    def setUp(self):
+        with patch.dict(os.environ, {'TOKEN_BUDGET_TABLE': 'budgets'}):
+            self.budget = TokenBudget(logging.getLogger("test"))
+        self.table = MagicMock()
+        self.table.scan.return_value = {'Items': [{'budgetKey': 'objectives#fast', 'samples': [400] * 5,
+                                                   'floor': 0, 'truncations': 2}]}
+        self.threads = []
+
+        def shared_table():
+            self.threads.append(threading.current_thread())
+            return self.table
+
+        patcher = patch.object(self.budget, '_shared_table', side_effect=shared_table)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait_for_background(self):
+        for thread in threading.enumerate():
+            if thread.name.startswith('token-budget'):
+                thread.join()
+
+    def test_max_tokens_does_not_scan_on_the_calling_thread(self):
+        self.assertEqual(self.budget.max_tokens('objectives', 'fast', 1000), 1000)
+        self.wait_for_background()
+        self.assertNotIn(threading.current_thread(), self.threads)
+        self.assertEqual(self.budget.max_tokens('objectives', 'fast', 1000), 480)
+
+    def test_warm_loads_on_the_executor(self):
+        asyncio.run(self.budget.warm())
+        self.assertNotIn(threading.current_thread(), self.threads)
+        self.assertEqual(self.table.scan.call_count, 1)
+        self.assertEqual(self.budget.max_tokens('objectives', 'fast', 1000), 480)
+
+    def test_truncation_persists_in_the_background(self):
+        self.budget.load()
+        self.threads.clear()
+        self.budget.record('objectives', 'fast', REQUEST, TRUNCATED)
+        self.wait_for_background()
+        self.assertNotIn(threading.current_thread(), self.threads)
+        item = self.table.put_item.call_args.kwargs['Item']
+        self.assertEqual((item['budgetKey'], item['floor'], item['truncations']), ('objectives#fast', 1500, 3))
+
+    def test_samples_recorded_before_the_load_are_kept(self):
+        self.budget._loading = True
+        self.budget.record('objectives', 'fast', REQUEST, STOPPED)
+        self.budget.load()
+        self.assertEqual(self.budget.stats()['objectives#fast']['samples'], 6)
+
+
+class TestTokenBudgetTables(unittest.TestCase):
+    """Loads and persists on different threads never share a table"""
+
+    def test_each_thread_gets_its_own_table(self):
+        with patch.dict(os.environ, {'TOKEN_BUDGET_TABLE': 'budgets'}):
+            budget = TokenBudget(logging.getLogger("test"))
+        with patch('src.services.shared.token_budget.boto3.session.Session') as session:
+            session.side_effect = lambda: MagicMock()
+            tables = [budget._shared_table(), budget._shared_table()]
+            thread = threading.Thread(target=lambda: tables.append(budget._shared_table()))
+            thread.start()
+            thread.join()
+        self.assertIs(tables[0], tables[1])
+        self.assertIsNot(tables[0], tables[2])
+
+
+if __name__ == '__main__':
+    unittest.main()